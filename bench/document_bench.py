@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+# Times edits to rojo_document.Document objects holding documents of a few
+# sizes, with the diagnostics published after each, and checks the
+# diagnostics against lexing and parsing the whole text. Exits with status 1
+# when they disagree, or when an edit to the largest document takes more than
+# `growth_budget` times as long as the same edit to the smallest.
+#
+#   python3 bench/document_bench.py [growth_budget] [repeat]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bin"))
+
+import rojo_interpreter as rojint
+from rojo_document import Document
+
+SIZES = (1000, 10000, 50000)
+DEFAULT_GROWTH_BUDGET = 4
+
+def document_text(lines):
+    return "".join(["int v%d = (%d * 31 + 7) %% 1000003\n" % (k, k) for k in range(lines - 1)]) + "v0 + v1"
+
+# Edits as (name, line, column, end line, end column, text), undone in turn
+# by the one after
+def edits(lines):
+    middle = lines // 2
+    digit = len("int v%d = (" % middle)
+    return [
+        ("retype number", middle, digit, middle, digit + 1, "9"),
+        ("undo retype", middle, digit, middle, digit + 1, str(middle)[0]),
+        ("insert line", 0, 0, 0, 0, "int w = 1\n"),
+        ("delete line", 0, 0, 1, 0, ""),
+        ("break line", middle, 1, middle, 1, "@"),
+        ("insert above", 1, 0, 1, 0, "w\n"),
+        ("delete above", 1, 0, 2, 0, ""),
+        ("fix line", middle, 1, middle, 2, ""),
+    ]
+
+def full_diagnostics(text):
+    tokens, error = rojint.Lexer(text, "<bench>").lex()
+    if not error:
+        error = rojint.TableParser(tokens).parse()[1]
+    return [repr(error)] if error else []
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_GROWTH_BUDGET
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    failed = False
+    best = {}
+    for size in SIZES:
+        document = Document("<bench>", document_text(size))
+        for i in range(repeat):
+            for name, ln, col, end_ln, end_col, text in edits(size):
+                start = time.perf_counter()
+                document.edit(ln, col, end_ln, end_col, text)
+                diagnostics = [repr(error) for error in document.diagnostics()]
+                elapsed = time.perf_counter() - start
+
+                best[size, name] = min(best.get((size, name), elapsed), elapsed)
+                if i == 0 and diagnostics != full_diagnostics(document.text):
+                    print("  %d lines, %s: diagnostics differ from lexing and parsing the text" % (size, name))
+                    failed = True
+
+    print("%-14s" % "" + "".join(["%10d" % size for size in SIZES]) + "  lines")
+    for name in [edit[0] for edit in edits(SIZES[0])]:
+        print("%-14s" % name + "".join(["%7.3f ms" % (best[size, name] * 1000) for size in SIZES]))
+
+    growth = max([best[SIZES[-1], name] / best[SIZES[0], name] for name in [edit[0] for edit in edits(SIZES[0])]])
+    print("Largest growth %.1fx from %d to %d lines (budget %.1fx)" % (growth, SIZES[0], SIZES[-1], budget))
+    if failed or growth > budget:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+# Measures how long `import rojo_interpreter` takes in a fresh interpreter
+# and checks that importing it has no side effects. Exits with status 1 when
+# the median import time is over the budget or a side effect is found.
+#
+#   python3 bench/import_bench.py [budget_ms] [runs]
+
+import os
+import py_compile
+import statistics
+import subprocess
+import sys
+
+BIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bin")
+
+DEFAULT_BUDGET_MS = 25
+
+PROBE = """
+import sys, time
+sys.path.insert(0, %r)
+hook = sys.excepthook
+start = time.perf_counter()
+import rojo_interpreter
+elapsed = time.perf_counter() - start
+problems = []
+if sys.excepthook is not hook:
+    problems.append("sys.excepthook was replaced")
+if rojo_interpreter.global_symbol_table.symbols:
+    problems.append("global_symbol_table is not empty")
+for module in ("asyncio", "multiprocessing", "concurrent.futures", "traceback"):
+    if module in sys.modules:
+        problems.append(module + " was imported")
+print(elapsed)
+print(";".join(problems))
+""" % (BIN_DIR)
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+
+    # Time the import from bytecode, as an installed module would be
+    py_compile.compile(os.path.join(BIN_DIR, "rojo_interpreter.py"), doraise=True)
+
+    times = []
+    problems = set()
+    for i in range(runs):
+        out = subprocess.run([sys.executable, "-c", PROBE], check=True, capture_output=True, text=True).stdout.split("\n")
+        times.append(float(out[0]) * 1e3)
+        problems.update(problem for problem in out[1].split(";") if problem)
+
+    median = statistics.median(times)
+    print("import rojo_interpreter: median %.2f ms, min %.2f ms, max %.2f ms over %d runs (budget %.0f ms)" % (median, min(times), max(times), runs, budget))
+    for problem in sorted(problems):
+        print("Side effect: " + problem)
+
+    if median > budget or problems:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+# Measures what keeping metrics costs: the same workloads are timed with
+# rojo_interpreter.metrics enabled and disabled. Exits with status 1 when the
+# overhead of either workload is above the budget.
+#
+#   python3 bench/metrics_bench.py [budget_percent] [repeat]
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bin"))
+
+import rojo_interpreter as rojint
+
+DEFAULT_BUDGET = 5.0
+
+def expression(rng, depth):
+    if depth <= 0 or rng.random() < 0.2:
+        return rng.choice(["1", "7", "2.5", "x", "y"])
+    return "(" + expression(rng, depth - 1) + " " + rng.choice(["+", "-", "*", "/", "%"]) + " " + expression(rng, depth - 1) + ")"
+
+# Many short run() calls, like a shell or a batch of one-liners
+def short_runs(lines):
+    def workload():
+        for line in lines:
+            rojint.run("<bench>", line, {"debug":False})
+    return workload
+
+# One prepared program with many nodes evaluated over and over, the
+# interpreter's hot path
+def long_evaluations(engine, program, count):
+    def workload():
+        for i in range(count):
+            engine.evaluate(program)
+    return workload
+
+def timed(workload, enabled):
+    rojint.metrics.enabled = enabled
+    start = time.perf_counter()
+    workload()
+    return time.perf_counter() - start
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+
+    rng = random.Random(0)
+    rojint.global_symbol_table.set("int", "x", 12)
+    rojint.global_symbol_table.set("float", "y", 0.5)
+    lines = [expression(rng, rng.randint(1, 4)) for i in range(300)]
+
+    engine = rojint.Engine()
+    engine.define("int", "x", 12)
+    engine.define("float", "y", 0.5)
+    program = engine.prepare(" + ".join(expression(rng, 4) for i in range(200)))
+
+    failed = False
+    for name, workload in (("short runs", short_runs(lines)), ("long evaluations", long_evaluations(engine, program, 20))):
+        # Alternate trial by trial so both settings see the same machine
+        # conditions, and keep the best of each
+        off = on = None
+        for i in range(repeat):
+            off_time = timed(workload, False)
+            on_time = timed(workload, True)
+            off = off_time if off is None else min(off, off_time)
+            on = on_time if on is None else min(on, on_time)
+
+        overhead = (on / off - 1) * 100
+        print("%-17s metrics off %.4f s, on %.4f s, overhead %+.2f%% (budget %.1f%%)" % (name, off, on, overhead, budget))
+        if overhead > budget:
+            failed = True
+
+    rojint.metrics.enabled = True
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
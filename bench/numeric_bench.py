@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+# Times the numeric backends on big-int-heavy corpora and on small numbers,
+# and checks every backend gives the same result for every line. Backends
+# whose library is not installed are skipped. Exits with status 1 when the
+# backends disagree.
+#
+#   python3 bench/numeric_bench.py [scale] [repeat]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bin"))
+
+import rojo_interpreter as rojint
+
+if hasattr(sys, "set_int_max_str_digits"):
+    sys.set_int_max_str_digits(0)
+
+# Large powers, as in number-theory scripts
+def powers(scale):
+    return ["(%d) ** %d" % (k + 2, 50000 * scale + 97 * k) for k in range(40)]
+
+# Multiplying numbers of thousands of digits, and reducing them
+def products(scale):
+    lines = ["int a = 3 ** %d" % (20000 * scale), "int b = 7 ** %d" % (15000 * scale)]
+    for k in range(20):
+        lines += ["a * b", "(a * b) %% (b + %d)" % (k), "a = a * %d + b" % (k + 2), "(a - b) * (a + b)"]
+    return lines
+
+# Everyday arithmetic on small numbers, where a backend's overhead shows
+def small(scale):
+    lines = ["int i = 1", "float f = 0.5"]
+    for k in range(200 * scale):
+        lines += ["i = i * 3 %% 1000003 + %d" % (k), "f = f * 1.5 / 1.25 + i % 7", "(i + %d) ** 2 - i / 4" % (k)]
+    return lines
+
+CORPORA = (("powers", powers), ("products", products), ("small", small))
+
+# Results of every line and the best time over `repeat` runs, each with a
+# fresh Engine
+def run_corpus(lines, repeat):
+    best = None
+    for i in range(repeat):
+        engine = rojint.Engine({"parse_cache": 0})
+        programs = [engine.prepare(line) for line in lines]
+
+        start = time.perf_counter()
+        results = [engine.evaluate(program) for program in programs]
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return [str(result.as_dict()) for result in results], best
+
+def main():
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    backends = []
+    for name in rojint.NUMERIC_BACKENDS:
+        try:
+            rojint.set_numeric_backend(name)
+        except ImportError as e:
+            print("%-8s skipped (%s)" % (name, e))
+            continue
+        backends.append(name)
+
+    failed = False
+    for corpus, make_lines in CORPORA:
+        lines = make_lines(scale)
+        expected = None
+        times = []
+        for name in backends:
+            rojint.set_numeric_backend(name)
+            results, elapsed = run_corpus(lines, repeat)
+            times.append(elapsed)
+
+            if expected is None:
+                expected = results
+            elif results != expected:
+                print("%s: backend %s disagrees with %s" % (corpus, name, backends[0]))
+                failed = True
+
+        print("%-9s %4d lines  " % (corpus, len(lines)) + "  ".join(
+            "%s %.4f s (%.2fx)" % (name, elapsed, times[0] / elapsed) for name, elapsed in zip(backends, times)))
+
+    rojint.set_numeric_backend("python")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
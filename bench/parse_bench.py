@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+# Compares parse time of the hand-written Parser and the table-driven
+# TableParser on the same token streams, and checks they build the same AST.
+#
+#   python3 bench/parse_bench.py [scripts] [repeat]
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bin"))
+
+import rojo_interpreter as rojint
+
+sys.excepthook = sys.__excepthook__
+
+OPS = ["+", "-", "*", "/", "%", "**"]
+
+def expression(rng, depth):
+    k = rng.random()
+    if depth <= 0 or k < 0.3:
+        return rng.choice(["1", "25", "2.5", "x", "foo"])
+    if k < 0.4:
+        return "-" + expression(rng, depth - 1)
+    if k < 0.5:
+        return "(" + expression(rng, depth - 1) + ")"
+    return expression(rng, depth - 1) + " " + rng.choice(OPS) + " " + expression(rng, depth - 1)
+
+def script(rng):
+    lines = []
+    for i in range(rng.randint(1, 8)):
+        lines.append(rng.choice(["", "x = ", "int y = ", "float z = "]) + expression(rng, rng.randint(1, 7)))
+    return "\n".join(lines)
+
+def best_time(parser_class, token_lists, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        for tokens in token_lists:
+            parser_class(tokens).parse()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    rng = random.Random(0)
+    token_lists = []
+    for i in range(count):
+        tokens, error = rojint.Lexer(script(rng), "<bench>").lex()
+        token_lists.append(tokens)
+    total = sum(len(tokens) for tokens in token_lists)
+
+    for tokens in token_lists:
+        if repr(rojint.Parser(tokens).parse()) != repr(rojint.TableParser(tokens).parse()):
+            print("Parsers disagree on: " + " ".join(str(tok) for tok in tokens))
+            sys.exit(1)
+
+    print("%d scripts, %d tokens, best of %d" % (count, total, repeat))
+    hand = best_time(rojint.Parser, token_lists, repeat)
+    table = best_time(rojint.TableParser, token_lists, repeat)
+    print("Parser       %8.3f s  %10.0f tokens/s" % (hand, total / hand))
+    print("TableParser  %8.3f s  %10.0f tokens/s  (%.2fx)" % (table, total / table, hand / table))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+# Compares what a worker process pays to see N global variables: unpickling
+# a copy of the SymbolTable, or attaching to a SharedSymbolTable and reading
+# the few names a script uses.
+#
+#   python3 bench/shared_globals_bench.py [reads]
+
+import os
+import pickle
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bin"))
+
+import rojo_interpreter as rojint
+
+sys.excepthook = sys.__excepthook__
+
+def build_table(count):
+    symbol_table = rojint.SymbolTable()
+    for i in range(count):
+        if i % 3 == 0:
+            symbol_table.set("float", "c" + str(i), i / 7)
+        else:
+            symbol_table.set("int", "c" + str(i), i * 7)
+    return symbol_table
+
+def main():
+    reads = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    print("%10s  %12s  %12s  %12s  %12s" % ("globals", "pickle B", "unpickle s", "shared B", "attach s"))
+    for count in (1000, 10000, 100000, 1000000):
+        symbol_table = build_table(count)
+        names = ["c" + str(i * count // reads) for i in range(reads)]
+
+        data = pickle.dumps(symbol_table)
+        start = time.perf_counter()
+        copy = pickle.loads(data)
+        for name in names:
+            copy.get(name)
+        unpickle_time = time.perf_counter() - start
+
+        shared = rojint.SharedSymbolTable.create(symbol_table)
+        try:
+            start = time.perf_counter()
+            attached = rojint.SharedSymbolTable(shared.name)
+            for name in names:
+                if attached.get(name) != symbol_table.get(name):
+                    print("Shared table disagrees on `" + name + "`")
+                    sys.exit(1)
+            attach_time = time.perf_counter() - start
+            attached.close()
+            print("%10d  %12d  %12.6f  %12d  %12.6f" % (count, len(data), unpickle_time, shared.shm.size, attach_time))
+        finally:
+            shared.close()
+            shared.unlink()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+# Times lexing a generated script read into a str and lexing it straight from
+# a memory map (see map_source()), with the peak memory of each, and checks
+# both give the same tokens. Exits with status 1 when they disagree.
+#
+#   python3 bench/source_bench.py [lines] [repeat]
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bin"))
+
+import rojo_interpreter as rojint
+
+def write_script(path, lines):
+    with open(path, "w") as file:
+        for k in range(lines):
+            file.write("int value_%d = (value_%d * 31 + %d.5) %% 1000003\n" % (k, k, k))
+
+def read_text(path):
+    with open(path, "r") as file:
+        return file.read()
+
+def lex(path, load):
+    tokens, error = rojint.Lexer(load(path), path).lex()
+    return [(tok.type, tok.value, tok.pos_start.ln, tok.pos_start.col) for tok in tokens], error
+
+def measure(path, load, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        rojint.Lexer(load(path), path).lex()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    # Peak of loading the source and keeping its tokens
+    tracemalloc.start()
+    rojint.Lexer(load(path), path).lex()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    fd, path = tempfile.mkstemp(suffix=".rojo")
+    os.close(fd)
+    try:
+        write_script(path, lines)
+        text_time, text_peak = measure(path, read_text, repeat)
+        map_time, map_peak = measure(path, rojint.map_source, repeat)
+        same = lex(path, read_text) == lex(path, rojint.map_source)
+    finally:
+        os.remove(path)
+
+    print("%d lines: read as text %.3f s, %.1f MB peak; memory-mapped %.3f s, %.1f MB peak (%.2fx)" % (
+        lines, text_time, text_peak / 1e6, map_time, map_peak / 1e6, text_time / map_time))
+    if not same:
+        print("Tokens lexed from the memory map differ from those of the text")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
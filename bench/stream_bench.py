@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+# Measures the peak memory of running a generated script with run() on its
+# whole text and with run_stream() on its lines, at two script sizes, and
+# checks both give the same result. Exits with status 1 when they disagree or
+# when the streamed peak grows with the size of the script.
+#
+#   python3 bench/stream_bench.py [statements] [growth_budget]
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bin"))
+
+import rojo_interpreter as rojint
+
+DEFAULT_GROWTH_BUDGET = 1.5
+
+def write_script(path, statements):
+    with open(path, "w") as file:
+        file.write("int a = 1\nfloat b = 0.5\n")
+        for k in range(statements // 2):
+            file.write("a = (a * 3 + %d) %% 1000003\nb = b / 1.25 + a %% 7\n\n" % (k))
+        file.write("a + b\n")
+
+def measure(workload):
+    rojint.global_symbol_table = rojint.SymbolTable()
+    tracemalloc.start()
+    start = time.perf_counter()
+    value, error = workload()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return repr(value) + repr(error), peak, elapsed
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_GROWTH_BUDGET
+
+    fd, path = tempfile.mkstemp(suffix=".rojo")
+    os.close(fd)
+
+    failed = False
+    peaks = []
+    try:
+        # Leave out what the first run of any script allocates once
+        write_script(path, 2)
+        with open(path, "r") as file:
+            rojint.run_stream(path, file, {"debug":False})
+
+        for size in (statements, statements * 4):
+            write_script(path, size)
+
+            def whole():
+                with open(path, "r") as file:
+                    return rojint.run(path, file.read(), {"debug":False})
+
+            def streamed():
+                with open(path, "r") as file:
+                    return rojint.run_stream(path, file, {"debug":False})
+
+            whole_result, whole_peak, whole_time = measure(whole)
+            stream_result, stream_peak, stream_time = measure(streamed)
+            peaks.append(stream_peak)
+
+            print("%7d statements: run() %.2f MB in %.2f s, run_stream() %.2f MB in %.2f s" % (
+                size, whole_peak / 1e6, whole_time, stream_peak / 1e6, stream_time))
+            if stream_result != whole_result:
+                print("Streamed result differs: %s, expected %s" % (stream_result, whole_result))
+                failed = True
+    finally:
+        os.remove(path)
+
+    growth = peaks[1] / peaks[0]
+    print("Streamed peak grew %.2fx for 4x the statements (budget %.2fx)" % (growth, budget))
+    if failed or growth > budget:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+# Times a skewed workload, where a few hundred distinct lines make up most of
+# the runs, with tiered execution off and on, and checks both give the same
+# result for every run. Exits with status 1 when they disagree.
+#
+#   python3 bench/tier_bench.py [runs] [repeat]
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bin"))
+
+import rojo_interpreter as rojint
+
+def expression(rng, depth):
+    if depth <= 0 or rng.random() < 0.2:
+        return rng.choice(["1", "7", "2.5", "x", "y", "(0 - x)"])
+    return "(" + expression(rng, depth - 1) + " " + rng.choice(["+", "-", "*", "/", "%"]) + " " + expression(rng, depth - 1) + ")"
+
+# Lines drawn from 300 distinct ones, the first few far more often than the
+# rest
+def workload(rng, runs):
+    distinct = [expression(rng, rng.randint(2, 5)) for i in range(290)]
+    distinct += ["x = x %% 1000 + %d" % (k) for k in range(10)]
+    weights = [1 / (k + 1) for k in range(len(distinct))]
+    return rng.choices(distinct, weights, k=runs)
+
+def run_lines(lines, threshold):
+    rojint.compiled_forms.clear()
+    rojint.global_symbol_table = rojint.SymbolTable()
+    rojint.global_symbol_table.set("int", "x", 12)
+    rojint.global_symbol_table.set("float", "y", 0.5)
+    settings = {"debug": False, "tier_threshold": threshold}
+
+    results = []
+    start = time.perf_counter()
+    for line in lines:
+        results.append(rojint.run("<bench>", line, dict(settings)))
+    elapsed = time.perf_counter() - start
+    return [(repr(value), repr(error)) for value, error in results], elapsed
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    lines = workload(random.Random(0), runs)
+    cold = tiered = None
+    failed = False
+    for i in range(repeat):
+        cold_results, cold_time = run_lines(lines, None)
+        tiered_results, tiered_time = run_lines(lines, rojint.TIER_THRESHOLD)
+        cold = cold_time if cold is None else min(cold, cold_time)
+        tiered = tiered_time if tiered is None else min(tiered, tiered_time)
+        if tiered_results != cold_results:
+            failed = True
+
+    print("%d runs of %d distinct lines: interpreter %.4f s, tiered %.4f s (%.2fx)" % (
+        runs, len(set(lines)), cold, tiered, cold / tiered))
+    if failed:
+        print("Tiered results differ from the interpreter's")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
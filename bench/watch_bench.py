@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+# Times how long a watched script takes to be reloaded and run again after
+# small edits (see bin/rojo_watch.py), and checks each run gives the result
+# of run() on the whole script. Exits with status 1 when they disagree or when
+# the slowest edit goes over the budget, in milliseconds.
+#
+#   python3 bench/watch_bench.py [statements] [budget_ms] [repeat]
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bin"))
+
+import rojo_interpreter as rojint
+import rojo_watch
+
+DEFAULT_BUDGET_MS = 50
+
+# Chains of updates to a few thousand variables, each reading a couple of them
+def script_lines(statements):
+    names = max(statements // 4, 1)
+    lines = ["int v%d = %d\n" % (k, k) for k in range(names)]
+    for k in range(statements - names):
+        lines.append("v%d = (v%d * 31 + v%d) %% 1000003\n" % (k % names, k % names, (k * 7) % names))
+    lines.append("v0 + v1\n")
+    return lines
+
+# Edits as (name, function changing the lines in place)
+def edits(statements):
+    middle = statements // 2
+    return [
+        ("unchanged", lambda lines: None),
+        ("edit middle", lambda lines: lines.__setitem__(middle, "v3 = v3 + 1\n")),
+        ("undo edit", lambda lines: lines.__setitem__(middle, script_lines(statements)[middle])),
+        ("insert at top", lambda lines: lines.insert(1, "\n")),
+        ("delete at top", lambda lines: lines.pop(1)),
+        ("edit end", lambda lines: lines.__setitem__(-2, "v5 = 2\n")),
+    ]
+
+def write(path, lines):
+    with open(path, "w") as file:
+        file.write("".join(lines))
+
+def fresh_run(path):
+    rojint.global_symbol_table = rojint.SymbolTable()
+    with open(path, "r") as file:
+        value, error = rojint.run(path, file.read(), {"debug":False})
+    return repr(value) + repr(error)
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_BUDGET_MS
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    fd, path = tempfile.mkstemp(suffix=".rojo")
+    os.close(fd)
+
+    failed = False
+    try:
+        parent = rojint.SymbolTable()
+        session = rojo_watch.WatchSession(path, {})
+        write(path, script_lines(statements))
+
+        start = time.perf_counter()
+        session.load()
+        session.run(parent)
+        print("%d statements: first run %.3f s" % (session.statements, time.perf_counter() - start))
+
+        # Each pass goes back to the script as written, then times every edit
+        # once, keeping the best time of each over the passes
+        names = [name for name, edit in edits(statements)]
+        best = {}
+        ran = {}
+        for i in range(repeat):
+            lines = script_lines(statements)
+            write(path, lines)
+            session.load()
+            session.run(parent)
+
+            for name, edit in edits(statements):
+                edit(lines)
+                write(path, lines)
+                session.stamp = False
+
+                start = time.perf_counter()
+                session.load()
+                value, error = session.run(parent)
+                elapsed = time.perf_counter() - start
+
+                best[name] = min(best.get(name, elapsed), elapsed)
+                ran[name] = session.ran
+                if i == 0 and repr(value) + repr(error) != fresh_run(path):
+                    print("  %s: result differs from run(): %s" % (name, repr(value) + repr(error)))
+                    failed = True
+
+        for name in names:
+            print("  %-14s %6.1f ms, ran %d statements" % (name, best[name] * 1000, ran[name]))
+        slowest = max(best.values())
+    finally:
+        os.remove(path)
+
+    print("Slowest edit %.1f ms (budget %.0f ms)" % (slowest * 1000, budget))
+    if failed or slowest * 1000 > budget:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+########################################
+# IMPORTS
+########################################
+
+import collections
+import json
+import re
+import sys
+
+import rojo_interpreter as rojint
+
+########################################
+# CONSTANTS
+########################################
+
+CHUNK_LINES = 1024
+OUTPUT_BUFFER = 1 << 16
+
+# Chunks handed to the pool per worker before waiting for the oldest
+CHUNKS_AHEAD = 2
+
+# A `+` that can only be unary
+UNARY_PLUS = re.compile(r"(?:^|[-+*/%=(])\s*\+")
+
+########################################
+# EVALUATION
+########################################
+
+# Input records are (line_number, text) pairs. In JSONL mode each text is one
+# JSON document, either a string of code or an object {"code": ..., "id": ...}
+# whose id is echoed back in the result.
+def evaluate_record(n, text, jsonl):
+    record = {"n": n}
+
+    code, details = record_code(text, jsonl, record)
+    if details is not None:
+        record["ok"] = False
+        record["error"] = "BatchInputError"
+        record["details"] = details
+        return json.dumps(record)
+
+    result, error = rojint.run("<stdin>", code, {"debug":False})
+
+    return json.dumps(describe_result(record, result, error))
+
+# The code of a record and None, or None and why the record has none. Copies
+# the record's id to `record` if it has one.
+def record_code(text, jsonl, record):
+    if not jsonl:
+        return text, None
+
+    try:
+        item = json.loads(text)
+    except ValueError as e:
+        return None, str(e)
+
+    code = item
+    if isinstance(item, dict):
+        code = item.get("code")
+        if "id" in item:
+            record["id"] = item["id"]
+
+    if not isinstance(code, str):
+        return None, "Expected a string of code"
+    return code, None
+
+# Whether running `code` may change what later lines see: assignments, and
+# unary `+`, which moves the position kept with a variable's value. Errs
+# towards yes.
+def may_change_globals(code):
+    return "=" in code or UNARY_PLUS.search(code) is not None
+
+# Adds the outcome of a run() to a result record
+def describe_result(record, result, error):
+    if error:
+        record["ok"] = False
+        record["error"] = error.error_name
+        record["details"] = error.details
+        record["ln"] = error.pos_start.ln + 1
+        record["col"] = error.pos_start.col
+    else:
+        record["ok"] = True
+        record["type"] = result.type.lower()
+        record["value"] = str(result)
+
+    return record
+
+def evaluate_chunk(chunk):
+    lines, jsonl = chunk
+    return "".join([evaluate_record(n, text, jsonl) + "\n" for n, text in lines])
+
+def chunk_changes_globals(chunk):
+    lines, jsonl = chunk
+    for n, text in lines:
+        code, details = record_code(text, jsonl, {})
+        if code is not None and may_change_globals(code):
+            return True
+    return False
+
+# Name of the SharedSymbolTable this worker process reads its globals from
+attached = None
+
+def evaluate_shared_chunk(chunk, name):
+    global attached
+
+    if attached != name:
+        if attached is not None:
+            rojint.global_symbol_table.parent.close()
+        rojint.attach_shared_globals(name)
+        attached = name
+
+    return evaluate_chunk(chunk)
+
+def read_chunks(stream, jsonl):
+    chunk = []
+
+    for n, text in enumerate(stream, 1):
+        text = text.strip()
+        if len(text) == 0:
+            continue
+
+        chunk.append((n, text))
+        if len(chunk) == CHUNK_LINES:
+            yield chunk, jsonl
+            chunk = []
+
+    if len(chunk) != 0:
+        yield chunk, jsonl
+
+########################################
+# ENTRY
+########################################
+
+# Evaluates every non-empty line of `stream` and writes one JSON result per
+# line to `out`, in input order. With jobs > 1 the chunks are spread over a
+# pool of worker processes, which read the session's variables from one
+# SharedSymbolTable rather than each holding a copy. A chunk that may change
+# the variables (see may_change_globals) waits for the chunks before it and is
+# evaluated by this process, and the chunks after it read a new table, so the
+# results are those of jobs = 1.
+def run_batch(stream=None, out=None, jsonl=False, jobs=1):
+    if stream is None:
+        stream = sys.stdin
+    if out is None:
+        out = open(sys.stdout.fileno(), "w", buffering=OUTPUT_BUFFER, closefd=False)
+
+    if jobs > 1:
+        run_parallel(stream, out, jsonl, jobs)
+    else:
+        for chunk in read_chunks(stream, jsonl):
+            out.write(evaluate_chunk(chunk))
+
+    out.flush()
+
+def run_parallel(stream, out, jsonl, jobs):
+    import multiprocessing
+    from multiprocessing import resource_tracker
+
+    # Workers attaching to a table register it with the resource tracker they
+    # inherit. Without one running yet each would start its own, which unlinks
+    # the table when the worker exits, so this process starts it first.
+    resource_tracker.ensure_running()
+
+    shared = None
+    pending = collections.deque()
+    try:
+        with multiprocessing.Pool(jobs) as pool:
+            for chunk in read_chunks(stream, jsonl):
+                if chunk_changes_globals(chunk):
+                    while pending:
+                        out.write(pending.popleft().get())
+                    out.write(evaluate_chunk(chunk))
+
+                    if shared is not None:
+                        shared.close()
+                        shared.unlink()
+                        shared = None
+                    continue
+
+                if shared is None:
+                    shared = rojint.SharedSymbolTable.create(rojint.global_symbol_table)
+                pending.append(pool.apply_async(evaluate_shared_chunk, (chunk, shared.name)))
+                if len(pending) > jobs * CHUNKS_AHEAD:
+                    out.write(pending.popleft().get())
+
+            while pending:
+                out.write(pending.popleft().get())
+    finally:
+        if shared is not None:
+            shared.close()
+            shared.unlink()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+########################################
+# IMPORTS
+########################################
+
+import copy
+
+import rojo_interpreter as rojint
+
+########################################
+# LINES
+########################################
+
+# The Source of one line, holding the line break before it unless it is the
+# first, like those of run_stream(). It remembers the line it was lexed on, as
+# that is the line its positions have.
+class LineSource(rojint.Source):
+    def __init__(self, name, line, ln):
+        if ln == 0:
+            super().__init__(name, line)
+        else:
+            super().__init__(name, "\n" + line, ln - 1)
+        self.lexed_line = self.first_line
+
+    # Position of the first character of the line
+    def start(self):
+        if self.text.startswith("\n"):
+            return rojint.Position(1, self.first_line + 1, 0, self)
+        return rojint.Position(0, 0, 0, self)
+
+# One line of a file, with its line break if it has one, lexed and parsed on
+# its own LineSource. A statement takes one line, so the line holds its tokens
+# and its statement (None for a blank line), or the error lexing or parsing it
+# stopped at.
+class DocumentLine:
+    def __init__(self, fname, text, ln):
+        self.text = text
+        self.first = ln == 0
+        self.source = LineSource(fname, text, ln)
+        self.tokens = []
+        self.statement = None
+        self.error = None
+        self.lexing_error = False
+
+        lexer = rojint.Lexer(self.source.text, fname, self.source.start())
+        tokens = self.tokens
+        while True:
+            token, error = lexer.next_token()
+            if error:
+                self.error = error
+                self.lexing_error = True
+                return
+            if token.type in (rojint.TT_NEWLINE, rojint.TT_EOF):
+                break
+            tokens.append(token)
+
+        if not tokens:
+            return
+        tokens.append(token)
+        if token.type == rojint.TT_NEWLINE:
+            tokens.append(rojint.Token(rojint.TT_EOF, pos_start=token.pos_end))
+
+        self.statement, self.error = rojint.parse_line(tokens)
+
+    # The line number its positions have
+    def lexed_ln(self):
+        return self.source.lexed_line + (0 if self.first else 1)
+
+# The error of a line that is now line `ln`, with its positions moved there
+def error_on_line(line, ln):
+    shift = ln - line.lexed_ln()
+    error = copy.copy(line.error)
+    if shift:
+        for name in ("pos_start", "pos_end"):
+            pos = getattr(error, name)
+            setattr(error, name, rojint.Position(pos.idx, pos.ln + shift, pos.col, pos.source))
+    return error
+
+########################################
+# DOCUMENT
+########################################
+
+# A long-lived, editable source file, kept as a list of DocumentLines. An edit
+# lexes and parses again only the lines it touches: the lines after it keep
+# their tokens and statements, whose positions are those of the line they were
+# lexed on, and only the errors reported by diagnostics() are moved to the
+# line they are on now, which the document keeps for the lines with errors.
+# The cost of an edit depends on the lines it touches and the number of lines
+# with errors, not on the size of the document.
+class Document:
+    def __init__(self, fname, text):
+        self.fname = fname
+        self.reset(text)
+
+    @property
+    def text(self):
+        return "".join([line.text for line in self.lines])
+
+    def reset(self, text):
+        parts = text.split("\n")
+        self.lines = [self.new_line(part + "\n", ln) for ln, part in enumerate(parts[:-1])]
+        self.lines.append(self.new_line(parts[-1], len(parts) - 1))
+        # Line: where it is now, for the lines with errors
+        self.errors = dict([(line, ln) for ln, line in enumerate(self.lines) if line.error])
+        self.statements = sum([line.statement is not None for line in self.lines])
+
+    def new_line(self, text, ln):
+        return DocumentLine(self.fname, text, ln)
+
+    ########################################
+
+    # Like lexing and parsing the whole text, the first illegal character if
+    # there is one, and otherwise the first syntax error
+    def diagnostics(self):
+        if not self.errors:
+            if self.statements == 0:
+                # Text without statements is a syntax error of its own
+                return [rojint.parse(self.fname, self.text, {})[1]]
+            return []
+
+        lexing = [(ln, line) for line, ln in self.errors.items() if line.lexing_error]
+        ln, line = min(lexing or [(ln, line) for line, ln in self.errors.items()], key=lambda item: item[0])
+        return [error_on_line(line, ln)]
+
+    ########################################
+
+    # Replaces the text from column start_col of line start_ln to column
+    # end_col of line end_ln, counting as LSP does: a line past the end is the
+    # end of the text, and a column past the end of a line is its end
+    def edit(self, start_ln, start_col, end_ln, end_col, new_text):
+        lines = self.lines
+        last = len(lines) - 1
+        if start_ln > last:
+            start_ln, start_col = last, len(lines[last].text)
+        if end_ln > last:
+            end_ln, end_col = last, len(lines[last].text)
+        start_col = min(start_col, len(lines[start_ln].text.rstrip("\n")))
+        end_col = min(end_col, len(lines[end_ln].text.rstrip("\n")))
+
+        text = lines[start_ln].text[:start_col] + new_text + lines[end_ln].text[end_col:]
+        parts = text.split("\n")
+        new_lines = [self.new_line(part + "\n", start_ln + i) for i, part in enumerate(parts[:-1])]
+
+        # The replaced lines end with a line break unless they end the text,
+        # and only then does anything follow the last one
+        if end_ln == last:
+            new_lines.append(self.new_line(parts[-1], start_ln + len(new_lines)))
+
+        errors = self.errors
+        for line in lines[start_ln:end_ln + 1]:
+            errors.pop(line, None)
+            self.statements -= line.statement is not None
+
+        shift = len(new_lines) - (end_ln + 1 - start_ln)
+        if shift:
+            for line, ln in errors.items():
+                if ln > end_ln:
+                    errors[line] = ln + shift
+
+        for i, line in enumerate(new_lines):
+            if line.error:
+                errors[line] = start_ln + i
+            self.statements += line.statement is not None
+        lines[start_ln:end_ln + 1] = new_lines
@@ -9,31 +9,18 @@
 
 import sys
 import os
-
-########################################
-# GLOBAL EXCEPTION HANDLER
-########################################
-
-def my_except_hook(exctype, value, traceback):
-    print("\033[1m\033[31mRojoInternals Error:\033[0m\n" + exctype.__name__ + ": " + str(value) + "\n" + traceback)
-
-    args = []
-
-    for i in range(len(sys.argv)-1):
-        args.append(sys.argv[i+1])
-    if len(args) != 0:
-        approved = args.copy()
-        for i in range(len(approved)):
-            if approved[i].startswith("--private_"):
-                approved.pop(i)
-                i -= 1
-
-    args.insert(0, "--private_revived")
-    args.insert(0, "arg_placeholder")
-    print("\033[1m\033[35mReviving...\033[0m")
-    os.execvp(sys.argv[0], args)
-
-sys.excepthook = my_except_hook
+import time
+import types
+import marshal
+import struct
+import bisect
+import json
+import re
+import operator
+import collections
+import itertools
+import gc
+import zlib
 
 ########################################
 # EXTERNALS
@@ -49,28 +36,44 @@ DIGITS = '0123456789'
 VARNAME_START = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_$"
 VARNAME_INTER = VARNAME_START + DIGITS
 
+# Integer results estimated to be larger than this many bits are considered
+# expensive enough to hand to an executor when evaluating asynchronously
+EXPENSIVE_INT_BITS = 1 << 16
+
+# Sources longer than this many characters are lexed and parsed on the
+# executor when evaluating asynchronously
+EXPENSIVE_SOURCE_CHARS = 1 << 16
+
+# Largest integer product done in one go when such work may need to stop part
+# way (see stepwise_mul)
+STEP_INT_BITS = 1 << 18
+
 ########################################
 # UTILITIES
 ########################################
 
 # Code by CodePulse/David Callanan
 # Modified for styling purposes
-def arrow_string(text, pos_start, pos_end):
+def arrow_string(source, pos_start, pos_end):
     result = ''
 
     # Calculate indices
-    idx_start = max(text.rfind('\n', 0, pos_start.idx), 0)
-    idx_end = text.find('\n', idx_start + 1)
-    if idx_end < 0:
-        idx_end = len(text)
+    idx_start = max(source.line_start(source.line_of(pos_start.idx)) - 1, 0)
+    idx_end = source.next_newline(idx_start + 1)
 
     # Generate each line
     line_count = pos_end.ln - pos_start.ln + 1
     for i in range(line_count):
         # Calculate line columns
-        line = text[idx_start:idx_end]
-        col_start = pos_start.col if i == 0 else 0
-        col_end = pos_end.col if i == line_count - 1 else len(line) - 1
+        line = source.text[idx_start:idx_end]
+        if not isinstance(line, str):
+            # Shown like the line of a file read as text
+            line = line.decode("utf-8", "replace")
+            if line.endswith("\r") and source.text[idx_end:idx_end + 1] == b"\n":
+                line = line[:-1]
+            line = line.replace("\r", "\n")
+        col_start = source.char_col(pos_start.ln, pos_start.col) if i == 0 else 0
+        col_end = source.char_col(pos_end.ln, pos_end.col) if i == line_count - 1 else len(line) - 1
 
         # Append to result
         result += line + '\n'
@@ -78,12 +81,26 @@ def arrow_string(text, pos_start, pos_end):
 
         # Re-calculate indices
         idx_start = idx_end
-        idx_end = text.find('\n', idx_start + 1)
-        if idx_end < 0:
-            idx_end = len(text)
+        idx_end = source.next_newline(idx_start + 1)
 
     return result.replace('\t', '')
 
+# Cheap upper bound on the bit length of an integer `*` or `**` result, computed
+# without performing the operation. Anything that is not integer arithmetic is
+# estimated as 0 bits.
+def estimate_int_bits(op_type, left, right):
+    if not numeric.is_int(left.value) or not numeric.is_int(right.value):
+        return 0
+
+    if op_type == TT_MUL:
+        return left.value.bit_length() + right.value.bit_length()
+    if op_type == TT_POW:
+        if right.value < 0 or abs(left.value) <= 1:
+            return 1
+        return left.value.bit_length() * right.value
+
+    return 0
+
 ########################################
 # ERRORS
 ########################################
@@ -98,10 +115,21 @@ class Error:
     def __repr__(self):
         result  = f'{self.error_name}{": " if self.details != "" else ""}{self.details}\n'
         result += f'File {self.pos_start.fname}, line {self.pos_start.ln + 1}'
-        result += '\n\n' + arrow_string(self.pos_start.ftxt, self.pos_start, self.pos_end)
+        result += '\n\n' + arrow_string(self.pos_start.source, self.pos_start, self.pos_end)
 
         return result
 
+    def as_dict(self):
+        return {
+            "error": self.error_name,
+            "details": self.details,
+            "fname": self.pos_start.fname,
+            "ln": self.pos_start.ln + 1,
+            "col": self.pos_start.col,
+            "end_ln": self.pos_end.ln + 1,
+            "end_col": self.pos_end.col,
+        }
+
 class IllegalCharacterError(Error):
     def __init__(self, pos_start, pos_end, details=''):
         super().__init__(pos_start, pos_end, 'IllegalCharacterError', details)
@@ -118,21 +146,22 @@ class RuntimeError(Error):
     def __repr__(self):
         result  = self.generate_traceback()
         result += f'{self.error_name}{": " if self.details != "" else ""}{self.details}'
-        result += '\n\n' + arrow_string(self.pos_start.ftxt, self.pos_start, self.pos_end)
+        result += '\n\n' + arrow_string(self.pos_start.source, self.pos_start, self.pos_end)
 
         return result
 
     def generate_traceback(self):
-        result = ''
+        frames = []
         pos = self.pos_start
         ctx = self.context
 
         while ctx:
-            result = f'  File {pos.fname}, line {str(pos.ln + 1)}, in {ctx.display_name}\n' + result
+            frames.append(f'  File {pos.fname}, line {str(pos.ln + 1)}, in {ctx.display_name}\n')
             pos = ctx.parent_entry_pos
             ctx = ctx.parent
 
-        return "Stack trace (Most recent last):\n" + result
+        frames.reverse()
+        return "Stack trace (Most recent last):\n" + "".join(frames)
 
 class DivisionByZeroError(RuntimeError):
     def __init__(self, pos_start, pos_end, context, details=''):
@@ -154,17 +183,108 @@ class TypeError_(RuntimeError):
     def __init__(self, pos_start, pos_end, context, details=''):
         super().__init__(pos_start, pos_end, context, "TypeError", details)
 
+class ResourceLimitError(RuntimeError):
+    def __init__(self, pos_start, pos_end, context, details=''):
+        super().__init__(pos_start, pos_end, context, "ResourceLimitError", details)
+
+class RojoInternalError(Error):
+    def __init__(self, pos_start, pos_end, exc, node=None):
+        super().__init__(pos_start, pos_end, 'RojoInternalError', type(exc).__name__ + ": " + str(exc))
+        self.exc_type = type(exc).__name__
+        self.node = node
+        import traceback
+
+        self.traceback = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+
+# Wraps an unexpected Python exception raised while handling `code` so that it
+# is reported like any other Rojo error instead of taking the process down.
+# The span is that of the innermost node being handled when the exception was
+# raised, which every visit() and compiled closure it escapes sets as its
+# `rojo_node` unless one inside it already did (Inline, as a call could raise
+# RecursionError again), or the whole source if no node was involved. A source that starts part way through a
+# script gives the line it starts on as first_line.
+def internal_error(fname, code, exc, first_line=0):
+    node = getattr(exc, "rojo_node", None)
+    if node is not None:
+        return RojoInternalError(node.pos_start, node.pos_end, exc, node)
+
+    source = Source(fname, code, first_line)
+    ln, col = source.line_col(len(code))
+    pos_start = Position(0, first_line, 0, source)
+    pos_end = Position(len(code), ln, col, source)
+    return RojoInternalError(pos_start, pos_end, exc)
+
 ########################################
 # POSITION
 ########################################
 
+# The name and text of one source, shared by every Position in it. The index
+# of line start offsets is built the first time a line lookup needs it and
+# turns each lookup into a bisection. The text may be a piece of a larger
+# script starting on line first_line (see STREAMING); offsets are always into
+# the text itself. It is a str, or UTF-8 bytes for sources lexed by ByteLexer,
+# in which case offsets and columns count bytes, and a line ends at a LF, a
+# CRLF or a lone CR, as in a file read as text.
+class Source:
+    def __init__(self, name, text, first_line=0):
+        self.name = name
+        self.text = text
+        self.first_line = first_line
+        self.line_starts = None
+
+    def lines(self):
+        if self.line_starts is None:
+            if isinstance(self.text, str):
+                starts = [0]
+                idx = self.text.find("\n")
+                while idx != -1:
+                    starts.append(idx + 1)
+                    idx = self.text.find("\n", idx + 1)
+            else:
+                starts = [0] + [match.end() for match in BYTE_LINE_BREAK.finditer(self.text)]
+            self.line_starts = starts
+
+        return self.line_starts
+
+    def line_of(self, idx):
+        return bisect.bisect_right(self.lines(), idx) - 1 + self.first_line
+
+    def line_col(self, idx):
+        ln = self.line_of(idx)
+        return ln, idx - self.line_starts[ln - self.first_line]
+
+    def line_start(self, ln):
+        return self.lines()[ln - self.first_line]
+
+    # Column `col` of line `ln` counted in characters rather than bytes, where
+    # each column past the end of the text is one character
+    def char_col(self, ln, col):
+        if isinstance(self.text, str):
+            return col
+        start = self.line_start(ln)
+        prefix = self.text[start:start + col]
+        return len(prefix.decode("utf-8", "replace")) + col - len(prefix)
+
+    # Index of the first newline at or after idx, or the length of the text
+    def next_newline(self, idx):
+        starts = self.lines()
+        i = bisect.bisect_left(starts, idx + 1)
+        return starts[i] - 1 if i < len(starts) else len(self.text)
+
 class Position:
-    def __init__(self, idx, ln, col, fname, ftxt):
+    def __init__(self, idx, ln, col, source):
         self.idx = idx
         self.ln = ln
         self.col = col
-        self.fname = fname
-        self.ftxt = ftxt
+        self.source = source
+
+    @property
+    def fname(self):
+        return self.source.name
+
+    @property
+    def ftxt(self):
+        return self.source.text
 
     def advance(self, current_char=None):
         self.idx += 1
@@ -177,7 +297,7 @@ class Position:
         return self
 
     def copy(self):
-        return Position(self.idx, self.ln, self.col, self.fname, self.ftxt)
+        return Position(self.idx, self.ln, self.col, self.source)
 
 ########################################
 # TOKENS
@@ -196,6 +316,7 @@ TT_POW         = "POW"
 TT_EQ          = "EQ"
 TT_LPAREN      = "LPAREN"
 TT_RPAREN      = "RPAREN"
+TT_NEWLINE     = "NEWLINE"
 TT_EOF         = "EOF"
 
 TT_ERROR       = "ERROR"
@@ -230,9 +351,24 @@ class Token:
 ########################################
 
 class Lexer:
-    def __init__(self, code, fname):
+    # Bytes and other buffers, such as a memory-mapped file (see
+    # map_source()), are lexed in place by ByteLexer
+    def __new__(cls, code, fname, pos_start=None):
+        if cls is Lexer and not isinstance(code, str):
+            cls = ByteLexer
+        return super().__new__(cls)
+
+    def __init__(self, code, fname, pos_start=None):
         self.code = code
-        self.pos = Position(-1, 0, -1, fname, code)
+
+        # Lexing may begin part way through `code`, e.g. when re-lexing an
+        # edited region of a document, in which case the tokens share the
+        # Source of pos_start
+        if pos_start is None:
+            self.pos = Position(-1, 0, -1, Source(fname, code))
+        else:
+            self.pos = Position(pos_start.idx - 1, pos_start.ln, pos_start.col - 1, pos_start.source)
+
         self.current_char = None
         self.advance()
 
@@ -240,67 +376,91 @@ class Lexer:
         self.pos.advance(self.current_char)
         self.current_char = self.code[self.pos.idx] if self.pos.idx < len(self.code) else None
 
+    # The code from start to end, e.g. the text of a token
+    def text(self, start, end):
+        return self.code[start:end]
+
+    # The whole character at the current position, for error details
+    def char_text(self):
+        return self.current_char
+
     def lex(self):
         tokens = []
 
-        while self.current_char is not None:
-            if self.current_char in ' \t':
-                # Skip whitespace
-                self.advance()
-            elif self.current_char in DIGITS:
-                token, error = self.make_number()
+        while True:
+            token, error = self.next_token()
+            tokens.append(token)
 
-                if error:
-                    tokens.append(Token(TT_ERROR, self.current_char))
-                    return tokens, error
-
-                tokens.append(token)
-            elif self.current_char in VARNAME_START:
-                tokens.append(self.make_identifier())
-            elif self.current_char == "+":
-                tokens.append(Token(TT_PLUS, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == "-":
-                tokens.append(Token(TT_MINUS, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == "*":
-                tokens.append(self.make_pow_or_mul())
-            elif self.current_char == "/":
-                tokens.append(Token(TT_DIV, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == "%":
-                tokens.append(Token(TT_MOD, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == "(":
-                tokens.append(Token(TT_LPAREN, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == ")":
-                tokens.append(Token(TT_RPAREN, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == "=":
-                tokens.append(Token(TT_EQ, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == ".":
-                token, error = self.make_number()
+            if error:
+                return tokens, error
+            if token.type == TT_EOF:
+                return tokens, None
 
-                if error:
-                    tokens.append(Token(TT_ERROR, self.current_char))
-                    return tokens, error
+    def next_token(self):
+        # Skip whitespace
+        while self.current_char is not None and self.current_char in ' \t':
+            self.advance()
 
-                tokens.append(token)
-            else:
-                pos_start = self.pos.copy()
-                char = self.current_char
-                self.advance()
+        if self.current_char is None:
+            return Token(TT_EOF, pos_start=self.pos), None
+        elif self.current_char in DIGITS:
+            token, error = self.make_number()
+
+            if error:
+                return Token(TT_ERROR, self.current_char), error
+
+            return token, None
+        elif self.current_char in VARNAME_START:
+            return self.make_identifier(), None
+        elif self.current_char == "+":
+            token = Token(TT_PLUS, pos_start=self.pos)
+            self.advance()
+            return token, None
+        elif self.current_char == "-":
+            token = Token(TT_MINUS, pos_start=self.pos)
+            self.advance()
+            return token, None
+        elif self.current_char == "*":
+            return self.make_pow_or_mul(), None
+        elif self.current_char == "/":
+            token = Token(TT_DIV, pos_start=self.pos)
+            self.advance()
+            return token, None
+        elif self.current_char == "%":
+            token = Token(TT_MOD, pos_start=self.pos)
+            self.advance()
+            return token, None
+        elif self.current_char == "(":
+            token = Token(TT_LPAREN, pos_start=self.pos)
+            self.advance()
+            return token, None
+        elif self.current_char == ")":
+            token = Token(TT_RPAREN, pos_start=self.pos)
+            self.advance()
+            return token, None
+        elif self.current_char == "=":
+            token = Token(TT_EQ, pos_start=self.pos)
+            self.advance()
+            return token, None
+        elif self.current_char == "\n":
+            token = Token(TT_NEWLINE, pos_start=self.pos)
+            self.advance()
+            return token, None
+        elif self.current_char == ".":
+            token, error = self.make_number()
+
+            if error:
+                return Token(TT_ERROR, self.current_char), error
 
-                tokens.append(Token(TT_ERROR, char))
-                return tokens, IllegalCharacterError(pos_start, self.pos, "'" + char + "'")
+            return token, None
+
+        pos_start = self.pos.copy()
+        char = self.char_text()
+        self.advance()
 
-        tokens.append(Token(TT_EOF, pos_start=self.pos))
-        return tokens, None
+        return Token(TT_ERROR, char), IllegalCharacterError(pos_start, self.pos, "'" + char + "'")
 
     def make_number(self):
-        num_str = ''
         dot = False
         pos_start = self.pos.copy()
 
@@ -309,20 +469,21 @@ class Lexer:
                 if dot:
                     break
                 dot = True
-                num_str += "."
-            else:
-                num_str += self.current_char
 
             self.advance()
 
+        num_str = self.text(pos_start.idx, self.pos.idx)
+
+        if num_str == '.' and self.current_char is None:
+            return None, IllegalCharacterError(pos_start, self.pos.copy(), "'.'")
         if num_str == '.':
             return None, IllegalCharacterError(
                 pos_start.advance(), self.pos.copy().advance(),
-                "'" + self.current_char + "'"
+                "'" + self.char_text() + "'"
             )
 
         if not dot:
-            return Token(TT_INT, int(num_str), pos_start, self.pos), None
+            return Token(TT_INT, numeric.to_int(num_str), pos_start, self.pos), None
         return Token(TT_FLOAT, float(num_str), pos_start, self.pos), None
 
     def make_pow_or_mul(self):
@@ -336,24 +497,96 @@ class Lexer:
         return Token(TT_MUL, pos_start=pos_start, pos_end=self.pos)
 
     def make_identifier(self):
-        id_str = ''
         pos_start = self.pos.copy()
 
         while self.current_char != None and self.current_char in VARNAME_INTER:
-            id_str += self.current_char
             self.advance()
 
+        id_str = self.text(pos_start.idx, self.pos.idx)
         tok_type = TT_KEYWORD if id_str in KEYWORDS else TT_IDENTIFIER
         return Token(tok_type, id_str, pos_start, self.pos)
 
+# Characters of the bytes below 128; the rest start or continue multi-byte
+# UTF-8 characters, none of which can be part of a token
+BYTE_CHARS = [chr(byte) for byte in range(128)] + ["\x80"] * 128
+
+BYTE_LINE_BREAK = re.compile(b"\r\n?|\n")
+
+# Lexes UTF-8 bytes, or any buffer that can be indexed, sliced and searched
+# like bytes (bytearray, mmap.mmap), without decoding them as a whole: each
+# byte is looked up in BYTE_CHARS, and only the text of identifier and number
+# tokens and of error details is decoded. Like a file read as text, a CRLF
+# line break is one line break, starting at the CR, and a lone CR is a line
+# break too.
+class ByteLexer(Lexer):
+    def __init__(self, code, fname, pos_start=None):
+        self.length = len(code)
+        self.crlf = False
+        super().__init__(code, fname, pos_start)
+
+    def advance(self):
+        self.pos.advance(self.current_char)
+        if self.crlf:
+            # Step over the LF after the CR
+            self.pos.idx += 1
+
+        idx = self.pos.idx
+        if idx < self.length:
+            byte = self.code[idx]
+            self.crlf = byte == 13 and idx + 1 < self.length and self.code[idx + 1] == 10
+            self.current_char = "\n" if byte == 13 else BYTE_CHARS[byte]
+        else:
+            self.crlf = False
+            self.current_char = None
+
+    def text(self, start, end):
+        return self.code[start:end].decode("ascii")
+
+    def char_text(self):
+        if self.current_char == "\n":
+            return "\n"
+
+        idx = self.pos.idx
+        byte = self.code[idx]
+        size = 1 if byte < 0xc0 else 2 if byte < 0xe0 else 3 if byte < 0xf0 else 4
+        return self.code[idx:idx + size].decode("utf-8", "replace")[:1]
+
+# The contents of the file at `path` as a read-only memory map, which
+# ByteLexer and Source scan in place and the OS pages in as it is read. Files
+# that cannot be mapped, such as empty ones and pipes, are read into bytes.
+def map_source(path):
+    import mmap
+
+    with open(path, "rb") as file:
+        try:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            return file.read()
+
 ########################################
 # NODES
 ########################################
 
+# Only used for two or more statements, a single statement is its own node
+class StatementsNode:
+    def __init__(self, statements):
+        self.statements = statements
+        self.static_type = None
+
+        self.pos_start = self.statements[0].pos_start
+        self.pos_end = self.statements[-1].pos_end
+
+    def __repr__(self):
+        return 'StatementsNode:[' + ', '.join([str(statement) for statement in self.statements]) + ']'
+
 class AbstractSyntaxTree:
     def __init__(self, node=None):
         self.node = node
 
+        if self.node is not None:
+            self.pos_start = self.node.pos_start
+            self.pos_end = self.node.pos_end
+
     def __repr__(self):
         return str(self.node)
 
@@ -363,6 +596,7 @@ class ValueNode:
 class IntegerNode(ValueNode):
     def __init__(self, tok):
         self.tok = tok
+        self.static_type = TT_INT
 
         self.pos_start = self.tok.pos_start
         self.pos_end = self.tok.pos_end
@@ -373,6 +607,7 @@ class IntegerNode(ValueNode):
 class FloatNode(ValueNode):
     def __init__(self, tok):
         self.tok = tok
+        self.static_type = TT_FLOAT
 
         self.pos_start = self.tok.pos_start
         self.pos_end = self.tok.pos_end
@@ -383,6 +618,7 @@ class FloatNode(ValueNode):
 class VarAccessNode:
     def __init__(self, var_name_tok):
         self.var_name_tok = var_name_tok
+        self.static_type = None
 
         self.pos_start = self.var_name_tok.pos_start
         self.pos_end = self.var_name_tok.pos_end
@@ -396,6 +632,8 @@ class VarAssignNode:
         self.var_name_tok = var_name_tok
         self.value = value
         self.used_type = self.type is not None
+        self.static_type = None
+        self.type_proven = False
 
         if self.type:
             self.pos_start = self.type.pos_start
@@ -412,6 +650,7 @@ class BinOpNode:
         self.left_node = left_node
         self.op_tok = op_tok
         self.right_node = right_node
+        self.static_type = None
 
         self.pos_start = self.left_node.pos_start
         self.pos_end = self.right_node.pos_end
@@ -423,6 +662,7 @@ class UnaryOpNode:
     def __init__(self, op_tok, node):
         self.op_tok = op_tok
         self.node = node
+        self.static_type = None
 
         self.pos_start = self.op_tok.pos_start
         self.pos_end = self.node.pos_end
@@ -474,18 +714,64 @@ class Parser:
     ########################################
 
     def parse(self):
-        res = self.var_def()
+        res = self.statements()
         if not res.error and self.current_tok.type != TT_EOF:
-            return res.failure(InvalidSyntaxError(
-                self.current_tok.pos_start, self.current_tok.pos_end,
-                "Expected '+', '-', '*', '/',  '**'"
-            )).node, res.error
+            return res.failure(self.expected_operator()).node, res.error
         if res.error:
             return AbstractSyntaxTree(res.node), res.error
         return AbstractSyntaxTree(res.node), res.error
 
+    # Parses a piece of a script cut at a line break, which may hold no
+    # statements, and returns the list of its statements
+    def parse_chunk(self):
+        res = self.statement_list(False)
+        if not res.error and self.current_tok.type != TT_EOF:
+            return None, self.expected_operator()
+        return res.node, res.error
+
+    def expected_operator(self):
+        return InvalidSyntaxError(
+            self.current_tok.pos_start, self.current_tok.pos_end,
+            "Expected '+', '-', '*', '/',  '**'"
+        )
+
     ########################################
 
+    def statements(self):
+        res = ParseResult()
+
+        statements = res.register(self.statement_list(True))
+        if res.error:
+            return res
+
+        if len(statements) == 1:
+            return res.success(statements[0])
+        return res.success(StatementsNode(statements))
+
+    def statement_list(self, required):
+        res = ParseResult()
+        statements = []
+
+        while self.current_tok.type == TT_NEWLINE:
+            res.register(self.advance())
+        if not required and self.current_tok.type == TT_EOF:
+            return res.success(statements)
+
+        while True:
+            statement = res.register(self.var_def())
+            if res.error:
+                return res
+            statements.append(statement)
+
+            if self.current_tok.type != TT_NEWLINE:
+                break
+            while self.current_tok.type == TT_NEWLINE:
+                res.register(self.advance())
+            if self.current_tok.type == TT_EOF:
+                break
+
+        return res.success(statements)
+
     def unit(self):
         res = ParseResult()
 
@@ -634,6 +920,157 @@ class Parser:
 
         return res.success(left)
 
+########################################
+# TABLE PARSER
+########################################
+
+# BEGIN GENERATED PARSER TABLES
+# Generated from grammar.rojo.lang by rojo_pgen.py, do not edit by hand
+
+# Operator token: (binding level, lowest level allowed in its right operand)
+PARSE_BINARY = {
+    TT_PLUS: (1, 2),
+    TT_MINUS: (1, 2),
+    TT_MUL: (2, 3),
+    TT_DIV: (2, 3),
+    TT_MOD: (2, 3),
+    TT_POW: (4, 3),
+}
+
+# Operator token: (binding level, lowest level allowed in its operand)
+PARSE_PREFIX = {
+    TT_PLUS: (3, 3),
+    TT_MINUS: (3, 3),
+}
+
+# Token: node built from it as a unit
+PARSE_ATOMS = {
+    TT_INT: IntegerNode,
+    TT_FLOAT: FloatNode,
+    TT_IDENTIFIER: VarAccessNode,
+}
+
+# Opening token: (closing token, its text) around a var-def
+PARSE_GROUPS = {
+    TT_LPAREN: (TT_RPAREN, ")"),
+}
+
+# Keywords that declare the type of an assigned variable
+PARSE_ASSIGN_TYPES = (
+    "int",
+    "float",
+)
+# END GENERATED PARSER TABLES
+
+# Parses expressions by precedence climbing over the tables generated from
+# grammar.rojo.lang, instead of one method and ParseResult per rule. Builds
+# the same nodes and errors as Parser, which it extends for statements.
+class TableParser(Parser):
+    def __init__(self, tokens):
+        super().__init__(tokens)
+        self.error = None
+
+    def var_def(self):
+        res = ParseResult()
+
+        node = self.assignment()
+        if node is None:
+            return res.failure(self.error)
+        return res.success(node)
+
+    def expr(self):
+        res = ParseResult()
+
+        node = self.expression(1)
+        if node is None:
+            return res.failure(self.error)
+        return res.success(node)
+
+    ########################################
+
+    # The methods below return None after setting self.error
+
+    def fail(self, tok, details):
+        self.error = InvalidSyntaxError(tok.pos_start, tok.pos_end, details)
+        return None
+
+    def assignment(self):
+        tok = self.current_tok
+        type_ = None
+        var_name = None
+
+        if tok.type == TT_KEYWORD and tok.value in PARSE_ASSIGN_TYPES:
+            type_ = tok
+            self.advance()
+
+            if self.current_tok.type != TT_IDENTIFIER:
+                return self.fail(self.current_tok, "Expected identifier")
+            var_name = self.current_tok
+            self.advance()
+
+            if self.current_tok.type != TT_EQ:
+                return self.fail(self.current_tok, "Expected '='")
+            self.advance()
+
+        elif tok.type == TT_IDENTIFIER and self.tokens[self.tok_idx + 1].type == TT_EQ:
+            var_name = tok
+            self.advance()
+            self.advance()
+
+        node = self.expression(1)
+        if node is None or var_name is None:
+            return node
+        return VarAssignNode(type_, var_name, node)
+
+    # Parses operators that bind at min_level or tighter
+    def expression(self, min_level):
+        tok = self.current_tok
+
+        prefix = PARSE_PREFIX.get(tok.type)
+        if prefix is not None and prefix[0] >= min_level:
+            self.advance()
+            node = self.expression(prefix[1])
+            if node is None:
+                return None
+            left = UnaryOpNode(tok, node)
+        else:
+            left = self.unit()
+            if left is None:
+                return None
+
+        while True:
+            op_tok = self.current_tok
+            binary = PARSE_BINARY.get(op_tok.type)
+            if binary is None or binary[0] < min_level:
+                return left
+
+            self.advance()
+            right = self.expression(binary[1])
+            if right is None:
+                return None
+            left = BinOpNode(left, op_tok, right)
+
+    def unit(self):
+        tok = self.current_tok
+
+        node_class = PARSE_ATOMS.get(tok.type)
+        if node_class is not None:
+            self.advance()
+            return node_class(tok)
+
+        group = PARSE_GROUPS.get(tok.type)
+        if group is not None:
+            self.advance()
+            node = self.assignment()
+            if node is None:
+                return None
+            if self.current_tok.type != group[0]:
+                return self.fail(self.current_tok, "Expected '" + group[1] + "'")
+            self.advance()
+            return node
+
+        return self.fail(tok, "Expected int, float, or '('")
+
 ########################################
 # RUNTIME RESULT
 ########################################
@@ -656,6 +1093,154 @@ class RuntimeResult:
         self.error = error
         return self
 
+########################################
+# NUMERIC BACKENDS
+########################################
+
+# The arithmetic behind Number. A backend decides what integers are kept as
+# and implements the operators on raw values; floats are always Python
+# floats. Every backend gives the same values, types and errors as
+# PythonBackend. Choose one with set_numeric_backend() before running code,
+# as values made by one backend are not converted for another.
+class PythonBackend:
+    name = "python"
+
+    # Exponent from which pow() leaves integers as Python ints, if any
+    MAX_EXPONENT = None
+
+    # An integer from the digits of a literal, or from a Python int
+    to_int = staticmethod(int)
+
+    add = staticmethod(operator.add)
+    sub = staticmethod(operator.sub)
+    mul = staticmethod(operator.mul)
+    truediv = staticmethod(operator.truediv)
+    mod = staticmethod(operator.mod)
+    pow = staticmethod(operator.pow)
+
+    def __init__(self):
+        # Operator token: function of two raw values
+        self.ops = {
+            TT_PLUS: self.add,
+            TT_MINUS: self.sub,
+            TT_MUL: self.mul,
+            TT_DIV: self.truediv,
+            TT_MOD: self.mod,
+            TT_POW: self.pow,
+        }
+
+    def is_int(self, value):
+        return isinstance(value, int)
+
+    # The value as a Python int or float, for marshal, struct and JSON
+    def to_python(self, value):
+        return value
+
+    # Decimal digits of an INT Number's value, which may be a whole float
+    def int_str(self, value):
+        return str(int(value))
+
+# Integers as gmpy2.mpz, which multiplies and raises numbers of thousands of
+# digits much faster than Python. Operations involving a float, and those
+# gmpy2 would answer with an mpfr, are done on Python values instead.
+class GmpyBackend(PythonBackend):
+    name = "gmpy"
+
+    # gmpy2 refuses exponents that do not fit a machine word
+    MAX_EXPONENT = 1 << 32
+
+    def __init__(self):
+        import gmpy2
+
+        self.mpz = gmpy2.mpz
+        self.mpz_type = type(gmpy2.mpz(0))
+        super().__init__()
+
+    def to_int(self, value):
+        # int() raises the ValueError for literals past the digit limit
+        if type(value) is str:
+            limit = int_max_str_digits()
+            if limit and len(value) > limit:
+                int(value)
+        return self.mpz(value)
+
+    def is_int(self, value):
+        return isinstance(value, (int, self.mpz_type))
+
+    def to_python(self, value):
+        return int(value) if type(value) is self.mpz_type else value
+
+    def int_str(self, value):
+        if type(value) is not self.mpz_type:
+            return str(int(value))
+
+        # str() of the Python int raises the ValueError past the digit limit
+        text = str(value)
+        limit = int_max_str_digits()
+        if limit and len(text) - text.startswith("-") > limit:
+            return str(int(value))
+        return text
+
+    ########################################
+
+    def add(self, a, b):
+        if type(a) is float or type(b) is float:
+            return self.to_python(a) + self.to_python(b)
+        return a + b
+
+    def sub(self, a, b):
+        if type(a) is float or type(b) is float:
+            return self.to_python(a) - self.to_python(b)
+        return a - b
+
+    def mul(self, a, b):
+        if type(a) is float or type(b) is float:
+            return self.to_python(a) * self.to_python(b)
+        return a * b
+
+    def truediv(self, a, b):
+        return self.to_python(a) / self.to_python(b)
+
+    def mod(self, a, b):
+        if type(a) is float or type(b) is float:
+            return self.to_python(a) % self.to_python(b)
+        return a % b
+
+    def pow(self, a, b):
+        if type(a) is float or type(b) is float or b < 0 or b >= self.MAX_EXPONENT:
+            return self.to_python(a) ** self.to_python(b)
+        return a ** b
+
+NUMERIC_BACKENDS = {
+    "python": PythonBackend,
+    "gmpy": GmpyBackend,
+}
+
+numeric = PythonBackend()
+
+# Makes `name` the backend of everything run from now on; "auto" picks gmpy
+# if gmpy2 is installed and python otherwise. Raises ImportError if the
+# backend's library is missing.
+def set_numeric_backend(name):
+    global numeric
+
+    previous = numeric
+    if name == "auto":
+        try:
+            numeric = GmpyBackend()
+        except ImportError:
+            numeric = PythonBackend()
+    elif name in NUMERIC_BACKENDS:
+        if numeric.name != name:
+            numeric = NUMERIC_BACKENDS[name]()
+    else:
+        raise ValueError("Unknown numeric backend `" + str(name) + "` (Expected one of " + ", ".join(NUMERIC_BACKENDS) + " or auto)")
+
+    # Compiled forms hold constants lexed by the previous backend
+    if numeric.name != previous.name:
+        compiled_forms.clear()
+    return numeric
+
 ########################################
 # VALUES
 ########################################
@@ -679,17 +1264,17 @@ class Number:
     def added_to(self, other):
         if isinstance(other, Number):
             type_ = TT_FLOAT if self.type == TT_FLOAT or other.type == TT_FLOAT else TT_INT
-            return Number(self.value + other.value, type_).set_context(self.context), None
+            return Number(numeric.add(self.value, other.value), type_).set_context(self.context), None
 
     def subbed_by(self, other):
         if isinstance(other, Number):
             type_ = TT_FLOAT if self.type == TT_FLOAT or other.type == TT_FLOAT else TT_INT
-            return Number(self.value - other.value, type_).set_context(self.context), None
+            return Number(numeric.sub(self.value, other.value), type_).set_context(self.context), None
 
     def multed_by(self, other):
         if isinstance(other, Number):
             type_ = TT_FLOAT if self.type == TT_FLOAT or other.type == TT_FLOAT else TT_INT
-            val = Number(self.value * other.value, type_).set_context(self.context)
+            val = Number(numeric.mul(self.value, other.value), type_).set_context(self.context)
 
             return val, None
 
@@ -702,7 +1287,7 @@ class Number:
                 )
 
             type_ = TT_FLOAT if self.type == TT_FLOAT or other.type == TT_FLOAT else "unk"
-            val =  Number(self.value / other.value, type_).set_context(self.context)
+            val =  Number(numeric.truediv(self.value, other.value), type_).set_context(self.context)
             if val.type == "unk" and val.value == int(val.value):
                 val.type = TT_INT
             else:
@@ -719,8 +1304,8 @@ class Number:
                 )
 
             type_ = TT_FLOAT if self.type == TT_FLOAT or other.type == TT_FLOAT else "unk"
-            val =  Number(self.value % other.value, type_).set_context(self.context)
-            if val.type == "unk" and val.value == int(val.value):
+            val =  Number(numeric.mod(self.value, other.value), type_).set_context(self.context)
+            if val.type == "unk" and (type(val.value) is not float or val.value == int(val.value)):
                 val.type = TT_INT
             else:
                 val.type = TT_FLOAT
@@ -730,7 +1315,7 @@ class Number:
     def powed_by(self, other):
         if isinstance(other, Number):
             type_ = TT_FLOAT if self.type == TT_FLOAT or other.type == TT_FLOAT else TT_INT
-            val = Number(self.value ** other.value, type_).set_context(self.context)
+            val = Number(numeric.pow(self.value, other.value), type_).set_context(self.context)
             if type(val.value).__name__ == "complex":
                 sign = "+" if val.value.imag >= 0 else "-"
                 return None, RangeError(
@@ -739,16 +1324,21 @@ class Number:
                     str(val.value.real) + sign + str(abs(val.value.imag)) + "i)"
                 )
 
-            if val.value == int(val.value):
+            if type(val.value) is not float or val.value == int(val.value):
                 val.type = TT_INT
 
             return val, None
 
     def __repr__(self):
         if self.type == TT_INT:
-            return str(int(self.value))
+            return numeric.int_str(self.value)
+
+        return str(float(numeric.to_python(self.value)))
 
-        return str(float(self.value))
+# The type of the Number that a raw int, mpz or float kept in a symbol table
+# reads back as
+def raw_type(value):
+    return TT_FLOAT if type(value) is float else TT_INT
 
 ########################################
 # CONTEXT
@@ -777,6 +1367,12 @@ class SymbolTable:
             return self.parent.get(name)
         return value
 
+    def get_type(self, name):
+        type_ = self.types.get(name, None)
+        if type_ == None and self.parent:
+            return self.parent.get_type(name)
+        return type_
+
     def set(self, type_, name, value):
         self.symbols[name] = value
         self.types[name] = type_
@@ -785,100 +1381,702 @@ class SymbolTable:
         del self.symbols[name]
 
 ########################################
-# INTERPRETER
+# SHARED SYMBOL TABLE
 ########################################
 
-class Interpreter:
-    def __init__(self):
-        pass
+# A read-only symbol table kept in a multiprocessing.shared_memory block. The
+# parent process builds it once from a SymbolTable; worker processes attach
+# to it by name without copying and put it under their own SymbolTable as the
+# parent, so assignments stay local to the worker (see attach_shared_globals).
+#
+# The block holds a header, an open-addressed index of fixed-size slots keyed
+# by the crc32 of the name, and a heap with the names and the bytes of ints
+# that do not fit in an int64. Like snapshots it stores the type of each
+# Number next to its raw value, and readers get the values back as
+# stored_value() gives them.
+SHARED_MAGIC = b"ROJT"
+SHARED_VERSION = 2
+SHARED_HEADER = struct.Struct("<4sHII")    # magic, version, slot count, symbol count
+SHARED_SLOT = struct.Struct("<IIHBBB")     # name crc32, name offset, name length, type, Number type, kind
+SHARED_PAYLOAD = {
+    1: struct.Struct("<q"),                # int64
+    2: struct.Struct("<d"),                # float64
+    3: struct.Struct("<II"),               # big int: heap offset, byte length
+}
+SHARED_SLOT_SIZE = SHARED_SLOT.size + 8
+SHARED_EMPTY = 0
+SHARED_INT = 1
+SHARED_FLOAT = 2
+SHARED_BIG_INT = 3
+SHARED_TYPES = ("int", "float")
+SHARED_NUMBER_TYPES = (TT_INT, TT_FLOAT)
+
+class SharedSymbolTable:
+    def __init__(self, name, shm=None):
+        from multiprocessing import shared_memory
+
+        if shm is None:
+            shm = shared_memory.SharedMemory(name=name)
+        self.shm = shm
+        self.name = shm.name
+        self.buf = shm.buf
+        self.parent = None
 
-    def visit(self, node, context):
-        method_name = f'visit_{type(node).__name__}'
-        method = getattr(self, method_name, self.no_visit)
-        return method(node, context)
+        magic, version, self.slot_count, self.count = SHARED_HEADER.unpack_from(self.buf, 0)
+        if magic != SHARED_MAGIC or version != SHARED_VERSION:
+            raise ValueError("`" + name + "` is not a shared symbol table")
+
+        # Lookups already done by this process, so each name is decoded once
+        self.cache = {}
+
+    @classmethod
+    def create(cls, symbol_table):
+        from multiprocessing import shared_memory
+
+        entries = []
+        for name, value in symbol_table.symbols.items():
+            if value is None:
+                continue
+            if isinstance(value, Number):
+                number_type = value.type
+                value = value.value
+            else:
+                number_type = raw_type(value)
+            value = numeric.to_python(value)
+
+            type_ = symbol_table.types.get(name)
+            if type_ not in SHARED_TYPES or number_type not in SHARED_NUMBER_TYPES:
+                raise ValueError("Cannot share `" + name + "` of type `" + str(type_) + "`")
+            entries.append((name.encode("utf-8"), SHARED_TYPES.index(type_), SHARED_NUMBER_TYPES.index(number_type), value))
+
+        slot_count = 8
+        while slot_count < len(entries) * 2:
+            slot_count *= 2
+
+        heap = bytearray()
+        heap_start = SHARED_HEADER.size + slot_count * SHARED_SLOT_SIZE
+        slots = [None] * slot_count
+        for key, type_, number_type, value in entries:
+            name_offset = heap_start + len(heap)
+            heap += key
+
+            if isinstance(value, float):
+                kind, payload = SHARED_FLOAT, (value,)
+            elif -(1 << 63) <= value < (1 << 63):
+                kind, payload = SHARED_INT, (value,)
+            else:
+                data = value.to_bytes(value.bit_length() // 8 + 1, "little", signed=True)
+                kind, payload = SHARED_BIG_INT, (heap_start + len(heap), len(data))
+                heap += data
+
+            crc = zlib.crc32(key)
+            i = crc & (slot_count - 1)
+            while slots[i] is not None:
+                i = (i + 1) & (slot_count - 1)
+            slots[i] = ((crc, name_offset, len(key), type_, number_type, kind), payload)
+
+        # A new block is zero-filled, which leaves unused slots SHARED_EMPTY
+        shm = shared_memory.SharedMemory(create=True, size=heap_start + len(heap))
+        SHARED_HEADER.pack_into(shm.buf, 0, SHARED_MAGIC, SHARED_VERSION, slot_count, len(entries))
+        for i, slot in enumerate(slots):
+            if slot is None:
+                continue
+            offset = SHARED_HEADER.size + i * SHARED_SLOT_SIZE
+            SHARED_SLOT.pack_into(shm.buf, offset, *slot[0])
+            SHARED_PAYLOAD[slot[0][5]].pack_into(shm.buf, offset + SHARED_SLOT.size, *slot[1])
+        shm.buf[heap_start:heap_start + len(heap)] = heap
+
+        return cls(shm.name, shm)
 
     ########################################
 
-    def no_visit(self, node, context):
-        raise Exception("No visit method for " + type(node).__name__ + " class.")
+    # (type, value), or (None, None) if the name is not in the table
+    def lookup(self, name):
+        found = self.cache.get(name)
+        if found is not None:
+            return found
+
+        buf = self.buf
+        key = name.encode("utf-8")
+        crc = zlib.crc32(key)
+        mask = self.slot_count - 1
+        i = crc & mask
+
+        while True:
+            offset = SHARED_HEADER.size + i * SHARED_SLOT_SIZE
+            slot_crc, name_offset, name_len, type_, number_type, kind = SHARED_SLOT.unpack_from(buf, offset)
+            if kind == SHARED_EMPTY:
+                found = (None, None)
+                break
+
+            if slot_crc == crc and buf[name_offset:name_offset + name_len] == key:
+                payload = SHARED_PAYLOAD[kind].unpack_from(buf, offset + SHARED_SLOT.size)
+                if kind == SHARED_BIG_INT:
+                    value = int.from_bytes(buf[payload[0]:payload[0] + payload[1]], "little", signed=True)
+                else:
+                    value = payload[0]
+                found = (SHARED_TYPES[type_], stored_value(value, SHARED_NUMBER_TYPES[number_type]))
+                break
+
+            i = (i + 1) & mask
+
+        self.cache[name] = found
+        return found
+
+    def get(self, name):
+        return self.lookup(name)[1]
+
+    def get_type(self, name):
+        return self.lookup(name)[0]
+
+    def __len__(self):
+        return self.count
 
     ########################################
 
-    def visit_AbstractSyntaxTree(self, node, context):
-        res = RuntimeResult()
+    def close(self):
+        self.cache = {}
+        self.buf = None
+        self.shm.close()
 
-        node_ = res.register(self.visit(node.node, context))
+    # Frees the block once every process has closed it; only its creator
+    # should call this
+    def unlink(self):
+        self.shm.unlink()
 
-        if res.error:
-            return res
+########################################
+# SNAPSHOTS
+########################################
 
-        return res.success(node_)
+# A snapshot is SNAPSHOT_MAGIC, a little-endian u16 format version, and a
+# marshal payload holding the declared types of every symbol, the raw values
+# whose Number type is that of the plain int or float, and the type and raw
+# value of every other Number (Such as the INT 2.0 of `int x = 4 / 2`). The
+# plain values are restored as they are with one dict update, and
+# visit_VarAccessNode wraps them back into Numbers on first use, so restoring
+# builds Number objects only for the others. Version 1 snapshots held raw
+# values only, and version 2 ones the type of every value; both are still
+# read.
+#
+# Compiled forms (see TierCache) are not part of a snapshot; a restored
+# session compiles its sources again once they have been run often enough.
+SNAPSHOT_MAGIC = b"ROJS"
+SNAPSHOT_VERSION = 3
+
+def save_snapshot(symbol_table, path):
+    values = {}
+    numbers = {}
+    for name, value in symbol_table.symbols.items():
+        if isinstance(value, Number):
+            type_ = value.type
+            value = numeric.to_python(value.value)
+        elif value is not None:
+            value = numeric.to_python(value)
+            type_ = raw_type(value)
+        else:
+            continue
 
-    def visit_IntegerNode(self, node, context):
-        return RuntimeResult().success(
-            Number(node.tok.value, TT_INT).set_pos(node.pos_start, node.pos_end).set_context(context))
+        if type_ == raw_type(value):
+            values[name] = value
+        else:
+            numbers[name] = (type_, value)
+
+    data = SNAPSHOT_MAGIC + struct.pack("<H", SNAPSHOT_VERSION) + marshal.dumps({
+        "types": symbol_table.types,
+        "values": values,
+        "numbers": numbers,
+    })
+
+    # Write next to the destination and rename over it, so readers only ever
+    # see a complete snapshot
+    tmp_path = path + ".tmp" + str(os.getpid())
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def load_snapshot(symbol_table, path):
+    with open(path, "rb") as f:
+        data = f.read()
+
+    header_size = len(SNAPSHOT_MAGIC) + 2
+    if data[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        raise ValueError("`" + path + "` is not a Rojo snapshot")
+    version = struct.unpack_from("<H", data, len(SNAPSHOT_MAGIC))[0]
+    if version not in (1, 2, SNAPSHOT_VERSION):
+        raise ValueError("Unsupported snapshot version " + str(version))
+
+    payload = marshal.loads(data[header_size:])
+    values = payload["values"]
+    if version == 2:
+        values = {name: stored_value(value, type_) for name, (type_, value) in values.items()}
+    elif version == SNAPSHOT_VERSION:
+        if numeric.name != "python":
+            values = {name: numeric.to_int(value) if type(value) is int else value for name, value in values.items()}
+        symbol_table.symbols.update(values)
+        values = {name: stored_value(value, type_) for name, (type_, value) in payload["numbers"].items()}
+    symbol_table.symbols.update(values)
+    symbol_table.types.update(payload["types"])
+
+# A raw value as kept in a symbol table: the value itself if it reads back as
+# a Number of type `type_`, or else a Number without a position
+def stored_value(value, type_):
+    if numeric.is_int(value) and type_ == TT_INT:
+        return numeric.to_int(value)
+    if type(value) is float and type_ == TT_FLOAT:
+        return value
+    return Number(numeric.to_int(value) if numeric.is_int(value) else value, type_)
 
-    def visit_FloatNode(self, node, context):
-        return RuntimeResult().success(
-            Number(node.tok.value, TT_FLOAT).set_pos(node.pos_start, node.pos_end).set_context(context))
+########################################
+# METRICS
+########################################
 
-    def visit_VarAccessNode(self, node, context):
-        res = RuntimeResult()
-        var_name = node.var_name_tok.value
-        value = context.symbol_table.get(var_name)
-        if value is None:
-            return res.failure(NotDefinedError(
-                node.pos_start, node.pos_end, context,
-                "Variable `" + var_name + "` does not exist"
-            ))
+# Counters and histograms for the whole process, to watch a long-running
+# evaluator. Updated by run(), run_async() and Engine.evaluate() unless
+# metrics.enabled is False; nodes evaluated by worker processes (jobs > 1)
+# are counted in those processes.
+
+# Upper bounds in seconds of the phase latency histogram buckets
+METRIC_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PHASES = ("lex", "parse", "infer", "eval")
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    # Smallest bucket bound that at least `fraction` of the values are below
+    def quantile(self, fraction):
+        seen = 0
+        for i in range(len(self.buckets)):
+            seen += self.counts[i]
+            if seen >= fraction * self.count:
+                return self.buckets[i]
+        return float("inf")
+
+class Metrics:
+    def __init__(self):
+        self.enabled = True
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self.runs = 0
+        self.errors = {}
+        self.phases = {phase: Histogram(METRIC_BUCKETS) for phase in PHASES}
+        self.nodes = collections.defaultdict(int)
+        self.caches = {}
+        self.int_bits = {TT_MUL: 0, TT_POW: 0}
 
-        if type(value).__name__ != "Number":
-            return res.success(Number(value, type(value).__name__.upper()))
-        return res.success(value)
+    ########################################
 
-    def visit_VarAssignNode(self, node, context):
-        res = RuntimeResult()
-        var_type = node.type
-        var_name = node.var_name_tok.value
-        value = res.register(self.visit(node.value, context))
-        if res.error:
-            return res
+    def count_run(self, error):
+        self.runs += 1
+        if error:
+            self.errors[error.error_name] = self.errors.get(error.error_name, 0) + 1
 
-        if not var_type and context.symbol_table.get(var_name) is None:
-            return res.failure(NotDefinedError(
-                node.pos_start, node.pos_end, context,
-                "Variable `" + var_name + "` does not exist"
-            ))
+    # Nodes evaluated, by name; the interpreters count into self.nodes by class
+    def node_names(self):
+        names = {}
+        for node_type, count in self.nodes.items():
+            names[node_type.__name__] = names.get(node_type.__name__, 0) + count
+        return names
 
-        if context.symbol_table.get(var_name) is not None and var_type is not None:
-            return res.failure(AlreadyDefinedError(
-                node.pos_start, node.pos_end, context,
-                "Cannot redefine variable `" + var_name + "`"
-            ))
+    def count_cache(self, name, hit):
+        if name not in self.caches:
+            self.caches[name] = [0, 0]
+        self.caches[name][0 if hit else 1] += 1
 
-        if var_type and value.type.lower() != var_type.value:
-            return res.failure(TypeError_(
-                node.pos_start, node.pos_end, context,
-                "Cannot place type `" + str(value.type).lower() + "` in `" + var_type.value + "`"
-            ))
+    def int_result(self, op_type, value):
+        bits = value.bit_length()
+        if bits > self.int_bits[op_type]:
+            self.int_bits[op_type] = bits
 
-        if not var_type and value.type.lower() != context.symbol_table.types[var_name]:
-            return res.failure(TypeError_(
-                node.pos_start, node.pos_end, context,
-                "Cannot place type `" + str(value.type).lower() + "` in `" + str(context.symbol_table.types[var_name]) + "`"
-            ))
+    ########################################
 
-        if not var_type:
-            context.symbol_table.set(context.symbol_table.types[var_name], var_name, value)
+    # The Prometheus text exposition format
+    def prometheus(self):
+        lines = [
+            "# HELP rojo_runs_total Scripts run.",
+            "# TYPE rojo_runs_total counter",
+            "rojo_runs_total " + str(self.runs),
+            "# HELP rojo_errors_total Runs that failed, by error.",
+            "# TYPE rojo_errors_total counter",
+        ]
+        for name in sorted(self.errors):
+            lines.append('rojo_errors_total{error="' + name + '"} ' + str(self.errors[name]))
+
+        lines += [
+            "# HELP rojo_phase_seconds Time spent in each phase of a run.",
+            "# TYPE rojo_phase_seconds histogram",
+        ]
+        for phase in PHASES:
+            histogram = self.phases[phase]
+            seen = 0
+            for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                seen += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append('rojo_phase_seconds_bucket{phase="' + phase + '",le="' + le + '"} ' + str(seen))
+            lines.append('rojo_phase_seconds_sum{phase="' + phase + '"} ' + repr(histogram.sum))
+            lines.append('rojo_phase_seconds_count{phase="' + phase + '"} ' + str(histogram.count))
+
+        lines += [
+            "# HELP rojo_nodes_evaluated_total AST nodes evaluated, by node type.",
+            "# TYPE rojo_nodes_evaluated_total counter",
+        ]
+        nodes = self.node_names()
+        for name in sorted(nodes):
+            lines.append('rojo_nodes_evaluated_total{node="' + name + '"} ' + str(nodes[name]))
+
+        lines += [
+            "# HELP rojo_cache_requests_total Cache lookups, by cache and result.",
+            "# TYPE rojo_cache_requests_total counter",
+        ]
+        for name in sorted(self.caches):
+            lines.append('rojo_cache_requests_total{cache="' + name + '",result="hit"} ' + str(self.caches[name][0]))
+            lines.append('rojo_cache_requests_total{cache="' + name + '",result="miss"} ' + str(self.caches[name][1]))
+
+        lines += [
+            "# HELP rojo_int_result_bits_max Bit length of the largest integer produced, by operator.",
+            "# TYPE rojo_int_result_bits_max gauge",
+            'rojo_int_result_bits_max{op="*"} ' + str(self.int_bits[TT_MUL]),
+            'rojo_int_result_bits_max{op="**"} ' + str(self.int_bits[TT_POW]),
+        ]
+
+        return "\n".join(lines) + "\n"
+
+    # Human-readable lines for the shell
+    def summary(self):
+        lines = ["Runs: %d in %.0f s" % (self.runs, time.time() - self.started)]
+
+        if self.errors:
+            lines.append("Errors: " + ", ".join(name + " " + str(self.errors[name]) for name in sorted(self.errors)))
         else:
-            context.symbol_table.set(var_type.value, var_name, value)
+            lines.append("Errors: none")
+
+        for phase in PHASES:
+            histogram = self.phases[phase]
+            if histogram.count == 0:
+                continue
+            lines.append("%-6s mean %.3f ms, p50 <= %s ms, p99 <= %s ms over %d runs" % (
+                phase.capitalize() + ":", histogram.sum / histogram.count * 1e3,
+                "%g" % (histogram.quantile(0.5) * 1e3), "%g" % (histogram.quantile(0.99) * 1e3), histogram.count))
+
+        nodes = self.node_names()
+        if nodes:
+            lines.append("Nodes: " + ", ".join(name + " " + str(nodes[name]) for name in sorted(nodes)))
+
+        for name in sorted(self.caches):
+            hits, misses = self.caches[name]
+            lines.append("Cache %s: %d hits, %d misses (%.1f%% hit rate)" % (name, hits, misses, 100 * hits / (hits + misses) if hits + misses else 0))
+
+        lines.append("Largest int: %d bits from `*`, %d bits from `**`" % (self.int_bits[TT_MUL], self.int_bits[TT_POW]))
+        return lines
+
+metrics = Metrics()
+
+# Writes the metrics in the Prometheus text format, e.g. for the textfile
+# collector of node_exporter. Like save_snapshot(), the file is replaced
+# atomically.
+def write_metrics(path):
+    tmp_path = path + ".tmp" + str(os.getpid())
+    with open(tmp_path, "w") as f:
+        f.write(metrics.prometheus())
+    os.replace(tmp_path, path)
 
-        if type(value).__name__ != "Number":
-            return res.success(Number(value, type(value).__name__.upper()))
-        return res.success(value)
+########################################
+# TYPE INFERENCE
+########################################
 
-    def visit_BinOpNode(self, node, context):
-        res = RuntimeResult()
+# Annotates nodes with the type their value is known to have before the code
+# runs (static_type is TT_INT, TT_FLOAT, or None when it depends on values),
+# so the interpreter can skip the type dispatch in Number and the type check
+# on assignment.
+#
+# Nodes are visited in evaluation order, tracking the variables the code
+# itself assigns. A type error on assignment is returned from infer() when
+# nothing evaluated before it can fail or assign a variable, as running the
+# code would then report the same error and change nothing.
+class TypeInferencer:
+    def __init__(self, symbol_table, max_nodes=None, max_int_bits=None):
+        self.symbol_table = symbol_table
+        self.max_nodes = max_nodes
+        self.max_int_bits = max_int_bits
+        self.assigned = {}
+        self.nodes = 0
+        self.pure = True
+        self.error = None
+
+    def infer(self, node, context):
+        self.context = context
+        self.visit(node)
+        return self.error
+
+    # Returns the node's static type, and for values known to be Python ints
+    # an upper bound on their bit length (an `int` may also hold a whole float,
+    # e.g. from `4 / 2`, which gets None)
+    def visit(self, node):
+        self.nodes += 1
+
+        method_name = f'infer_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_infer)
+        try:
+            node.static_type, bits = method(node)
+        except Exception as e:
+            if getattr(e, "rojo_node", None) is None:
+                e.rojo_node = node
+            raise
+        return node.static_type, bits
+
+    ########################################
+
+    def no_infer(self, node):
+        raise Exception("No infer method for " + type(node).__name__ + " class.")
+
+    # The type a variable is declared with, or None if it does not exist
+    def declared_type(self, name):
+        if name in self.assigned:
+            return self.assigned[name][0]
+        if self.symbol_table.get(name) is None:
+            return None
+        return (self.symbol_table.get_type(name) or "").upper() or None
+
+    ########################################
+
+    def infer_AbstractSyntaxTree(self, node):
+        return self.visit(node.node)
+
+    def infer_StatementsNode(self, node):
+        for statement in node.statements:
+            result = self.visit(statement)
+        return result
+
+    def infer_IntegerNode(self, node):
+        return TT_INT, node.tok.value.bit_length()
+
+    def infer_FloatNode(self, node):
+        return TT_FLOAT, None
+
+    def infer_VarAccessNode(self, node):
+        var_name = node.var_name_tok.value
+        if var_name in self.assigned:
+            return self.assigned[var_name]
+
+        value = self.symbol_table.get(var_name)
+        if value is None:
+            self.pure = False
+            return None, None
+
+        type_ = value.type if isinstance(value, Number) else raw_type(value)
+        if isinstance(value, Number):
+            value = value.value
+        return type_, value.bit_length() if numeric.is_int(value) else None
+
+    def infer_VarAssignNode(self, node):
+        var_name = node.var_name_tok.value
+        value_type, bits = self.visit(node.value)
+
+        declared = self.declared_type(var_name)
+        expected = node.type.value.upper() if node.type else declared
+        node.type_proven = value_type is not None and value_type == expected
+
+        # Undefined/redefined variables are reported before the type is checked
+        checked = (declared is None) == (node.type is not None) and value_type is not None
+        if checked and not node.type_proven and self.pure and (self.max_nodes is None or self.nodes <= self.max_nodes):
+            self.error = TypeError_(
+                node.pos_start, node.pos_end, self.context,
+                "Cannot place type `" + value_type.lower() + "` in `" + expected.lower() + "`"
+            )
+        self.pure = False
+
+        self.assigned[var_name] = (value_type, bits) if node.type_proven else (expected, None)
+        return value_type, bits
+
+    def infer_BinOpNode(self, node):
+        left_type, left_bits = self.visit(node.left_node)
+        right_type, right_bits = self.visit(node.right_node)
+        op_type = node.op_tok.type
+
+        static_type = None
+        if left_type == TT_FLOAT or right_type == TT_FLOAT:
+            if op_type != TT_POW:
+                static_type = TT_FLOAT
+        elif left_type == TT_INT and right_type == TT_INT:
+            if op_type in (TT_PLUS, TT_MINUS, TT_MUL):
+                static_type = TT_INT
+
+        bits = None
+        if static_type == TT_INT and left_bits is not None and right_bits is not None:
+            bits = left_bits + right_bits if op_type == TT_MUL else max(left_bits, right_bits) + 1
+
+        # `+`, `-` and `*` only fail when an int of 1024 bits or more is mixed
+        # with a float (OverflowError), or on the max_int_bits budget
+        if op_type not in (TT_PLUS, TT_MINUS, TT_MUL):
+            self.pure = False
+        elif static_type == TT_INT:
+            if bits is None or (op_type == TT_MUL and self.max_int_bits is not None and bits > self.max_int_bits):
+                self.pure = False
+        elif static_type == TT_FLOAT:
+            for type_, bits_ in ((left_type, left_bits), (right_type, right_bits)):
+                if type_ != TT_FLOAT and (bits_ is None or bits_ >= 1024):
+                    self.pure = False
+        else:
+            self.pure = False
+
+        return static_type, bits
+
+    def infer_UnaryOpNode(self, node):
+        return self.visit(node.node)
+
+########################################
+# INTERPRETER
+########################################
+
+# Operators applied straight to the values of operands whose result type was
+# inferred, instead of through the Number methods. Only `/` and `%` with a
+# float operand are inferred, which always give a float.
+STATIC_OPS = (TT_PLUS, TT_MINUS, TT_MUL, TT_DIV, TT_MOD)
+
+class Interpreter:
+    # Node class: visit method, filled in as node classes are met
+    visitors = {}
+
+    def __init__(self, max_nodes=None, max_int_bits=None, deadline=None):
+        self.max_nodes = max_nodes
+        self.max_int_bits = max_int_bits
+        self.deadline = deadline
+        self.limited = max_nodes is not None or deadline is not None
+        self.nodes = 0
+
+        # Nodes evaluated by class, straight into the metrics
+        self.node_counts = metrics.nodes if metrics.enabled else None
+
+        # Whether compiled forms have to call enter() on every node
+        self.checked = self.limited or self.node_counts is not None
+
+    def visit(self, node, context):
+        if self.limited:
+            error = self.charge(node, context)
+            if error:
+                return RuntimeResult().failure(error)
+
+        node_type = type(node)
+        if self.node_counts is not None:
+            self.node_counts[node_type] += 1
+
+        method = self.visitors.get(node_type)
+        if method is None:
+            method = self.dispatch(node_type)
+        try:
+            return method(self, node, context)
+        except Exception as e:
+            if getattr(e, "rojo_node", None) is None:
+                e.rojo_node = node
+            raise
+
+    ########################################
+
+    def dispatch(self, node_type):
+        method = getattr(type(self), f'visit_{node_type.__name__}', type(self).no_visit)
+        self.visitors[node_type] = method
+        return method
+
+    def no_visit(self, node, context):
+        raise Exception("No visit method for " + type(node).__name__ + " class.")
+
+    # What visit() does before evaluating a node, for compiled forms
+    def enter(self, node, context):
+        if self.limited:
+            error = self.charge(node, context)
+            if error:
+                raise CompiledFailure(error)
+
+        if self.node_counts is not None:
+            self.node_counts[type(node)] += 1
+
+    def charge(self, node, context):
+        self.nodes += 1
+
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            return ResourceLimitError(
+                node.pos_start, node.pos_end, context,
+                "Evaluation exceeded the limit of " + str(self.max_nodes) + " nodes"
+            )
+
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            return ResourceLimitError(
+                node.pos_start, node.pos_end, context,
+                "Evaluation exceeded its deadline"
+            )
+
+        return None
+
+    ########################################
+
+    def visit_AbstractSyntaxTree(self, node, context):
+        res = RuntimeResult()
+
+        node_ = res.register(self.visit(node.node, context))
+
+        if res.error:
+            return res
+
+        return res.success(node_)
+
+    def visit_StatementsNode(self, node, context):
+        res = RuntimeResult()
+
+        for statement in node.statements:
+            value = res.register(self.visit(statement, context))
+            if res.error:
+                return res
+
+        return res.success(value)
+
+    def visit_IntegerNode(self, node, context):
+        return RuntimeResult().success(
+            Number(node.tok.value, TT_INT).set_pos(node.pos_start, node.pos_end).set_context(context))
+
+    def visit_FloatNode(self, node, context):
+        return RuntimeResult().success(
+            Number(node.tok.value, TT_FLOAT).set_pos(node.pos_start, node.pos_end).set_context(context))
+
+    def visit_VarAccessNode(self, node, context):
+        res = RuntimeResult()
+        var_name = node.var_name_tok.value
+        value = context.symbol_table.get(var_name)
+        if value is None:
+            return res.failure(NotDefinedError(
+                node.pos_start, node.pos_end, context,
+                "Variable `" + var_name + "` does not exist"
+            ))
+
+        if type(value).__name__ != "Number":
+            return res.success(Number(value, raw_type(value)).set_pos(node.pos_start, node.pos_end).set_context(context))
+        if value.pos_start is None:
+            return res.success(Number(value.value, value.type).set_pos(node.pos_start, node.pos_end).set_context(context))
+        return res.success(value)
+
+    def visit_VarAssignNode(self, node, context):
+        res = RuntimeResult()
+        value = res.register(self.visit(node.value, context))
+        if res.error:
+            return res
+
+        return self.assign(node, value, context, node.type_proven)
+
+    def visit_BinOpNode(self, node, context):
+        res = RuntimeResult()
 
         left = res.register(self.visit(node.left_node, context))
         if res.error:
@@ -887,6 +2085,89 @@ class Interpreter:
         if res.error:
             return res
 
+        return self.binary_op(node, left, right, context)
+
+    def visit_UnaryOpNode(self, node, context):
+        res = RuntimeResult()
+
+        number = res.register(self.visit(node.node, context))
+        if res.error:
+            return res
+
+        return self.unary_op(node, number)
+
+    ########################################
+
+    # `proven` is whether the types were proven to match before execution
+    def assign(self, node, value, context, proven):
+        res = RuntimeResult()
+        var_type = node.type
+        var_name = node.var_name_tok.value
+
+        if not var_type and context.symbol_table.get(var_name) is None:
+            return res.failure(NotDefinedError(
+                node.pos_start, node.pos_end, context,
+                "Variable `" + var_name + "` does not exist"
+            ))
+
+        if context.symbol_table.get(var_name) is not None and var_type is not None:
+            return res.failure(AlreadyDefinedError(
+                node.pos_start, node.pos_end, context,
+                "Cannot redefine variable `" + var_name + "`"
+            ))
+
+        if var_type and not proven and value.type.lower() != var_type.value:
+            return res.failure(TypeError_(
+                node.pos_start, node.pos_end, context,
+                "Cannot place type `" + str(value.type).lower() + "` in `" + var_type.value + "`"
+            ))
+
+        if not var_type and not proven and value.type.lower() != context.symbol_table.get_type(var_name):
+            return res.failure(TypeError_(
+                node.pos_start, node.pos_end, context,
+                "Cannot place type `" + str(value.type).lower() + "` in `" + str(context.symbol_table.get_type(var_name)) + "`"
+            ))
+
+        if not var_type:
+            context.symbol_table.set(context.symbol_table.get_type(var_name), var_name, value)
+        else:
+            context.symbol_table.set(var_type.value, var_name, value)
+
+        if type(value).__name__ != "Number":
+            return res.success(Number(value, raw_type(value)))
+        return res.success(value)
+
+    # The max_int_bits error for a binary operation, if it could go over
+    def int_bits_error(self, node, left, right, context):
+        bits = estimate_int_bits(node.op_tok.type, left, right)
+        if bits > self.max_int_bits:
+            return ResourceLimitError(
+                node.pos_start, node.pos_end, context,
+                "Result of `" + ("*" if node.op_tok.type == TT_MUL else "**") + "` could need up to " + str(bits) +
+                " bits (Limit is " + str(self.max_int_bits) + ")"
+            )
+        return None
+
+    def binary_op(self, node, left, right, context):
+        res = RuntimeResult()
+
+        if self.max_int_bits is not None:
+            error = self.int_bits_error(node, left, right, context)
+            if error:
+                return res.failure(error)
+
+        if node.static_type is not None and node.op_tok.type in STATIC_OPS:
+            if node.op_tok.type in (TT_DIV, TT_MOD) and right.value == 0:
+                return res.failure(DivisionByZeroError(
+                    right.pos_start, right.pos_end, left.context,
+                    "Division by zero"
+                ))
+
+            result = Number(numeric.ops[node.op_tok.type](left.value, right.value), node.static_type).set_context(left.context)
+            if node.op_tok.type == TT_MUL and metrics.enabled and numeric.is_int(result.value):
+                metrics.int_result(TT_MUL, result.value)
+            return res.success(result.set_pos(node.pos_start, node.pos_end))
+
         if node.op_tok.type == TT_PLUS:
             result, error = left.added_to(right)
         elif node.op_tok.type == TT_MINUS:
@@ -903,18 +2184,17 @@ class Interpreter:
         if error:
             return res.failure(error)
 
+        if node.op_tok.type in (TT_MUL, TT_POW) and metrics.enabled and numeric.is_int(result.value):
+            metrics.int_result(node.op_tok.type, result.value)
         return res.success(result.set_pos(node.pos_start, node.pos_end))
 
-    def visit_UnaryOpNode(self, node, context):
+    def unary_op(self, node, number):
         res = RuntimeResult()
-
-        number = res.register(self.visit(node.node, context))
-        if res.error:
-            return res
-
         error = None
 
-        if node.op_tok.type == TT_MINUS:
+        if node.op_tok.type == TT_MINUS and node.static_type is not None:
+            number = Number(number.value * -1, node.static_type).set_context(number.context)
+        elif node.op_tok.type == TT_MINUS:
             number, error = number.multed_by(Number(-1, TT_INT))
 
         if error:
@@ -922,46 +2202,1834 @@ class Interpreter:
 
         return res.success(number.set_pos(node.pos_start, node.pos_end))
 
+########################################
+# ASYNC INTERPRETER
+########################################
+
+# Raised by stepwise_mul() and stepwise_pow() when told to stop
+class Interrupted(Exception):
+    pass
+
+# Integer `*` and `**` done as products of at most STEP_INT_BITS bits,
+# calling `stopped()` before each and raising Interrupted once it returns
+# true, so work handed to an executor can be abandoned part way. They give the
+# same values as `*` and `**` on the same integers.
+def stepwise_mul(a, b, stopped):
+    if stopped():
+        raise Interrupted()
+
+    negative = (a < 0) != (b < 0)
+    a, b = abs(a), abs(b)
+    if a.bit_length() < b.bit_length():
+        a, b = b, a
+
+    size = a.bit_length()
+    if size <= STEP_INT_BITS or not b:
+        product = a * b
+    elif b.bit_length() * 2 <= size:
+        # Slices of `a` about the size of `b`
+        piece = max(b.bit_length(), STEP_INT_BITS)
+        mask = (1 << piece) - 1
+        product = 0
+        for shift in range(0, size, piece):
+            product += stepwise_mul((a >> shift) & mask, b, stopped) << shift
+    else:
+        # Karatsuba, as `*` itself does on large integers
+        half = size // 2
+        mask = (1 << half) - 1
+        a_high, a_low = a >> half, a & mask
+        b_high, b_low = b >> half, b & mask
+        high = stepwise_mul(a_high, b_high, stopped)
+        low = stepwise_mul(a_low, b_low, stopped)
+        middle = stepwise_mul(a_high + a_low, b_high + b_low, stopped) - high - low
+        product = (high << (2 * half)) + (middle << half) + low
+
+    return -product if negative else product
+
+# `b` is at least 1
+def stepwise_pow(a, b, stopped):
+    result = a
+    for bit in bin(b)[3:]:
+        result = stepwise_mul(result, result, stopped)
+        if bit == "1":
+            result = stepwise_mul(result, a, stopped)
+    return result
+
+class AsyncInterpreter(Interpreter):
+    # Its own cache, as some of its visit methods are coroutines
+    visitors = {}
+
+    def __init__(self, yield_every=1000, timeout_at=None, executor=None,
+                 max_nodes=None, max_int_bits=None, deadline=None):
+        if yield_every < 1:
+            raise ValueError("yield_every must be at least 1, got " + str(yield_every))
+
+        super().__init__(max_nodes, max_int_bits, deadline)
+        self.yield_every = yield_every
+        self.timeout_at = timeout_at
+        self.executor = executor
+        self.steps = 0
+
+    async def visit(self, node, context):
+        self.steps += 1
+        if self.steps % self.yield_every == 0:
+            await self.checkpoint()
+
+        if self.limited:
+            error = self.charge(node, context)
+            if error:
+                return RuntimeResult().failure(error)
+
+        node_type = type(node)
+        if self.node_counts is not None:
+            self.node_counts[node_type] += 1
+
+        method = self.visitors.get(node_type)
+        if method is None:
+            method = self.dispatch(node_type)
+        try:
+            result = method(self, node, context)
+            if type(result) is types.CoroutineType:
+                result = await result
+        except Exception as e:
+            if getattr(e, "rojo_node", None) is None:
+                e.rojo_node = node
+            raise
+        return result
+
+    async def checkpoint(self):
+        import asyncio
+
+        # Give the event loop a chance to run other tasks (and to deliver a
+        # cancellation to this one), then enforce the per-call deadline
+        await asyncio.sleep(0)
+
+        if self.timeout_at is not None and asyncio.get_running_loop().time() >= self.timeout_at:
+            raise asyncio.TimeoutError()
+
+    ########################################
+
+    async def visit_AbstractSyntaxTree(self, node, context):
+        res = RuntimeResult()
+
+        node_ = res.register(await self.visit(node.node, context))
+
+        if res.error:
+            return res
+
+        return res.success(node_)
+
+    async def visit_StatementsNode(self, node, context):
+        res = RuntimeResult()
+
+        for statement in node.statements:
+            value = res.register(await self.visit(statement, context))
+            if res.error:
+                return res
+
+        return res.success(value)
+
+    async def visit_VarAssignNode(self, node, context):
+        res = RuntimeResult()
+        value = res.register(await self.visit(node.value, context))
+        if res.error:
+            return res
+
+        return self.assign(node, value, context, node.type_proven)
+
+    async def visit_BinOpNode(self, node, context):
+        res = RuntimeResult()
+
+        left = res.register(await self.visit(node.left_node, context))
+        if res.error:
+            return res
+        right = res.register(await self.visit(node.right_node, context))
+        if res.error:
+            return res
+
+        if self.executor is not None and estimate_int_bits(node.op_tok.type, left, right) > EXPENSIVE_INT_BITS:
+            import asyncio
+            import threading
+
+            loop = asyncio.get_running_loop()
+            timeout_at = None
+            if self.timeout_at is not None:
+                timeout_at = time.monotonic() + self.timeout_at - loop.time()
+
+            # Set once this call stops waiting, whether it finished, timed out
+            # or was cancelled, so the executor's thread gives up too
+            stop = threading.Event()
+            future = loop.run_in_executor(
+                self.executor, self.offloaded_op, node, left, right, context, stop, timeout_at)
+            try:
+                if self.timeout_at is None:
+                    return await future
+                return await asyncio.wait_for(future, max(self.timeout_at - loop.time(), 0))
+            except Interrupted:
+                raise asyncio.TimeoutError()
+            finally:
+                stop.set()
+
+        return self.binary_op(node, left, right, context)
+
+    # binary_op() as run on the executor, with integer `*` and `**` done by
+    # stepwise_mul() and stepwise_pow() so they stop at the interpreter's
+    # deadline, at `timeout_at` (on the time.monotonic() clock) or once
+    # `stop` is set
+    def offloaded_op(self, node, left, right, context, stop, timeout_at):
+        op_type = node.op_tok.type
+        if op_type == TT_POW and numeric.MAX_EXPONENT is not None and right.value >= numeric.MAX_EXPONENT:
+            return self.binary_op(node, left, right, context)
+
+        res = RuntimeResult()
+        if self.max_int_bits is not None:
+            error = self.int_bits_error(node, left, right, context)
+            if error:
+                return res.failure(error)
+
+        def stopped():
+            if stop.is_set():
+                return True
+            now = time.monotonic()
+            if timeout_at is not None and now >= timeout_at:
+                return True
+            return self.deadline is not None and now > self.deadline
+
+        try:
+            if op_type == TT_MUL:
+                value = stepwise_mul(left.value, right.value, stopped)
+            else:
+                value = stepwise_pow(left.value, right.value, stopped)
+        except Interrupted:
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                return res.failure(ResourceLimitError(
+                    node.pos_start, node.pos_end, context,
+                    "Evaluation exceeded its deadline"
+                ))
+            raise
+
+        if op_type == TT_MUL and node.static_type is not None:
+            type_ = node.static_type
+        elif op_type == TT_MUL and TT_FLOAT in (left.type, right.type):
+            type_ = TT_FLOAT
+        else:
+            type_ = TT_INT
+
+        result = Number(value, type_).set_context(left.context)
+        if metrics.enabled:
+            metrics.int_result(op_type, value)
+        return res.success(result.set_pos(node.pos_start, node.pos_end))
+
+    async def visit_UnaryOpNode(self, node, context):
+        res = RuntimeResult()
+
+        number = res.register(await self.visit(node.node, context))
+        if res.error:
+            return res
+
+        return self.unary_op(node, number)
+
+########################################
+# COMPILER
+########################################
+
+# Tiered execution: code runs on the Interpreter until the same source has
+# been run "tier_threshold" times, then its AST is compiled to a tree of
+# closures, one per node, which later runs of that source call instead of
+# lexing, parsing, inferring and visiting it again. A compiled form checks
+# types as it goes, like the Interpreter does with "infer_types" off, so it
+# gives the same results, errors, budgets and metrics.
+#
+# A closure is called with the Interpreter holding the run's budgets and the
+# context, returns a Number and raises CompiledFailure with the Rojo error.
+# Closures that compute set their node on unexpected exceptions, like visit()
+# does, for internal_error().
+#
+# The one effect of evaluation type inference does not account for is `+`
+# moving the position of a stored Number. Code that might do that is type
+# checked before its compiled form runs, as a type error found then means
+# nothing at all is evaluated.
+
+# Runs of a source on the Interpreter before it is compiled
+TIER_THRESHOLD = 8
+# Compiled forms kept by run(), least recently used are dropped first
+TIER_CACHE_SIZE = 512
+# Larger ASTs stay on the Interpreter; deeper ones could run into the
+# recursion limit there but not compiled, and so give another result
+TIER_MAX_NODES = 10000
+TIER_MAX_DEPTH = 100
+
+class CompiledFailure(Exception):
+    def __init__(self, error):
+        self.error = error
+
+class CompiledForm:
+    def __init__(self, run, ast):
+        self.run = run
+        # The AST to infer types on before running, or None
+        self.ast = ast
+
+# Nodes in and depth of an AST
+def ast_size(ast):
+    nodes = 0
+    depth = 0
+
+    stack = [(ast, 1)]
+    while stack:
+        node, node_depth = stack.pop()
+        nodes += 1
+        depth = max(depth, node_depth)
+
+        if isinstance(node, AbstractSyntaxTree):
+            stack.append((node.node, node_depth + 1))
+        elif isinstance(node, StatementsNode):
+            stack += [(statement, node_depth + 1) for statement in node.statements]
+        elif isinstance(node, VarAssignNode):
+            stack.append((node.value, node_depth + 1))
+        elif isinstance(node, BinOpNode):
+            stack += [(node.left_node, node_depth + 1), (node.right_node, node_depth + 1)]
+        elif isinstance(node, UnaryOpNode):
+            stack.append((node.node, node_depth + 1))
+
+    return nodes, depth
+
+# Whether a node can evaluate to a Number stored in a symbol table
+def yields_stored(node):
+    while isinstance(node, UnaryOpNode) and node.op_tok.type == TT_PLUS:
+        node = node.node
+    return isinstance(node, (VarAccessNode, VarAssignNode))
+
+class Compiler:
+    def __init__(self):
+        self.infer_first = False
+
+    # The CompiledForm of an AST, or None if it should stay on the Interpreter
+    def compile(self, ast):
+        nodes, depth = ast_size(ast)
+        if nodes > TIER_MAX_NODES or depth > TIER_MAX_DEPTH:
+            return None
+
+        run = self.visit(ast)
+        return CompiledForm(run, ast if self.infer_first else None)
+
+    def visit(self, node):
+        method_name = f'compile_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_compile)
+        return method(node)
+
+    ########################################
+
+    def no_compile(self, node):
+        raise Exception("No compile method for " + type(node).__name__ + " class.")
+
+    ########################################
+
+    def compile_AbstractSyntaxTree(self, node):
+        body = self.visit(node.node)
+
+        def tree(state, context):
+            if state.checked:
+                state.enter(node, context)
+            return body(state, context)
+        return tree
+
+    def compile_StatementsNode(self, node):
+        statements = [self.visit(statement) for statement in node.statements]
+
+        def block(state, context):
+            if state.checked:
+                state.enter(node, context)
+            for statement in statements:
+                value = statement(state, context)
+            return value
+        return block
+
+    def compile_IntegerNode(self, node):
+        return self.constant(node, TT_INT)
+
+    def compile_FloatNode(self, node):
+        return self.constant(node, TT_FLOAT)
+
+    def compile_VarAccessNode(self, node):
+        var_name = node.var_name_tok.value
+
+        def access(state, context):
+            if state.checked:
+                state.enter(node, context)
+
+            value = context.symbol_table.get(var_name)
+            if value is None:
+                raise CompiledFailure(NotDefinedError(
+                    node.pos_start, node.pos_end, context,
+                    "Variable `" + var_name + "` does not exist"
+                ))
+
+            if type(value) is not Number:
+                return Number(value, raw_type(value)).set_pos(node.pos_start, node.pos_end).set_context(context)
+            if value.pos_start is None:
+                return Number(value.value, value.type).set_pos(node.pos_start, node.pos_end).set_context(context)
+            return value
+        return access
+
+    def compile_VarAssignNode(self, node):
+        value_form = self.visit(node.value)
+
+        def assign(state, context):
+            if state.checked:
+                state.enter(node, context)
+
+            value = value_form(state, context)
+            try:
+                res = state.assign(node, value, context, False)
+            except Exception as e:
+                if getattr(e, "rojo_node", None) is None:
+                    e.rojo_node = node
+                raise
+            if res.error:
+                raise CompiledFailure(res.error)
+            return res.value
+        return assign
+
+    def compile_BinOpNode(self, node):
+        left_form = self.visit(node.left_node)
+        right_form = self.visit(node.right_node)
+        op_type = node.op_tok.type
+        pos_start = node.pos_start
+        pos_end = node.pos_end
+
+        # The Number methods, inlined where they cannot fail
+        if op_type in (TT_PLUS, TT_MINUS, TT_MUL):
+            def arithmetic(state, context):
+                if state.checked:
+                    state.enter(node, context)
+                left = left_form(state, context)
+                right = right_form(state, context)
+
+                if state.max_int_bits is not None:
+                    error = state.int_bits_error(node, left, right, context)
+                    if error:
+                        raise CompiledFailure(error)
+
+                type_ = TT_FLOAT if left.type == TT_FLOAT or right.type == TT_FLOAT else TT_INT
+                try:
+                    value = numeric.ops[op_type](left.value, right.value)
+                except Exception as e:
+                    if getattr(e, "rojo_node", None) is None:
+                        e.rojo_node = node
+                    raise
+                result = Number(value, type_).set_context(left.context)
+                if op_type == TT_MUL and metrics.enabled and numeric.is_int(result.value):
+                    metrics.int_result(TT_MUL, result.value)
+                return result.set_pos(pos_start, pos_end)
+            return arithmetic
+
+        method = {TT_DIV: Number.dived_by, TT_MOD: Number.modded_by, TT_POW: Number.powed_by}[op_type]
+
+        def operation(state, context):
+            if state.checked:
+                state.enter(node, context)
+            left = left_form(state, context)
+            right = right_form(state, context)
+
+            if state.max_int_bits is not None:
+                error = state.int_bits_error(node, left, right, context)
+                if error:
+                    raise CompiledFailure(error)
+
+            try:
+                result, error = method(left, right)
+            except Exception as e:
+                if getattr(e, "rojo_node", None) is None:
+                    e.rojo_node = node
+                raise
+            if error:
+                raise CompiledFailure(error)
+            if op_type == TT_POW and metrics.enabled and numeric.is_int(result.value):
+                metrics.int_result(TT_POW, result.value)
+            return result.set_pos(pos_start, pos_end)
+        return operation
+
+    def compile_UnaryOpNode(self, node):
+        operand = self.visit(node.node)
+        pos_start = node.pos_start
+        pos_end = node.pos_end
+
+        if node.op_tok.type == TT_MINUS:
+            def negate(state, context):
+                if state.checked:
+                    state.enter(node, context)
+                number = operand(state, context)
+
+                type_ = TT_FLOAT if number.type == TT_FLOAT else TT_INT
+                try:
+                    value = numeric.mul(number.value, -1)
+                except Exception as e:
+                    if getattr(e, "rojo_node", None) is None:
+                        e.rojo_node = node
+                    raise
+                return Number(value, type_).set_context(number.context).set_pos(pos_start, pos_end)
+            return negate
+
+        # Like unary_op(), this moves the operand's Number to the `+`
+        if yields_stored(node.node):
+            self.infer_first = True
+
+        def plus(state, context):
+            if state.checked:
+                state.enter(node, context)
+            return operand(state, context).set_pos(pos_start, pos_end)
+        return plus
+
+    ########################################
+
+    def constant(self, node, type_):
+        value = node.tok.value
+        pos_start = node.pos_start
+        pos_end = node.pos_end
+
+        def constant(state, context):
+            if state.checked:
+                state.enter(node, context)
+            return Number(value, type_).set_pos(pos_start, pos_end).set_context(context)
+        return constant
+
+########################################
+
+# Counts runs per source and keeps the compiled forms of hot ones
+class TierCache:
+    def __init__(self, size):
+        self.size = size
+        # (fname, code): runs so far, oldest first, for sources not compiled
+        self.runs = {}
+        # (fname, code): compiled form, least recently used first
+        self.forms = {}
+
+    def get(self, key):
+        form = self.forms.pop(key, None)
+        if form is not None:
+            self.forms[key] = form
+        if metrics.enabled:
+            metrics.count_cache("compiled", form is not None)
+        return form
+
+    # Counts a run of `ast` on the Interpreter, compiling it once it has been
+    # run `threshold` times
+    def count(self, key, ast, threshold, settings):
+        runs = self.runs.pop(key, 0) + 1
+        if runs < threshold:
+            self.runs[key] = runs
+            while len(self.runs) > self.size * 4:
+                del self.runs[next(iter(self.runs))]
+            return
+
+        form = Compiler().compile(ast)
+        if form is None:
+            return
+
+        self.forms[key] = form
+        while len(self.forms) > self.size:
+            del self.forms[next(iter(self.forms))]
+
+        debug = debug_emitter(settings)
+        if debug:
+            debug.message("\033[1m\033[35mtier\033[0m  \033[1m\033[34m>\033[0m Compiled " + key[0] + " after " + str(runs) + " runs")
+
+    def clear(self):
+        self.runs.clear()
+        self.forms.clear()
+
+########################################
+# PARALLEL PARSING
+########################################
+
+# With the "jobs" setting, scripts longer than "parse_chunk_size" characters
+# are cut into chunks at line breaks, which no token or statement spans, and
+# the chunks are lexed and parsed by a pool of worker processes. Pickling a
+# chunk's AST back would cost more than parsing it, so workers send the tokens
+# the AST refers to and its nodes in postorder, and the nodes are rebuilt here
+# as the chunks arrive. Errors are those of a sequential parse: the first
+# illegal character in the script if there is one, else the first syntax error.
+
+PARSE_CHUNK_SIZE = 1 << 20
+
+CHUNK_INT = 0
+CHUNK_FLOAT = 1
+CHUNK_ACCESS = 2
+CHUNK_ASSIGN = 3
+CHUNK_BINOP = 4
+CHUNK_UNARY = 5
+
+CHUNK_ERRORS = {
+    "IllegalCharacterError": IllegalCharacterError,
+    "InvalidSyntaxError": InvalidSyntaxError,
+}
+
+# Worker processes convert integer literals with the same digit limit and
+# numeric backend
+def int_max_str_digits():
+    return sys.get_int_max_str_digits() if hasattr(sys, "get_int_max_str_digits") else None
+
+def init_parse_worker(max_str_digits, backend):
+    if max_str_digits is not None:
+        sys.set_int_max_str_digits(max_str_digits)
+    set_numeric_backend(backend)
+
+# (Start, end, first line) of each chunk
+def split_chunks(code, size):
+    newline = "\n" if isinstance(code, str) else b"\n"
+    chunks = []
+    start = 0
+    ln = 0
+
+    while start < len(code):
+        end = code.find(newline, start + size)
+        end = len(code) if end == -1 else end + 1
+        chunks.append((start, end, ln))
+        ln += code[start:end].count(newline)
+        if newline == b"\n":
+            # Chunks end after a LF, so never between the CR and LF of a CRLF
+            ln += code[start:end].count(b"\r") - code[start:end].count(b"\r\n")
+        start = end
+
+    return chunks
+
+########################################
+
+# Chunks start at the beginning of a line, so only idx and ln are offset.
+# Integers are sent as Python ints, which marshal can write.
+def encode_token(tok, encoded, idx, ln):
+    encoded.extend((
+        tok.type, numeric.to_python(tok.value),
+        tok.pos_start.idx + idx, tok.pos_start.ln + ln, tok.pos_start.col,
+        tok.pos_end.idx + idx, tok.pos_end.ln + ln, tok.pos_end.col
+    ))
+    return len(encoded) // 8 - 1
+
+def encode_error(error, idx, ln):
+    return (
+        error.error_name, error.details,
+        (error.pos_start.idx + idx, error.pos_start.ln + ln, error.pos_start.col),
+        (error.pos_end.idx + idx, error.pos_end.ln + ln, error.pos_end.col)
+    )
+
+def lex_parse_chunk(fname, text, idx, ln):
+    tokens, error = Lexer(text, fname).lex()
+    if error:
+        return "lex", encode_error(error, idx, ln)
+
+    statements, error = TableParser(tokens).parse_chunk()
+    if error:
+        return "parse", encode_error(error, idx, ln)
+
+    encoded = []
+    ops = []
+    stack = [(statement, False) for statement in reversed(statements)]
+    while stack:
+        node, children_done = stack.pop()
+
+        if isinstance(node, IntegerNode):
+            ops += (CHUNK_INT, encode_token(node.tok, encoded, idx, ln))
+        elif isinstance(node, FloatNode):
+            ops += (CHUNK_FLOAT, encode_token(node.tok, encoded, idx, ln))
+        elif isinstance(node, VarAccessNode):
+            ops += (CHUNK_ACCESS, encode_token(node.var_name_tok, encoded, idx, ln))
+        elif not children_done:
+            stack.append((node, True))
+            if isinstance(node, BinOpNode):
+                stack.append((node.right_node, False))
+                stack.append((node.left_node, False))
+            elif isinstance(node, UnaryOpNode):
+                stack.append((node.node, False))
+            else:
+                stack.append((node.value, False))
+        elif isinstance(node, BinOpNode):
+            ops += (CHUNK_BINOP, encode_token(node.op_tok, encoded, idx, ln))
+        elif isinstance(node, UnaryOpNode):
+            ops += (CHUNK_UNARY, encode_token(node.op_tok, encoded, idx, ln))
+        else:
+            type_ = encode_token(node.type, encoded, idx, ln) if node.type else -1
+            ops += (CHUNK_ASSIGN, encode_token(node.var_name_tok, encoded, idx, ln), type_)
+
+    return "ok", marshal.dumps((encoded, ops))
+
+def decode_chunk(data, source):
+    encoded, ops = marshal.loads(data)
+
+    tokens = []
+    for i in range(0, len(encoded), 8):
+        tok = Token(encoded[i], encoded[i + 1])
+        tok.pos_start = Position(encoded[i + 2], encoded[i + 3], encoded[i + 4], source)
+        tok.pos_end = Position(encoded[i + 5], encoded[i + 6], encoded[i + 7], source)
+        tokens.append(tok)
+
+    stack = []
+    i = 0
+    while i < len(ops):
+        kind = ops[i]
+        tok = tokens[ops[i + 1]]
+
+        if kind == CHUNK_INT:
+            tok.value = numeric.to_int(tok.value)
+            stack.append(IntegerNode(tok))
+        elif kind == CHUNK_FLOAT:
+            stack.append(FloatNode(tok))
+        elif kind == CHUNK_ACCESS:
+            stack.append(VarAccessNode(tok))
+        elif kind == CHUNK_BINOP:
+            right = stack.pop()
+            stack[-1] = BinOpNode(stack[-1], tok, right)
+        elif kind == CHUNK_UNARY:
+            stack[-1] = UnaryOpNode(tok, stack[-1])
+        else:
+            type_ = tokens[ops[i + 2]] if ops[i + 2] != -1 else None
+            stack[-1] = VarAssignNode(type_, tok, stack[-1])
+            i += 1
+        i += 2
+
+    return stack
+
+########################################
+
+# Returns None if the script holds no statements, leaving the error to the
+# sequential parser
+def parse_parallel(fname, code, settings):
+    import concurrent.futures
+
+    chunks = split_chunks(code, settings.get("parse_chunk_size", PARSE_CHUNK_SIZE))
+    source = Source(fname, code)
+
+    statements = []
+    lex_error = None
+    parse_error = None
+
+    # The rebuilt nodes hold no reference cycles, and collections triggered
+    # by creating millions of them would cost more than building them
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+            settings["jobs"], initializer=init_parse_worker, initargs=(int_max_str_digits(), numeric.name)
+        ) as pool:
+            results = pool.map(
+                lex_parse_chunk,
+                [fname] * len(chunks),
+                [code[start:end] for start, end, ln in chunks],
+                [start for start, end, ln in chunks],
+                [ln for start, end, ln in chunks]
+            )
+
+            for status, data in results:
+                if status == "lex" and lex_error is None:
+                    lex_error = data
+                elif status == "parse" and parse_error is None:
+                    parse_error = data
+                elif status == "ok" and lex_error is None and parse_error is None:
+                    statements += decode_chunk(data, source)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    error = lex_error or parse_error
+    if error:
+        name, details, start, end = error
+        return None, CHUNK_ERRORS[name](Position(*start, source), Position(*end, source), details)
+
+    if len(statements) == 0:
+        return None
+    if len(statements) == 1:
+        return AbstractSyntaxTree(statements[0]), None
+    return AbstractSyntaxTree(StatementsNode(statements)), None
+
+########################################
+# PARALLEL STATEMENTS
+########################################
+
+# With the "jobs" setting, the statements of a script are spread over a pool
+# of worker processes. Two statements conflict when one assigns a variable the
+# other uses or assigns, and each statement runs in the first wave after every
+# earlier statement it conflicts with, so the statements of one wave can run
+# in any order. Workers parse the script once, evaluate each statement against
+# copies of the variables it uses, and send back the variables it assigned.
+# These are merged into the symbol table in program order, up to and including
+# the first statement that failed, as if the statements had run one by one.
+
+# Variables assigned by, and all variables named in, a statement
+def statement_names(node):
+    assigned = set()
+    named = set()
+
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, VarAccessNode):
+            named.add(node.var_name_tok.value)
+        elif isinstance(node, VarAssignNode):
+            assigned.add(node.var_name_tok.value)
+            named.add(node.var_name_tok.value)
+            stack.append(node.value)
+        elif isinstance(node, BinOpNode):
+            stack.append(node.left_node)
+            stack.append(node.right_node)
+        elif isinstance(node, UnaryOpNode):
+            stack.append(node.node)
+
+    return assigned, named
+
+# Lists of statement indices, in program order within each wave
+def statement_waves(names):
+    assigned_in = {}
+    named_in = {}
+    waves = []
+
+    for i in range(len(names)):
+        assigned, named = names[i]
+
+        wave = 0
+        for name in named:
+            if name in assigned_in:
+                wave = max(wave, assigned_in[name] + 1)
+        for name in assigned:
+            if name in named_in:
+                wave = max(wave, named_in[name] + 1)
+
+        for name in assigned:
+            assigned_in[name] = wave
+        for name in named:
+            named_in[name] = max(named_in.get(name, 0), wave)
+
+        if wave == len(waves):
+            waves.append([])
+        waves[wave].append(i)
+
+    return waves
+
+########################################
+
+# Values and errors cross process boundaries without their Context, and with
+# positions in the script's own Source sent as None instead of the whole text
+def pack_position(pos, source):
+    return (pos.idx, pos.ln, pos.col, None if pos.source is source else pos.source)
+
+def unpack_position(packed, source):
+    idx, ln, col, pos_source = packed
+    return Position(idx, ln, col, source if pos_source is None else pos_source)
+
+def pack_value(value, source):
+    if not isinstance(value, Number):
+        return value
+
+    positions = None
+    if value.pos_start is not None:
+        positions = (pack_position(value.pos_start, source), pack_position(value.pos_end, source))
+    return (value.value, value.type, positions)
+
+def unpack_value(packed, source, context):
+    if not isinstance(packed, tuple):
+        return packed
+
+    value, type_, positions = packed
+    number = Number(value, type_).set_context(context)
+    if positions is not None:
+        number.set_pos(unpack_position(positions[0], source), unpack_position(positions[1], source))
+    return number
+
+def pack_error(error, source):
+    error.pos_start = pack_position(error.pos_start, source)
+    error.pos_end = pack_position(error.pos_end, source)
+    if isinstance(error, RuntimeError):
+        error.context = None
+    return error
+
+def unpack_error(error, source, context):
+    error.pos_start = unpack_position(error.pos_start, source)
+    error.pos_end = unpack_position(error.pos_end, source)
+    if isinstance(error, RuntimeError):
+        error.context = context
+    return error
+
+########################################
+
+statement_worker = None
+
+def init_statement_worker(fname, code, max_int_bits, deadline, infer, max_str_digits, backend):
+    global statement_worker
+
+    init_parse_worker(max_str_digits, backend)
+
+    tokens, error = Lexer(code, fname).lex()
+    ast, error = TableParser(tokens).parse()
+    statements = ast.node.statements
+    assigned = [statement_names(statement)[0] for statement in statements]
+
+    statement_worker = (fname, code, statements, assigned, max_int_bits, deadline, infer)
+
+# Evaluates one statement, `inputs` maps the variables it names to their
+# declared type and value (None if undefined)
+def evaluate_statement(index, inputs):
+    fname, code, statements, assigned, max_int_bits, deadline, infer = statement_worker
+    statement = statements[index]
+    source = statement.pos_start.source
+
+    context = Context('<global>')
+    context.symbol_table = SymbolTable()
+    for name, (type_, value) in inputs.items():
+        if type_ is not None:
+            context.symbol_table.types[name] = type_
+        if value is not None:
+            context.symbol_table.symbols[name] = unpack_value(value, source, context)
+
+    value = None
+    error = None
+    try:
+        if infer:
+            error = TypeInferencer(context.symbol_table, None, max_int_bits).infer(statement, context)
+        if error is None:
+            result = Interpreter(None, max_int_bits, deadline).visit(statement, context)
+            value, error = result.value, result.error
+    except Exception as e:
+        error = internal_error(fname, code, e)
+
+    outputs = {}
+    for name in assigned[index]:
+        if name in context.symbol_table.symbols:
+            outputs[name] = (context.symbol_table.types.get(name), pack_value(context.symbol_table.symbols[name], source))
+
+    if error:
+        return None, pack_error(error, source), outputs
+    return pack_value(value, source), None, outputs
+
+########################################
+
+# The waves to run a script's statements in, or None if it should run
+# sequentially (node budgets are counted across the whole run, so they force
+# sequential execution too)
+def parallel_waves(ast, settings):
+    if settings.get("jobs", 1) <= 1 or settings.get("max_nodes") is not None:
+        return None
+    if not isinstance(ast.node, StatementsNode):
+        return None
+
+    names = [statement_names(statement) for statement in ast.node.statements]
+    waves = statement_waves(names)
+    if max([len(wave) for wave in waves]) == 1:
+        return None
+    return names, waves
+
+def run_parallel(fname, code, ast, plan, context, settings, deadline):
+    import concurrent.futures
+
+    names, waves = plan
+    statements = ast.node.statements
+    source = ast.pos_start.source
+    symbol_table = context.symbol_table
+    max_str_digits = int_max_str_digits()
+
+    # Workers lex the script again, from a copy of a memory map
+    if not isinstance(code, (str, bytes)):
+        code = bytes(code)
+
+    # Variables assigned by statements that finished, before they are merged
+    assigned = {}
+    results = {}
+    first_error = len(statements)
+
+    with concurrent.futures.ProcessPoolExecutor(
+        settings["jobs"], initializer=init_statement_worker,
+        initargs=(fname, code, settings.get("max_int_bits"), deadline, settings.get("infer_types", True), max_str_digits, numeric.name)
+    ) as pool:
+        for wave in waves:
+            # Nothing after the first failed statement would have run
+            wave = [i for i in wave if i < first_error]
+
+            futures = []
+            for i in wave:
+                inputs = {}
+                for name in names[i][1]:
+                    if name in assigned:
+                        inputs[name] = assigned[name]
+                    else:
+                        value = symbol_table.get(name)
+                        inputs[name] = (symbol_table.get_type(name), None if value is None else pack_value(value, source))
+                futures.append(pool.submit(evaluate_statement, i, inputs))
+
+            for i, future in zip(wave, futures):
+                results[i] = future.result()
+                if results[i][1]:
+                    first_error = min(first_error, i)
+                assigned.update(results[i][2])
+
+    for i in sorted(results):
+        if i > first_error:
+            break
+        for name, (type_, value) in results[i][2].items():
+            symbol_table.set(type_, name, unpack_value(value, source, context))
+
+    if first_error < len(statements):
+        return RuntimeResult().failure(unpack_error(results[first_error][1], source, context))
+    return RuntimeResult().success(unpack_value(results[len(statements) - 1][0], source, context))
+
+########################################
+# DEBUG OUTPUT
+########################################
+
+ANSI_ESCAPE = re.compile("\033\\[[0-9;]*m")
+
+DEBUG_FLUSH_CHARS = 1 << 13
+
+# Writes debug information (token lists, ASTs and messages) to a stream as it
+# is produced, rather than building one string for the whole dump. ASTs are
+# walked with an explicit stack, so deep trees cannot hit the recursion limit.
+#   format:    "text" (the same as str(tokens)/str(ast)) or "json"
+#   max_depth: AST nodes deeper than this are written as "..."
+#   max_chars: Each dump stops after this many characters
+# Colours are only used when writing to stdout.
+class DebugEmitter:
+    def __init__(self, stream=None, format_="text", max_depth=None, max_chars=None):
+        self.stream = stream if stream is not None else sys.stdout
+        self.format = format_
+        self.max_depth = max_depth
+        self.max_chars = max_chars
+        self.color = self.stream is sys.stdout
+
+    def message(self, text):
+        if self.format == "json":
+            text = json.dumps({"message": ANSI_ESCAPE.sub("", text)})
+        elif not self.color:
+            text = ANSI_ESCAPE.sub("", text)
+        self.stream.write(text + "\n")
+
+    def tokens(self, tokens):
+        self.dump("tok", self.token_pieces(tokens))
+
+    def ast(self, ast):
+        self.dump("ast", self.ast_pieces(ast))
+
+    ########################################
+
+    def dump(self, label, pieces):
+        if self.format == "json":
+            prefix = '{"' + label + '": '
+            suffix = "}\n"
+        elif self.color:
+            prefix = "\033[1m\033[33m" + label + "\033[0m   \033[1m\033[34m>\033[0m "
+            suffix = "\n"
+        else:
+            prefix = label + "   > "
+            suffix = "\n"
+
+        buffer = [prefix]
+        buffered = 0
+        written = 0
+
+        for piece in pieces:
+            if self.max_chars is not None and written + len(piece) > self.max_chars:
+                buffer.append(piece[:self.max_chars - written])
+                buffer.append(" ...(truncated)\n")
+                self.stream.write("".join(buffer))
+                return
+
+            buffer.append(piece)
+            buffered += len(piece)
+            written += len(piece)
+            if buffered >= DEBUG_FLUSH_CHARS:
+                self.stream.write("".join(buffer))
+                buffer = []
+                buffered = 0
+
+        buffer.append(suffix)
+        self.stream.write("".join(buffer))
+
+    def token_pieces(self, tokens):
+        yield "["
+        for i in range(len(tokens)):
+            if i != 0:
+                yield ", "
+            if self.format == "json":
+                yield json.dumps({"type": tokens[i].type, "value": numeric.to_python(tokens[i].value)})
+            else:
+                yield repr(tokens[i])
+        yield "]"
+
+    def ast_pieces(self, ast):
+        stack = [(ast, 0)]
+
+        while stack:
+            item, depth = stack.pop()
+            if isinstance(item, str):
+                yield item
+                continue
+
+            if self.max_depth is not None and depth > self.max_depth:
+                yield '"..."' if self.format == "json" else "..."
+                continue
+
+            method = getattr(self, f'{self.format}_{type(item).__name__}', None)
+            if method is None:
+                yield json.dumps(repr(item)) if self.format == "json" else repr(item)
+                continue
+
+            parts = method(item)
+            for i in range(len(parts) - 1, -1, -1):
+                stack.append((parts[i], depth + 1))
+
+    ########################################
+
+    def text_AbstractSyntaxTree(self, node):
+        return [node.node] if node.node is not None else ["None"]
+
+    def text_StatementsNode(self, node):
+        parts = ['StatementsNode:[']
+        for i in range(len(node.statements)):
+            if i != 0:
+                parts.append(', ')
+            parts.append(node.statements[i])
+        parts.append(']')
+        return parts
+
+    def text_IntegerNode(self, node):
+        return [str(node.tok)]
+
+    def text_FloatNode(self, node):
+        return [str(node.tok)]
+
+    def text_VarAccessNode(self, node):
+        return [str(node.var_name_tok)]
+
+    def text_VarAssignNode(self, node):
+        return ['VarAssignNode:(' + str(node.var_name_tok) + ', ', node.value, ')']
+
+    def text_BinOpNode(self, node):
+        return ['BinOpNode:(', node.left_node, ', ' + str(node.op_tok) + ', ', node.right_node, ')']
+
+    def text_UnaryOpNode(self, node):
+        return ['UnaryOpNode:(' + str(node.op_tok) + ', ', node.node, ')']
+
+    ########################################
+
+    def json_AbstractSyntaxTree(self, node):
+        return ['{"node": "AbstractSyntaxTree", "root": ', node.node if node.node is not None else "null", '}']
+
+    def json_StatementsNode(self, node):
+        parts = ['{"node": "StatementsNode", "statements": [']
+        for i in range(len(node.statements)):
+            if i != 0:
+                parts.append(', ')
+            parts.append(node.statements[i])
+        parts.append(']}')
+        return parts
+
+    def json_IntegerNode(self, node):
+        return [json.dumps({"node": "IntegerNode", "value": numeric.to_python(node.tok.value)})]
+
+    def json_FloatNode(self, node):
+        return [json.dumps({"node": "FloatNode", "value": node.tok.value})]
+
+    def json_VarAccessNode(self, node):
+        return [json.dumps({"node": "VarAccessNode", "name": node.var_name_tok.value})]
+
+    def json_VarAssignNode(self, node):
+        type_ = node.type.value if node.type else None
+        return [
+            '{"node": "VarAssignNode", "type": ' + json.dumps(type_) + ', "name": ' + json.dumps(node.var_name_tok.value) + ', "value": ',
+            node.value, '}'
+        ]
+
+    def json_BinOpNode(self, node):
+        return ['{"node": "BinOpNode", "op": "' + node.op_tok.type + '", "left": ', node.left_node, ', "right": ', node.right_node, '}']
+
+    def json_UnaryOpNode(self, node):
+        return ['{"node": "UnaryOpNode", "op": "' + node.op_tok.type + '", "operand": ', node.node, '}']
+
+# Settings controlling debug output, all optional:
+#   debug:        Whether to write any (Default False)
+#   debug_stream: File-like object to write to (Default stdout)
+#   debug_format: "text" or "json" (Default "text")
+#   debug_depth:  Maximum AST depth to write
+#   debug_limit:  Maximum characters per token list or AST dump
+def debug_emitter(settings):
+    if not settings.get("debug", False):
+        return None
+
+    return DebugEmitter(
+        settings.get("debug_stream"), settings.get("debug_format", "text"),
+        settings.get("debug_depth"), settings.get("debug_limit"))
+
 ########################################
 # ENTRY (RUN)
 ########################################
 
+# The variables run() works on, shared by every call in the process. Use an
+# Engine (see ENGINE) for separate sets of variables.
 global_symbol_table = SymbolTable()
-global_symbol_table.set("int", "foo", 12)
 
-def run(fname, code, settings):
+# Makes this process read the global variables from a SharedSymbolTable built
+# by another process, with a fresh table on top for its own assignments
+def attach_shared_globals(name):
+    global global_symbol_table
+
+    global_symbol_table = SymbolTable()
+    global_symbol_table.parent = SharedSymbolTable(name)
+
+def deadline_from(settings):
+    if settings.get("deadline") is None:
+        return None
+    return time.monotonic() + settings["deadline"]
+
+def check_source_size(fname, code, settings):
+    limit = settings.get("max_source")
+    if limit is None or len(code) <= limit:
+        return None
+
+    source = Source(fname, code)
+    ln, col = source.line_col(limit)
+    return source_size_error(Position(limit, ln, col, source), len(code), limit)
+
+# Points at everything past the limit, from pos_start where it is reached
+def source_size_error(pos_start, size, limit):
+    pos_end = Position(pos_start.idx + size - limit, pos_start.ln, pos_start.col + size - limit, pos_start.source)
+
+    return ResourceLimitError(
+        pos_start, pos_end, Context('<global>'),
+        "Source is " + str(size) + " characters long (Limit is " + str(limit) + ")"
+    )
+
+def infer_types(ast, context, settings):
+    if not settings.get("infer_types", True):
+        return None
+
+    inferencer = TypeInferencer(context.symbol_table, settings.get("max_nodes"), settings.get("max_int_bits"))
+    error = inferencer.infer(ast, context)
+    if error and settings.get("debug", False):
+        debug_emitter(settings).message("\033[1m\033[31mType Error Encountered (Before Execution)\033[0m")
+    return error
+
+# Stores the seconds since `start` as the time of `phase` (see record_seconds())
+def record_timing(settings, phase, start):
+    record_seconds(settings, phase, time.perf_counter() - start)
+
+# Stores `seconds` as the time of `phase` in the metrics and in
+# settings["timings"]
+def record_seconds(settings, phase, seconds):
+    if metrics.enabled:
+        # Histogram.observe(), inlined as it runs four times a run
+        histogram = metrics.phases[phase]
+        histogram.counts[bisect.bisect_left(METRIC_BUCKETS, seconds)] += 1
+        histogram.sum += seconds
+
+    timings = settings.get("timings")
+    if timings is not None:
+        timings[phase] = seconds
+
+def parse(fname, code, settings):
+    debug = debug_emitter(settings)
+    start = time.perf_counter()
+
+    error = check_source_size(fname, code, settings)
+    if error:
+        if debug:
+            debug.message("\033[1m\033[31mSource Size Error Encountered\033[0m")
+        return None, error
+
+    if not debug and settings.get("jobs", 1) > 1 and len(code) > settings.get("parse_chunk_size", PARSE_CHUNK_SIZE):
+        result = parse_parallel(fname, code, settings)
+        if result is not None:
+            record_timing(settings, "parse", start)
+            return result
+
     # Lex the code given to us by ROSH or the command line
     lexer = Lexer(code, fname)
     tokens, error = lexer.lex()
+    record_timing(settings, "lex", start)
 
-    if settings["debug"]:
-        print("\033[1m\033[33mtok\033[0m   \033[1m\033[34m>\033[0m " + str(tokens))
+    if debug:
+        debug.tokens(tokens)
 
     if error:
-        if settings["debug"]:
-            print("\033[1m\033[33mast\033[0m   \033[1m\033[34m>\033[0m Unavailable (Parser Not Reached)")
-            print("\033[1m\033[31mLexing Error Encountered\033[0m")
+        if debug:
+            debug.message("\033[1m\033[33mast\033[0m   \033[1m\033[34m>\033[0m Unavailable (Parser Not Reached)")
+            debug.message("\033[1m\033[31mLexing Error Encountered\033[0m")
         return None, error
 
     # Generate AbstractSyntaxTree with the tokens from the lexer
-    parser = Parser(tokens)
+    start = time.perf_counter()
+    parser = TableParser(tokens)
     ast, error = parser.parse()
-    if settings["debug"] and not error:
-        print("\033[1m\033[33mast\033[0m   \033[1m\033[34m>\033[0m " + str(ast))
+    record_timing(settings, "parse", start)
+    if debug and not error:
+        debug.ast(ast)
+
+    if error:
+        if debug:
+            debug.message("\033[1m\033[33mast\033[0m   \033[1m\033[34m>\033[0m Unavailable (Parser Error)")
+            debug.message("\033[1m\033[31mParsing Error Encountered\033[0m")
+        return ast, error
 
+    return ast, None
+
+# Besides "debug", settings may hold resource budgets for untrusted code. Any
+# breach fails the run with a ResourceLimitError:
+#   max_nodes:    Maximum number of AST nodes evaluated
+#   max_int_bits: Maximum bit length of an integer `*` or `**` result,
+#                 estimated before the operation is performed
+#   max_source:   Maximum length of the source in characters
+#   deadline:     Seconds of wall-clock time allowed for the run
+#
+# When "jobs" is more than 1, large scripts are parsed in parallel (see
+# PARALLEL PARSING) and independent statements run in parallel (see PARALLEL
+# STATEMENTS), with the same results as doing so sequentially.
+#
+# Types are inferred before execution unless "infer_types" is False, and a
+# type error found then is returned without running the code.
+#
+# If "timings" is a dict, the seconds spent in each phase that ran ("lex",
+# "parse", "infer", "eval") are stored in it.
+#
+# Sources run "tier_threshold" times (Default TIER_THRESHOLD, None to never
+# compile) are compiled and run without lexing or parsing them again (see
+# COMPILER). Sources that would run their statements in parallel are not.
+#
+# `code` may also be UTF-8 bytes or a file mapped by map_source(), which is
+# lexed in place (see ByteLexer). Its size for max_source is then in bytes,
+# and it is never compiled.
+#
+# Internal failures (OverflowError, RecursionError, ...) never escape run();
+# they are returned as a RojoInternalError so the caller's session survives.
+def run(fname, code, settings):
+    try:
+        result, error = run_unguarded(fname, code, settings)
+    except Exception as e:
+        result, error = None, internal_error(fname, code, e)
+        debug = debug_emitter(settings)
+        if debug:
+            debug.message(error.traceback.rstrip("\n"))
+            debug.message("\033[1m\033[31mInternal Error Encountered\033[0m")
+
+    if metrics.enabled:
+        metrics.count_run(error)
+    return result, error
+
+# Compiled forms of the sources run by run()
+compiled_forms = TierCache(TIER_CACHE_SIZE)
+
+def run_unguarded(fname, code, settings):
+    deadline = deadline_from(settings)
+    threshold = settings.get("tier_threshold", TIER_THRESHOLD)
+
+    # Sources given as bytes are files, not lines run over and over
+    if not isinstance(code, str):
+        threshold = None
+
+    if threshold is not None:
+        form = compiled_forms.get((fname, code))
+        if form is not None:
+            return execute_compiled(fname, code, form, global_symbol_table, settings, deadline)
+
+    ast, error = parse(fname, code, settings)
     if error:
-        if settings["debug"]:
-            print("\033[1m\033[33mast\033[0m   \033[1m\033[34m>\033[0m Unavailable (Parser Error)")
-            print("\033[1m\033[31mParsing Error Encountered\033[0m")
         return ast, error
 
+    if threshold is not None and parallel_waves(ast, settings) is None:
+        compiled_forms.count((fname, code), ast, threshold, settings)
+    return execute(fname, code, ast, global_symbol_table, settings, deadline)
+
+# Infers the types of a parsed script and runs it on `symbol_table`
+def execute(fname, code, ast, symbol_table, settings, deadline):
+    context = Context('<global>')
+    context.symbol_table = symbol_table
+    start = time.perf_counter()
+    error = infer_types(ast, context, settings)
+    record_timing(settings, "infer", start)
+    if error:
+        return None, error
+
     # Execute code according to the AST from the parser
-    interpreter = Interpreter()
+    start = time.perf_counter()
+    plan = parallel_waves(ast, settings)
+    if plan:
+        result = run_parallel(fname, code, ast, plan, context, settings, deadline)
+    else:
+        interpreter = Interpreter(settings.get("max_nodes"), settings.get("max_int_bits"), deadline)
+        result = interpreter.visit(ast, context)
+    record_timing(settings, "eval", start)
+
+    if result.error and settings.get("debug", False):
+        debug_emitter(settings).message("\033[1m\033[31mInterpreter Error Encountered\033[0m")
+
+    return result.value, result.error
+
+# Runs the compiled form of a script like execute() runs its AST
+def execute_compiled(fname, code, form, symbol_table, settings, deadline):
+    debug = debug_emitter(settings)
+
+    error = check_source_size(fname, code, settings)
+    if error:
+        if debug:
+            debug.message("\033[1m\033[31mSource Size Error Encountered\033[0m")
+        return None, error
+
+    if debug:
+        debug.message("\033[1m\033[35mtier\033[0m  \033[1m\033[34m>\033[0m Running the compiled form of " + fname + " (No tokens or AST)")
+
+    context = Context('<global>')
+    context.symbol_table = symbol_table
+    if form.ast is not None:
+        start = time.perf_counter()
+        error = infer_types(form.ast, context, settings)
+        record_timing(settings, "infer", start)
+        if error:
+            return None, error
+
+    interpreter = Interpreter(settings.get("max_nodes"), settings.get("max_int_bits"), deadline)
+    start = time.perf_counter()
+    try:
+        value, error = form.run(interpreter, context), None
+    except CompiledFailure as e:
+        value, error = None, e.error
+    record_timing(settings, "eval", start)
+
+    if error and debug:
+        debug.message("\033[1m\033[31mInterpreter Error Encountered\033[0m")
+
+    return value, error
+
+# Asynchronous counterpart to run() for use inside an asyncio event loop.
+# Evaluation yields to the loop every `yield_every` nodes, so many evaluations
+# can share one loop, and the task can be cancelled at any of those points.
+# Sources longer than EXPENSIVE_SOURCE_CHARS are lexed and parsed on the
+# executor when there is one; otherwise lexing and parsing, and always type
+# inference, run on the loop without yielding.
+# Supported settings on top of run()'s:
+#   yield_every: Nodes to evaluate between yields, at least 1 (Default 1000)
+#   timeout:     Seconds allowed for this call, raises asyncio.TimeoutError
+#   executor:    concurrent.futures thread pool for long sources and expensive
+#                integer `*`/`**`, which give up at the timeout or deadline
+#                like the rest
+async def run_async(fname, code, settings):
+    import asyncio
+
+    if settings.get("yield_every", 1000) < 1:
+        raise ValueError("yield_every must be at least 1, got " + str(settings["yield_every"]))
+
+    try:
+        result, error = await run_async_unguarded(fname, code, settings)
+    except asyncio.TimeoutError:
+        raise
+    except Exception as e:
+        result, error = None, internal_error(fname, code, e)
+        debug = debug_emitter(settings)
+        if debug:
+            debug.message(error.traceback.rstrip("\n"))
+            debug.message("\033[1m\033[31mInternal Error Encountered\033[0m")
+
+    if metrics.enabled:
+        metrics.count_run(error)
+    return result, error
+
+async def run_async_unguarded(fname, code, settings):
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    timeout_at = None
+    if settings.get("timeout") is not None:
+        timeout_at = loop.time() + settings["timeout"]
+    deadline = deadline_from(settings)
+
+    executor = settings.get("executor")
+    if executor is not None and len(code) > EXPENSIVE_SOURCE_CHARS:
+        future = loop.run_in_executor(executor, parse, fname, code, settings)
+        if timeout_at is None:
+            ast, error = await future
+        else:
+            ast, error = await asyncio.wait_for(future, max(timeout_at - loop.time(), 0))
+    else:
+        ast, error = parse(fname, code, settings)
+    if error:
+        return ast, error
+
     context = Context('<global>')
     context.symbol_table = global_symbol_table
-    result = interpreter.visit(ast, context)
+    start = time.perf_counter()
+    error = infer_types(ast, context, settings)
+    record_timing(settings, "infer", start)
+    if error:
+        return None, error
+
+    interpreter = AsyncInterpreter(
+        settings.get("yield_every", 1000), timeout_at, settings.get("executor"),
+        settings.get("max_nodes"), settings.get("max_int_bits"), deadline)
+    start = time.perf_counter()
+    result = await interpreter.visit(ast, context)
+    record_timing(settings, "eval", start)
 
-    if result.error and settings["debug"]:
-        print("\033[1m\033[31mInterpreter Error Encountered\033[0m")
+    if result.error and settings.get("debug", False):
+        debug_emitter(settings).message("\033[1m\033[31mInterpreter Error Encountered\033[0m")
 
     return result.value, result.error
+
+########################################
+# STREAMING
+########################################
+
+# run_stream() runs a script read from an iterable of its lines, such as an
+# open file, without ever holding all of it: the lines are lexed one at a time
+# into a generator of tokens, the tokens are cut into statements at line
+# breaks, which no statement spans, and each statement is parsed, run and
+# dropped before the next one is read. Memory use is bounded by the largest
+# statement rather than by the script.
+#
+# Each line gets a Source of its own that knows the line number it starts on,
+# so positions and errors are those of run() on the whole script. Lines after
+# the first keep the line break before them in their Source, as arrow_string()
+# shows it.
+#
+# Statements run until an error is found, so unlike with run(), a lexing,
+# parsing or type error in the script leaves the statements before it run.
+# The nodes evaluated and the budgets spent are otherwise those of run(),
+# though a budget already breached before the first statement runs is
+# reported on that statement rather than on the whole script.
+
+# Parses the tokens of a line holding a statement, ending with an EOF token,
+# into that statement. Returns (statement, error).
+def parse_line(tokens):
+    statements, error = TableParser(tokens).parse_chunk()
+    if not error and not statements:
+        error = TableParser(tokens).parse()[1]
+    if error:
+        return None, error
+    return statements[0], None
+
+class StatementStream:
+    def __init__(self, fname, lines, settings):
+        self.fname = fname
+        self.lines = lines
+        self.settings = settings
+        self.debug = debug_emitter(settings)
+        self.error = None
+
+        # The line being read and its number, for internal_error()
+        self.line = ""
+        self.ln = 0
+
+    # Yields (token, error) for every token of the script up to its EOF token
+    # or the first error
+    def tokens(self):
+        limit = self.settings.get("max_source")
+        size = 0
+        lines = itertools.chain(self.lines, [""])
+
+        for line in lines:
+            self.line = line
+            if self.ln == 0:
+                source = Source(self.fname, line)
+                start = Position(0, 0, 0, source)
+            else:
+                source = Source(self.fname, "\n" + line, self.ln - 1)
+                start = Position(1, self.ln, 0, source)
+
+            if limit is not None and size + len(line) > limit:
+                col = limit - size
+                size += len(line) + sum(len(rest) for rest in lines)
+                yield None, source_size_error(Position(start.idx + col, self.ln, col, source), size, limit)
+                return
+            size += len(line)
+
+            lexer = Lexer(source.text, self.fname, start)
+            while True:
+                token, error = lexer.next_token()
+                if error or token.type != TT_EOF:
+                    yield token, error
+                    if error:
+                        return
+                elif not line.endswith("\n"):
+                    yield token, None
+                    return
+                else:
+                    break
+
+            self.ln += 1
+
+    # Yields (statement, more) for every statement, where `more` tells whether
+    # anything follows it. Stops at the first error, leaving it in self.error.
+    def __iter__(self):
+        pending = None
+        found = False
+        statement_tokens = []
+
+        for token, error in self.tokens():
+            if error:
+                if pending is not None:
+                    yield pending, True
+                if token is None:
+                    self.fail(error, "\033[1m\033[31mSource Size Error Encountered\033[0m")
+                else:
+                    if self.debug:
+                        self.debug.tokens(statement_tokens + [token])
+                    self.fail(error, "\033[1m\033[33mast\033[0m   \033[1m\033[34m>\033[0m Unavailable (Parser Not Reached)", "\033[1m\033[31mLexing Error Encountered\033[0m")
+                return
+
+            if token.type not in (TT_NEWLINE, TT_EOF):
+                if pending is not None:
+                    yield pending, True
+                    pending = None
+                statement_tokens.append(token)
+            elif statement_tokens:
+                pending = self.parse(statement_tokens, token)
+                if pending is None:
+                    return
+                found = True
+                statement_tokens = []
+
+        if pending is not None:
+            yield pending, False
+        elif not found:
+            # An empty script fails to parse like it does with run()
+            self.parse([], token)
+
+    def parse(self, statement_tokens, end):
+        tokens = statement_tokens + [end]
+        if end.type == TT_NEWLINE:
+            tokens.append(Token(TT_EOF, pos_start=end.pos_end))
+        if self.debug:
+            self.debug.tokens(tokens)
+
+        statement, error = parse_line(tokens)
+        if error:
+            self.fail(error, "\033[1m\033[33mast\033[0m   \033[1m\033[34m>\033[0m Unavailable (Parser Error)", "\033[1m\033[31mParsing Error Encountered\033[0m")
+            return None
+
+        if self.debug:
+            self.debug.ast(AbstractSyntaxTree(statement))
+        return statement
+
+    def fail(self, error, *messages):
+        self.error = error
+        if self.debug:
+            for message in messages:
+                self.debug.message(message)
+
+# Runs a script like run(), reading it statement by statement from `lines`.
+# "jobs" and "tier_threshold" are ignored, and the time spent lexing is
+# included in that of "parse".
+def run_stream(fname, lines, settings):
+    stream = StatementStream(fname, lines, settings)
+    try:
+        result, error = run_stream_unguarded(stream, settings)
+    except Exception as e:
+        result, error = None, internal_error(fname, stream.line, e, stream.ln)
+        debug = debug_emitter(settings)
+        if debug:
+            debug.message(error.traceback.rstrip("\n"))
+            debug.message("\033[1m\033[31mInternal Error Encountered\033[0m")
+
+    if metrics.enabled:
+        metrics.count_run(error)
+    return result, error
+
+def run_stream_unguarded(stream, settings):
+    deadline = deadline_from(settings)
+    max_nodes = settings.get("max_nodes")
+    infer_settings = dict(settings)
+
+    # Seconds spent in each phase over all statements, None until it runs
+    parse_seconds = 0.0
+    infer_seconds = None
+    eval_seconds = None
+
+    context = Context('<global>')
+    context.symbol_table = global_symbol_table
+    interpreter = Interpreter(max_nodes, settings.get("max_int_bits"), deadline)
+
+    value = None
+    error = None
+    first = True
+    statements = iter(stream)
+    while True:
+        start = time.perf_counter()
+        item = next(statements, None)
+        parse_seconds += time.perf_counter() - start
+        if item is None:
+            error = stream.error
+            break
+        statement, more = item
+
+        # The nodes above the statements in the AST of the whole script, which
+        # are charged before the first statement runs
+        wrappers = []
+        if first:
+            first = False
+            wrappers.append(AbstractSyntaxTree(statement))
+            if more:
+                wrappers.append(StatementsNode([statement]))
+
+        # Inference may only count on the budget the nodes before leave
+        start = time.perf_counter()
+        if max_nodes is not None:
+            infer_settings["max_nodes"] = max_nodes - interpreter.nodes - len(wrappers)
+        error = infer_types(statement, context, infer_settings)
+        infer_seconds = (infer_seconds or 0.0) + time.perf_counter() - start
+        if error:
+            break
+
+        start = time.perf_counter()
+        result = None
+        if wrappers:
+            # enter() charges and counts a node like visit() does
+            try:
+                for node in wrappers:
+                    interpreter.enter(node, context)
+            except CompiledFailure as e:
+                error = e.error
+
+        if error is None:
+            result = interpreter.visit(statement, context)
+        eval_seconds = (eval_seconds or 0.0) + time.perf_counter() - start
+        if result is None:
+            break
+        if result.error:
+            error = result.error
+            if settings.get("debug", False):
+                stream.debug.message("\033[1m\033[31mInterpreter Error Encountered\033[0m")
+            break
+        value = result.value
+
+    record_seconds(settings, "parse", parse_seconds)
+    if infer_seconds is not None:
+        record_seconds(settings, "infer", infer_seconds)
+    if eval_seconds is not None:
+        record_seconds(settings, "eval", eval_seconds)
+
+    if error:
+        return None, error
+    return value, None
+
+########################################
+# ENGINE
+########################################
+
+# Interface for embedding Rojo in other programs. Importing this module has
+# no side effects; each Engine has its own variables and settings, so any
+# number of them can live in one process:
+#
+#   engine = Engine({"max_nodes": 10000})
+#   engine.define("int", "x", 21)
+#   program = engine.prepare("x * 2")
+#   result = engine.evaluate(program)    # or engine.evaluate("x * 2")
+#   result.ok, result.type, result.value, result.error, result.as_dict()
+#
+# Settings are those of run(), plus "parse_cache": how many programs prepared
+# from source text are kept for reuse (Default 256), and "tier_cache": how
+# many compiled forms are kept (Default TIER_CACHE_SIZE). Errors are returned in
+# the Result, never raised, and no debug output is written unless "debug" is
+# set. Values go in and come out as Python ints and floats, whatever the
+# numeric backend (see set_numeric_backend()); define() raises ValueError for
+# a type other than "int" and "float", or a value the type cannot hold.
+ENGINE_SETTINGS = {
+    "debug": False,
+    "parse_cache": 256,
+    "tier_cache": TIER_CACHE_SIZE,
+}
+
+# A parsed script, ready to be evaluated by the Engine that prepared it
+class Program:
+    def __init__(self, engine, fname, code, ast, error):
+        self.engine = engine
+        self.fname = fname
+        self.code = code
+        self.ast = ast
+        self.error = error
+
+class Result:
+    def __init__(self, number, error):
+        self.error = error
+        self.ok = error is None
+        self.type = number.type.lower() if self.ok else None
+        self.value = numeric.to_python(number.value) if self.ok else None
+
+    def as_dict(self):
+        if self.ok:
+            return {"ok": True, "type": self.type, "value": self.value}
+        return {"ok": False, "error": self.error.as_dict()}
+
+class Engine:
+    def __init__(self, settings=None, symbol_table=None):
+        self.settings = dict(ENGINE_SETTINGS)
+        if settings:
+            self.settings.update(settings)
+        self.symbol_table = symbol_table if symbol_table is not None else SymbolTable()
+        self.programs = {}
+        self.tiers = TierCache(self.settings["tier_cache"])
+
+    def define(self, type_, name, value):
+        if type_ not in ("int", "float"):
+            raise ValueError("Unknown type `" + str(type_) + "`")
+
+        # Like assignments, but an int that fits may go in a float
+        if type(value) is int and type_ == "int":
+            value = numeric.to_int(value)
+        elif type(value) is int and type_ == "float" and abs(value) <= sys.float_info.max:
+            value = float(value)
+        elif type(value) is not float or type_ != "float":
+            raise ValueError("Cannot place " + type(value).__name__ + " `" + repr(value) + "` in `" + type_ + "`")
+        self.symbol_table.set(type_, name, value)
+
+    def get(self, name):
+        value = self.symbol_table.get(name)
+        return numeric.to_python(value.value if isinstance(value, Number) else value)
+
+    ########################################
+
+    # Lexes and parses `code` once. The static types inferred for a program
+    # depend on the engine's variables, so they are inferred again each time
+    # it is evaluated.
+    def prepare(self, code, fname="<input>"):
+        key = (fname, code)
+        program = self.programs.pop(key, None)
+        if self.settings["parse_cache"] > 0 and metrics.enabled:
+            metrics.count_cache("parse", program is not None)
+        if program is None:
+            try:
+                ast, error = parse(fname, code, self.settings)
+            except Exception as e:
+                ast, error = None, internal_error(fname, code, e)
+            program = Program(self, fname, code, ast, error)
+
+        # Keep the most recently used programs last, drop the oldest
+        if self.settings["parse_cache"] > 0:
+            self.programs[key] = program
+            while len(self.programs) > self.settings["parse_cache"]:
+                del self.programs[next(iter(self.programs))]
+
+        return program
+
+    def evaluate(self, program, fname="<input>"):
+        if isinstance(program, str):
+            program = self.prepare(program, fname)
+        elif program.engine is not self:
+            raise ValueError("Program was prepared by another Engine")
+
+        if program.error:
+            value, error = None, program.error
+        else:
+            try:
+                value, error = self.execute(program)
+            except Exception as e:
+                value, error = None, internal_error(program.fname, program.code, e)
+
+        if metrics.enabled:
+            metrics.count_run(error)
+        return Result(value, error)
+
+    # Like run_unguarded(), with the program's AST in place of parsing
+    def execute(self, program):
+        deadline = deadline_from(self.settings)
+        threshold = self.settings.get("tier_threshold", TIER_THRESHOLD)
+        key = (program.fname, program.code)
+
+        if threshold is not None:
+            form = self.tiers.get(key)
+            if form is not None:
+                return execute_compiled(program.fname, program.code, form, self.symbol_table, self.settings, deadline)
+            if parallel_waves(program.ast, self.settings) is None:
+                self.tiers.count(key, program.ast, threshold, self.settings)
+
+        return execute(program.fname, program.code, program.ast, self.symbol_table, self.settings, deadline)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+# Minimal language server for Rojo. Speaks JSON-RPC with LSP framing over
+# stdin/stdout and publishes lexing/parsing diagnostics for open documents,
+# which are kept as incrementally updated rojo_document.Document objects.
+
+########################################
+# IMPORTS
+########################################
+
+import json
+import sys
+
+from rojo_document import Document
+
+########################################
+# CONSTANTS
+########################################
+
+# LSP TextDocumentSyncKind.Incremental
+SYNC_INCREMENTAL = 2
+
+SEVERITY_ERROR = 1
+
+ERROR_METHOD_NOT_FOUND = -32601
+ERROR_INTERNAL = -32603
+
+########################################
+# TRANSPORT
+########################################
+
+def read_message(stream):
+    length = None
+
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+
+        line = line.strip()
+        if not line:
+            break
+        if line.lower().startswith(b"content-length:"):
+            length = int(line[len(b"content-length:"):])
+
+    if length is None:
+        return None
+    return json.loads(stream.read(length))
+
+def write_message(stream, message):
+    body = json.dumps(message).encode()
+    stream.write(b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+    stream.flush()
+
+########################################
+# DIAGNOSTICS
+########################################
+
+def diagnostic(error):
+    return {
+        "range": {
+            "start": {"line": error.pos_start.ln, "character": error.pos_start.col},
+            "end": {"line": error.pos_end.ln, "character": error.pos_end.col},
+        },
+        "severity": SEVERITY_ERROR,
+        "source": "rojo",
+        "code": error.error_name,
+        "message": error.error_name + (": " + error.details if error.details else ""),
+    }
+
+########################################
+# SERVER
+########################################
+
+class LanguageServer:
+    def __init__(self, stream_in, stream_out):
+        self.stream_in = stream_in
+        self.stream_out = stream_out
+        self.documents = {}
+        self.running = True
+
+    def serve(self):
+        while self.running:
+            message = read_message(self.stream_in)
+            if message is None:
+                break
+            self.handle(message)
+
+    def handle(self, message):
+        method = message.get("method")
+        params = message.get("params", {})
+        handler = getattr(self, "on_" + str(method).replace("/", "_").replace("$", "_"), None)
+
+        if handler is None:
+            # Requests need an answer, notifications may be ignored
+            if "id" in message:
+                write_message(self.stream_out, {
+                    "jsonrpc": "2.0", "id": message["id"],
+                    "error": {"code": ERROR_METHOD_NOT_FOUND, "message": "Unknown method " + str(method)},
+                })
+            return
+
+        try:
+            result = handler(params)
+        except Exception as e:
+            # Keep serving the other documents
+            print("rojo-ls: " + type(e).__name__ + ": " + str(e), file=sys.stderr)
+            if "id" in message:
+                write_message(self.stream_out, {
+                    "jsonrpc": "2.0", "id": message["id"],
+                    "error": {"code": ERROR_INTERNAL, "message": type(e).__name__ + ": " + str(e)},
+                })
+            return
+
+        if "id" in message:
+            write_message(self.stream_out, {"jsonrpc": "2.0", "id": message["id"], "result": result})
+
+    def publish(self, uri):
+        document = self.documents.get(uri)
+        diagnostics = [diagnostic(error) for error in document.diagnostics()] if document else []
+
+        write_message(self.stream_out, {
+            "jsonrpc": "2.0",
+            "method": "textDocument/publishDiagnostics",
+            "params": {"uri": uri, "diagnostics": diagnostics},
+        })
+
+    ########################################
+
+    def on_initialize(self, params):
+        return {
+            "capabilities": {
+                "textDocumentSync": {"openClose": True, "change": SYNC_INCREMENTAL},
+            },
+            "serverInfo": {"name": "rojo-ls"},
+        }
+
+    def on_initialized(self, params):
+        return None
+
+    def on_shutdown(self, params):
+        return None
+
+    def on_exit(self, params):
+        self.running = False
+
+    def on_textDocument_didOpen(self, params):
+        item = params["textDocument"]
+        self.documents[item["uri"]] = Document(item["uri"], item["text"])
+        self.publish(item["uri"])
+
+    def on_textDocument_didChange(self, params):
+        uri = params["textDocument"]["uri"]
+        document = self.documents.get(uri)
+        if document is None:
+            return
+
+        for change in params["contentChanges"]:
+            if "range" not in change:
+                document.reset(change["text"])
+                continue
+
+            start = change["range"]["start"]
+            end = change["range"]["end"]
+            document.edit(start["line"], start["character"], end["line"], end["character"], change["text"])
+
+        self.publish(uri)
+
+    def on_textDocument_didClose(self, params):
+        uri = params["textDocument"]["uri"]
+        self.documents.pop(uri, None)
+        self.publish(uri)
+
+########################################
+# ENTRY
+########################################
+
+if __name__ == "__main__":
+    LanguageServer(sys.stdin.buffer, sys.stdout.buffer).serve()
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+
+########################################
+# IMPORTS
+########################################
+
+import os
+import re
+import sys
+
+########################################
+# CONSTANTS
+########################################
+
+BIN_DIR = os.path.dirname(os.path.abspath(__file__))
+GRAMMAR_FILE = os.path.join(BIN_DIR, "grammar.rojo.lang")
+INTERPRETER_FILE = os.path.join(BIN_DIR, "rojo_interpreter.py")
+
+BEGIN_MARKER = "# BEGIN GENERATED PARSER TABLES\n"
+END_MARKER = "# END GENERATED PARSER TABLES\n"
+
+# Node built from a unit that is a single token
+ATOM_NODES = {
+    "INT": "IntegerNode",
+    "FLOAT": "FloatNode",
+    "IDENTIFIER": "VarAccessNode",
+}
+
+# Source text of tokens that show up in error messages
+TOKEN_TEXT = {
+    "RPAREN": ")",
+}
+
+SYMBOL_RE = re.compile(r"\s*([()|*?+]|[A-Za-z_][A-Za-z0-9_\-]*(?::[A-Za-z0-9_]+)?)")
+
+########################################
+# ERRORS
+########################################
+
+class GrammarError(Exception):
+    pass
+
+########################################
+# GRAMMAR READER
+########################################
+
+# Items of a rule alternative are tuples:
+#   ("token", type, value, modifier)
+#   ("rule", name, None, modifier)
+#   ("group", alternatives, None, modifier)
+# where modifier is None, "?", "*" or "+"
+
+def read_grammar(text):
+    rules = {}
+    name = None
+
+    for ln, line in enumerate(text.split("\n")):
+        line = line.split("#", 1)[0].strip()
+        if len(line) == 0:
+            continue
+
+        head, sep, body = line.partition(":")
+        if not sep:
+            raise GrammarError("line %d: expected `name : ...`" % (ln + 1))
+
+        head = head.strip()
+        if head:
+            name = head
+            if name in rules:
+                raise GrammarError("line %d: rule `%s` is defined twice" % (ln + 1, name))
+            rules[name] = []
+        elif name is None:
+            raise GrammarError("line %d: alternative without a rule" % (ln + 1))
+
+        symbols = tokenize(body, ln)
+        alternatives, i = read_alternatives(symbols, 0, ln)
+        if i != len(symbols):
+            raise GrammarError("line %d: unexpected `%s`" % (ln + 1, symbols[i]))
+        rules[name].extend(alternatives)
+
+    return rules
+
+def tokenize(body, ln):
+    symbols = []
+    idx = 0
+
+    while idx < len(body.rstrip()):
+        match = SYMBOL_RE.match(body, idx)
+        if match is None:
+            raise GrammarError("line %d: illegal character `%s`" % (ln + 1, body[idx:].strip()[0]))
+        symbols.append(match.group(1))
+        idx = match.end()
+
+    return symbols
+
+def read_alternatives(symbols, i, ln):
+    alternatives = [[]]
+
+    while i < len(symbols) and symbols[i] != ")":
+        symbol = symbols[i]
+        i += 1
+
+        if symbol == "|":
+            alternatives.append([])
+            continue
+
+        if symbol == "(":
+            inner, i = read_alternatives(symbols, i, ln)
+            if i == len(symbols):
+                raise GrammarError("line %d: expected `)`" % (ln + 1))
+            i += 1
+            item = ["group", inner, None]
+        elif symbol in "*?+":
+            raise GrammarError("line %d: `%s` does not follow anything" % (ln + 1, symbol))
+        elif symbol.split(":")[0].isupper():
+            type_, _, value = symbol.partition(":")
+            item = ["token", type_, value or None]
+        else:
+            item = ["rule", symbol, None]
+
+        modifier = None
+        if i < len(symbols) and symbols[i] in ("*", "?", "+"):
+            modifier = symbols[i]
+            i += 1
+
+        alternatives[-1].append(tuple(item) + (modifier,))
+
+    for alternative in alternatives:
+        if len(alternative) == 0:
+            raise GrammarError("line %d: empty alternative" % (ln + 1))
+
+    return alternatives, i
+
+########################################
+# TABLES
+########################################
+
+# Token types of an item that is one token or a group of single tokens,
+# e.g. `POW` or `(PLUS|MINUS)`
+def operator_tokens(item):
+    kind, payload, value, modifier = item
+    if modifier is not None:
+        return None
+
+    if kind == "token" and value is None:
+        return [payload]
+
+    if kind == "group":
+        types = []
+        for alternative in payload:
+            if len(alternative) != 1:
+                return None
+            tokens = operator_tokens(alternative[0])
+            if tokens is None:
+                return None
+            types.extend(tokens)
+        return types
+
+    return None
+
+def rule_name(item):
+    if item[0] == "rule" and item[3] is None:
+        return item[1]
+    return None
+
+# `a : b ((OP|OP) c)*` gives (b, [OP, OP], c)
+def binary_shape(alternatives):
+    if len(alternatives) != 1 or len(alternatives[0]) != 2:
+        return None
+
+    left, repeat = alternatives[0]
+    if rule_name(left) is None or repeat[0] != "group" or repeat[3] != "*":
+        return None
+    if len(repeat[1]) != 1 or len(repeat[1][0]) != 2:
+        return None
+
+    ops = operator_tokens(repeat[1][0][0])
+    right = rule_name(repeat[1][0][1])
+    if ops is None or right is None:
+        return None
+
+    return rule_name(left), ops, right
+
+# `a : (OP|OP) a` followed by `: b` gives ([OP, OP], b)
+def prefix_shape(name, alternatives):
+    if len(alternatives) != 2 or len(alternatives[0]) != 2 or len(alternatives[1]) != 1:
+        return None
+
+    ops = operator_tokens(alternatives[0][0])
+    if ops is None or rule_name(alternatives[0][1]) != name:
+        return None
+
+    following = rule_name(alternatives[1][0])
+    if following is None:
+        return None
+
+    return ops, following
+
+# Alternatives that are one token or a bracketed var-def
+def unit_shape(alternatives, inner):
+    atoms = []
+    groups = []
+
+    for alternative in alternatives:
+        if len(alternative) == 1 and operator_tokens(alternative[0]) is not None:
+            atoms.extend(operator_tokens(alternative[0]))
+        elif (len(alternative) == 3 and operator_tokens(alternative[0]) is not None and
+                len(operator_tokens(alternative[0])) == 1 and rule_name(alternative[1]) == inner and
+                operator_tokens(alternative[2]) is not None and len(operator_tokens(alternative[2])) == 1):
+            groups.append((operator_tokens(alternative[0])[0], operator_tokens(alternative[2])[0]))
+        else:
+            return None
+
+    return atoms, groups
+
+def build_tables(rules):
+    if "var-def" not in rules or len(rules["var-def"]) != 1:
+        raise GrammarError("expected a `var-def` rule with one alternative")
+    var_def = rules["var-def"][0]
+
+    # var-def : ((KEYWORD:...|KEYWORD:...)? IDENTIFIER EQ)? expr
+    entry = rule_name(var_def[-1])
+    if entry is None or entry not in rules:
+        raise GrammarError("`var-def` must end with the expression rule")
+
+    assign_types = []
+    for item in var_def[:-1]:
+        collect_keywords(item, assign_types)
+
+    tables = {
+        "binary": [],
+        "prefix": [],
+        "atoms": [],
+        "groups": [],
+        "assign_types": assign_types,
+    }
+
+    # Walk from the loosest binding rule to the unit, one level per rule
+    levels = {}
+    pending = []
+    name = entry
+    while True:
+        if name not in rules:
+            raise GrammarError("rule `%s` is not defined" % (name))
+        if name in levels:
+            raise GrammarError("rule `%s` refers back to itself" % (name))
+        level = len(levels) + 1
+        levels[name] = level
+        alternatives = rules[name]
+
+        binary = binary_shape(alternatives)
+        prefix = prefix_shape(name, alternatives)
+        unit = unit_shape(alternatives, "var-def")
+        if binary is not None:
+            following, ops, right = binary
+            pending.append(("binary", name, ops, right))
+        elif prefix is not None:
+            ops, following = prefix
+            pending.append(("prefix", name, ops, name))
+        elif unit is not None:
+            atoms, groups = unit
+            for type_ in atoms:
+                if type_ not in ATOM_NODES:
+                    raise GrammarError("no node is known for a `%s` unit" % (type_))
+            for open_, close in groups:
+                if close not in TOKEN_TEXT:
+                    raise GrammarError("no text is known for `%s`" % (close))
+            tables["atoms"] = atoms
+            tables["groups"] = groups
+            break
+        else:
+            raise GrammarError("rule `%s` is not a binary, prefix or unit rule" % (name))
+
+        name = following
+
+    for kind, name, ops, operand in pending:
+        if operand not in levels:
+            raise GrammarError("rule `%s` refers to `%s`, which is not an operator level" % (name, operand))
+        for op in ops:
+            tables[kind].append((op, levels[name], levels[operand]))
+
+    for kind in ("binary", "prefix"):
+        seen = set()
+        for op, _, _ in tables[kind]:
+            if op in seen:
+                raise GrammarError("%s operator `%s` is defined twice" % (kind, op))
+            seen.add(op)
+
+    return tables
+
+def collect_keywords(item, keywords):
+    kind, payload, value, modifier = item
+    if kind == "token" and payload == "KEYWORD" and value is not None:
+        keywords.append(value)
+    elif kind == "group":
+        for alternative in payload:
+            for inner in alternative:
+                collect_keywords(inner, keywords)
+
+########################################
+# OUTPUT
+########################################
+
+def render_tables(tables):
+    lines = [
+        BEGIN_MARKER.rstrip("\n"),
+        "# Generated from grammar.rojo.lang by rojo_pgen.py, do not edit by hand",
+        "",
+        "# Operator token: (binding level, lowest level allowed in its right operand)",
+        "PARSE_BINARY = {",
+    ]
+    for op, level, operand in tables["binary"]:
+        lines.append("    TT_%s: (%d, %d)," % (op, level, operand))
+    lines.append("}")
+
+    lines += ["", "# Operator token: (binding level, lowest level allowed in its operand)", "PARSE_PREFIX = {"]
+    for op, level, operand in tables["prefix"]:
+        lines.append("    TT_%s: (%d, %d)," % (op, level, operand))
+    lines.append("}")
+
+    lines += ["", "# Token: node built from it as a unit", "PARSE_ATOMS = {"]
+    for type_ in tables["atoms"]:
+        lines.append("    TT_%s: %s," % (type_, ATOM_NODES[type_]))
+    lines.append("}")
+
+    lines += ["", "# Opening token: (closing token, its text) around a var-def", "PARSE_GROUPS = {"]
+    for open_, close in tables["groups"]:
+        lines.append("    TT_%s: (TT_%s, \"%s\")," % (open_, close, TOKEN_TEXT[close]))
+    lines.append("}")
+
+    lines += ["", "# Keywords that declare the type of an assigned variable", "PARSE_ASSIGN_TYPES = ("]
+    for type_ in tables["assign_types"]:
+        lines.append("    \"%s\"," % (type_))
+    lines.append(")")
+
+    lines.append(END_MARKER.rstrip("\n"))
+    return "\n".join(lines) + "\n"
+
+def replace_tables(source, rendered):
+    start = source.find(BEGIN_MARKER)
+    end = source.find(END_MARKER)
+    if start == -1 or end == -1 or end < start:
+        raise GrammarError("%s has no generated tables section" % (INTERPRETER_FILE))
+
+    return source[:start] + rendered + source[end + len(END_MARKER):]
+
+########################################
+# ENTRY
+########################################
+
+def main(argv):
+    check = "--check" in argv
+
+    try:
+        with open(GRAMMAR_FILE, "r") as f:
+            tables = build_tables(read_grammar(f.read()))
+        with open(INTERPRETER_FILE, "r") as f:
+            source = f.read()
+        updated = replace_tables(source, render_tables(tables))
+    except GrammarError as e:
+        print("Grammar Error: " + str(e), file=sys.stderr)
+        return 2
+
+    if updated == source:
+        return 0
+
+    if check:
+        print("Parser tables are out of date, run rojo_pgen.py", file=sys.stderr)
+        return 1
+
+    with open(INTERPRETER_FILE, "w") as f:
+        f.write(updated)
+    print("Updated parser tables in " + INTERPRETER_FILE)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
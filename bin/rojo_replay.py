@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+
+########################################
+# IMPORTS
+########################################
+
+import importlib
+import json
+import os
+import sys
+import time
+
+import rojo_batch
+import rojo_interpreter as rojint
+
+########################################
+# CONSTANTS
+########################################
+
+DEFAULT_ENGINE = "rojo_interpreter:run"
+LOG_VERSION = 1
+PERCENTILES = (50, 90, 99)
+
+########################################
+# RECORDING
+########################################
+
+# Session logs are JSON lines. Every process that writes to a log starts with
+# a header
+#   {"log": LOG_VERSION, "rojo": ..., "shell": ..., "t": ..., "continued": ...,
+#    "globals": {name: [type, value, number type], ...}}
+# where "continued" is true when the process picked up the variables of the
+# previous one (!restart), and "globals" holds the variables the session
+# started with, each with its declared type ("int") and the type of its
+# Number ("INT"), which may not be that of the JSON value (The 2.0 of
+# `int x = 4 / 2`). Logs without the Number type are read as if it were the
+# declared one. The header is followed by one entry per input line:
+#   {"t": ..., "command": "!read x"}
+#   {"t": ..., "code": "x = 1", "us": {"lex": 3, ...}, "ok": true, ...}
+# "t" is the wall-clock time the line was entered, "us" the microseconds
+# spent in each phase of run(), and the rest the outcome as in rojo_batch.
+class SessionRecorder:
+    def __init__(self, path, rojo_version, shell_version, continued, symbol_table):
+        symbols = {}
+        for name, value in symbol_table.symbols.items():
+            if isinstance(value, rojint.Number):
+                symbols[name] = [symbol_table.types.get(name), rojint.numeric.to_python(value.value), value.type]
+            elif value is not None:
+                symbols[name] = [symbol_table.types.get(name), rojint.numeric.to_python(value), rojint.raw_type(value)]
+
+        self.file = open(path, "a", buffering=1)
+        self.write({
+            "log": LOG_VERSION,
+            "rojo": rojo_version,
+            "shell": shell_version,
+            "t": round(time.time(), 3),
+            "continued": continued,
+            "globals": symbols,
+        })
+
+    def write(self, entry):
+        self.file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def command(self, text):
+        self.write({"t": round(time.time(), 3), "command": text})
+
+    # Runs `code` like run() would and records it
+    def run(self, run, fname, code, settings):
+        entered = time.time()
+        timings = {}
+        settings = dict(settings, timings=timings)
+
+        result, error = run(fname, code, settings)
+
+        entry = {"t": round(entered, 3), "code": code}
+        if fname != "<stdin>":
+            entry["fname"] = fname
+        entry["us"] = {phase: round(seconds * 1e6) for phase, seconds in timings.items()}
+        self.write(rojo_batch.describe_result(entry, result, error))
+
+        return result, error
+
+    def close(self):
+        self.file.close()
+
+########################################
+# READING
+########################################
+
+# Splits a log into sessions, each the variables it started with and a list
+# of its code entries. Commands are counted but not replayed; variables
+# survive a !restart, so a continued header does not start a new session.
+def read_log(path):
+    sessions = []
+    commands = 0
+
+    with open(path, "r") as f:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if len(line) == 0:
+                continue
+
+            try:
+                entry = json.loads(line)
+            except ValueError as e:
+                raise ValueError(path + ", line " + str(n) + ": " + str(e))
+
+            if "log" in entry:
+                if entry["log"] != LOG_VERSION:
+                    raise ValueError("Unsupported session log version " + str(entry["log"]))
+                if not entry.get("continued") or len(sessions) == 0:
+                    sessions.append((entry.get("globals", {}), []))
+            elif "command" in entry:
+                commands += 1
+            elif "code" in entry:
+                if len(sessions) == 0:
+                    sessions.append(({}, []))
+                entry["line"] = n
+                sessions[-1][1].append(entry)
+
+    return sessions, commands
+
+########################################
+# REPLAY
+########################################
+
+def outcome(entry):
+    return {key: entry[key] for key in ("ok", "type", "value", "error", "details", "ln", "col") if key in entry}
+
+def load_engine(spec):
+    module_name, _, func_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), func_name or "run")
+
+# Runs one session through an engine, in a fresh process so every session
+# starts from the engine's initial state. Returns the outcome and latency of
+# every entry.
+def replay_session(spec, symbols, entries, restore):
+    for name, symbol in symbols.items():
+        type_, value = symbol[:2]
+        number_type = symbol[2] if len(symbol) > 2 else str(type_).upper()
+        rojint.global_symbol_table.set(type_, name, rojint.stored_value(value, number_type))
+    for path in restore:
+        rojint.load_snapshot(rojint.global_symbol_table, path)
+
+    import asyncio
+
+    engine = load_engine(spec)
+    loop = None
+    if asyncio.iscoroutinefunction(engine):
+        loop = asyncio.new_event_loop()
+
+    outcomes = []
+    latencies = []
+    for entry in entries:
+        start = time.perf_counter()
+        if loop:
+            result, error = loop.run_until_complete(engine(entry.get("fname", "<stdin>"), entry["code"], {"debug":False}))
+        else:
+            result, error = engine(entry.get("fname", "<stdin>"), entry["code"], {"debug":False})
+        latencies.append(time.perf_counter() - start)
+        outcomes.append(rojo_batch.describe_result({}, result, error))
+
+    if loop:
+        loop.close()
+    return outcomes, latencies
+
+def replay(spec, sessions, restore):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    outcomes = []
+    latencies = []
+    for symbols, entries in sessions:
+        with ProcessPoolExecutor(1, multiprocessing.get_context("spawn")) as pool:
+            session_outcomes, session_latencies = pool.submit(replay_session, spec, symbols, entries, restore).result()
+        outcomes += session_outcomes
+        latencies += session_latencies
+
+    return outcomes, latencies
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, len(ordered) * p // 100)]
+
+def report_differences(entries, expected, got, label, show):
+    differences = [i for i in range(len(entries)) if expected[i] != got[i]]
+    print("  differences from %s: %d" % (label, len(differences)))
+
+    for i in differences[:show]:
+        print("    line %d: %s" % (entries[i]["line"], json.dumps(entries[i]["code"])))
+        print("      %s" % (json.dumps(expected[i])))
+        print("      %s" % (json.dumps(got[i])))
+
+    return len(differences)
+
+########################################
+# ENTRY
+########################################
+
+USAGE = """Usage: rojo_replay.py LOG [--engine=MODULE:FUNC]... [--restore=FILE]... [--show=N]
+
+Replays the code recorded by `rosh1.py --record=LOG` through each engine
+(Default """ + DEFAULT_ENGINE + """), as fast as it can, and reports throughput,
+latency percentiles and every result that differs from the recording or from
+the first engine. An engine is called like run(fname, code, settings) and may
+be a coroutine function. Each session starts with the variables recorded for
+it, in rojo_interpreter.global_symbol_table; --restore loads a snapshot on top."""
+
+def main(argv):
+    paths = []
+    engines = []
+    restore = []
+    show = 5
+
+    for arg in argv:
+        if arg.startswith("--engine="):
+            engines.append(arg[len("--engine="):])
+        elif arg.startswith("--restore="):
+            restore.append(os.path.abspath(arg[len("--restore="):]))
+        elif arg.startswith("--show="):
+            show = int(arg[len("--show="):])
+        elif arg.startswith("--"):
+            print(USAGE, file=sys.stderr)
+            return 2
+        else:
+            paths.append(arg)
+
+    if len(paths) != 1:
+        print(USAGE, file=sys.stderr)
+        return 2
+    if len(engines) == 0:
+        engines.append(DEFAULT_ENGINE)
+
+    try:
+        sessions, commands = read_log(paths[0])
+    except (OSError, ValueError) as e:
+        print("Replay Error: " + str(e), file=sys.stderr)
+        return 2
+
+    entries = [entry for symbols, session in sessions for entry in session]
+    recorded = [outcome(entry) for entry in entries]
+    print("%s: %d sessions, %d lines of code, %d commands (not replayed)" % (paths[0], len(sessions), len(entries), commands))
+    if len(entries) == 0:
+        return 0
+
+    differences = 0
+    first = None
+    for spec in engines:
+        outcomes, latencies = replay(spec, sessions, restore)
+        total = sum(latencies)
+        ordered = sorted(latencies)
+
+        print("")
+        print(spec)
+        print("  %d lines in %.3f s, %.0f lines/s" % (len(latencies), total, len(latencies) / total if total else 0))
+        print("  latency " + "  ".join("p%d %.3f ms" % (p, percentile(ordered, p) * 1e3) for p in PERCENTILES) + "  max %.3f ms" % (ordered[-1] * 1e3))
+
+        differences += report_differences(entries, recorded, outcomes, "the recording", show)
+        if first is None:
+            first = (spec, outcomes)
+        else:
+            differences += report_differences(entries, first[1], outcomes, first[0], show)
+
+    return 1 if differences else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+
+########################################
+# IMPORTS
+########################################
+
+import copy
+import os
+import time
+
+import rojo_interpreter as rojint
+from rojo_document import DocumentLine, LineSource
+
+########################################
+# CONSTANTS
+########################################
+
+POLL_INTERVAL = 0.02
+COMPARE_CHUNK = 256
+BLOCK_LINES = 64
+
+# Budgets count the nodes, time and source of a whole run, which a run that
+# reuses statements does not go through, so they cannot be honoured
+UNSUPPORTED_SETTINGS = ("max_nodes", "deadline", "timeout", "max_source")
+
+########################################
+# LINES
+########################################
+
+# One line of a watched file. Its statement is kept between runs, along with
+# what it read and assigned the last time it ran, so it is only run again when
+# its text or a variable it names has changed.
+#
+# Each line is lexed on its own LineSource like a line of a Document. A line
+# that moves, because lines were added or removed above it, keeps its tokens
+# and AST and only has its Source moved, and the positions in an error are
+# moved with their Source when it is reported (see current_error()).
+class WatchedLine(DocumentLine):
+    def __init__(self, path, text, ln):
+        super().__init__(path, text, ln)
+        self.moves_stored = False
+
+        # (name, value, type) of every variable named, as the statement found
+        # them when it last ran, or None if it has to run again, and of every
+        # variable it assigned
+        self.inputs = None
+        self.outputs = None
+        self.value = None
+        self.run_error = None
+
+        # The last walk through the statements that reached the line, and the
+        # block of lines it heads (see WatchSession.run())
+        self.walk = 0
+        self.block_walk = 0
+        self.block_length = 0
+        self.block_last = None
+        self.block_named = None
+        self.block_symbols = None
+        self.block_types = None
+        self.block_value = None
+
+        if self.statement is None:
+            return
+
+        assigned, named = rojint.statement_names(self.statement)
+        self.assigned = tuple(assigned)
+        self.named = tuple(named)
+        self.moves_stored = has_stored_plus(self.statement)
+
+# Whether `+` is applied to a Number that may be stored in a variable
+def has_stored_plus(node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, rojint.UnaryOpNode):
+            if node.op_tok.type == rojint.TT_PLUS and rojint.yields_stored(node):
+                return True
+            stack.append(node.node)
+        elif isinstance(node, rojint.VarAssignNode):
+            stack.append(node.value)
+        elif isinstance(node, rojint.BinOpNode):
+            stack.append(node.left_node)
+            stack.append(node.right_node)
+
+    return False
+
+# The file split at line breaks: every part but the last had one after it
+def read_parts(path):
+    with open(path, "r") as file:
+        return file.read().split("\n")
+
+# Length of the longest common prefix of two lists, up to `limit`
+def common_prefix(a, b, limit):
+    n = 0
+    while n < limit:
+        step = min(COMPARE_CHUNK, limit - n)
+        if a[n:n + step] != b[n:n + step]:
+            break
+        n += step
+
+    while n < limit and a[n] == b[n]:
+        n += 1
+    return n
+
+# Length of the longest common suffix of two lists, up to `limit`
+def common_suffix(a, b, limit):
+    n = 0
+    while n < limit:
+        step = min(COMPARE_CHUNK, limit - n)
+        if a[len(a) - n - step:len(a) - n] != b[len(b) - n - step:len(b) - n]:
+            break
+        n += step
+
+    while n < limit and a[-1 - n] == b[-1 - n]:
+        n += 1
+    return n
+
+def current_position(pos):
+    source = pos.source
+    if not isinstance(source, LineSource):
+        return pos
+    return rojint.Position(pos.idx, pos.ln + source.first_line - source.lexed_line, pos.col, source)
+
+# The error with its positions on the lines they are on now
+def current_error(error):
+    error = copy.copy(error)
+    error.pos_start = current_position(error.pos_start)
+    error.pos_end = current_position(error.pos_end)
+    return error
+
+########################################
+# SESSIONS
+########################################
+
+# A watched file and the state of its last run. Each run starts again from
+# the symbol table it is given, which is left untouched, and goes through the
+# statements in order: a statement whose variables hold the very same values
+# and types as when it last ran has what it assigned put back and its result
+# reused, and any other is run again. The result and error are those of
+# run() on the whole file.
+#
+# `+` moves a stored Number to where it is applied, which Numbers kept from
+# earlier runs would remember, so files that use it on variables run in full
+# every time. Statements run on the Interpreter without budgets, and settings
+# asking for one (UNSUPPORTED_SETTINGS) or for debug output raise a ValueError.
+class WatchSession:
+    def __init__(self, path, settings):
+        for name in UNSUPPORTED_SETTINGS:
+            if settings.get(name) is not None:
+                raise ValueError("`" + name + "` is not supported when watching files")
+        if settings.get("debug", False):
+            raise ValueError("Debug output is not supported when watching files")
+
+        self.path = path
+        self.max_int_bits = settings.get("max_int_bits")
+        self.infer_settings = {
+            "debug": False,
+            "infer_types": settings.get("infer_types", True),
+            "max_int_bits": self.max_int_bits,
+        }
+
+        self.stamp = False
+        self.missing = False
+        self.parts = []
+        self.lines = []
+        self.parent = None
+        self.symbol_table = None
+
+        # Lines with a statement, with a lexing or parsing error, and with a
+        # statement that uses `+` on a variable
+        self.statements = 0
+        self.errors = 0
+        self.moving = 0
+
+        # Lines kept at the start and end of the file by the updates since the
+        # last walk through the statements, and the variables assigned by the
+        # lines between them, before and after
+        self.kept_before = 0
+        self.kept_after = 0
+        self.changed_names = set()
+
+        # Walks through the statements so far, and whether the last one may be
+        # built on by the next
+        self.walks = 0
+        self.reusable = False
+
+        # Statements the last run ran
+        self.ran = 0
+
+    def current_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def changed(self):
+        return self.current_stamp() != self.stamp
+
+    def load(self):
+        self.stamp = self.current_stamp()
+        try:
+            parts = read_parts(self.path)
+        except OSError:
+            self.missing = True
+            parts = [""]
+        else:
+            self.missing = False
+
+        self.update(parts)
+
+    # Keeps the lines before and after those that changed, moving the ones
+    # after, and lexes the changed ones unless they only moved
+    def update(self, parts):
+        old_parts = self.parts
+        old_lines = self.lines
+        common = min(len(old_parts), len(parts))
+        shift = len(parts) - len(old_parts)
+
+        # The last part has no line break after it, so it only matches the
+        # last part
+        limit = common if shift == 0 else common - 1
+        before = common_prefix(old_parts, parts, max(limit, 0))
+        after = common_suffix(old_parts, parts, common - before)
+
+        # The first line has no line break before it in its Source, so lines
+        # moving to or from it are lexed again
+        if after and shift and (len(old_parts) - after == 0 or len(parts) - after == 0):
+            after -= 1
+
+        # Lines from the changed part of the old file, by their text
+        unused = {}
+        for line in old_lines[before:len(old_lines) - after]:
+            unused.setdefault(line.text, []).append(line)
+            self.count(line, -1)
+
+        lines = old_lines[:before]
+        for ln in range(before, len(parts) - after):
+            text = parts[ln] + "\n" if ln < len(parts) - 1 else parts[ln]
+            candidates = unused.get(text)
+            if candidates and candidates[-1].first == (ln == 0):
+                line = candidates.pop()
+                line.source.first_line = ln - 1
+            else:
+                line = WatchedLine(self.path, text, ln)
+            self.count(line, 1)
+            lines.append(line)
+
+        kept = old_lines[len(old_lines) - after:]
+        if shift:
+            for line in kept:
+                line.source.first_line += shift
+        lines += kept
+
+        if old_parts:
+            self.kept_before = min(self.kept_before, before)
+            self.kept_after = min(self.kept_after, after)
+        self.parts = parts
+        self.lines = lines
+
+    # Adds a line to the counts, or takes it out of them
+    def count(self, line, sign):
+        if line.error:
+            self.errors += sign
+        elif line.statement is not None:
+            self.statements += sign
+            if line.moves_stored:
+                self.moving += sign
+            self.changed_names.update(line.assigned)
+
+    # Runs the file on a new symbol table on top of `parent`, which is kept
+    # in self.symbol_table. Returns (result, error).
+    #
+    # Comparing the variables of every statement would take most of a run, so
+    # the walk through the statements builds on the last one when the parent is
+    # the same, and assumed unchanged: outside the lines that changed since, a
+    # variable only holds something else than it did at the same point of the
+    # last walk once it was assigned by a statement run again, or by a changed
+    # line. Only statements naming such a variable are compared. Other lines
+    # come in blocks of BLOCK_LINES, each keeping the variables its statements
+    # named and what they assigned the last time it was walked through, which
+    # is put back all at once.
+    def run(self, parent):
+        table = rojint.SymbolTable()
+        table.parent = parent
+        self.symbol_table = table
+        self.ran = 0
+
+        # run() finds every lexing error, then every parsing error, before
+        # anything runs
+        if self.errors:
+            errors = [line for line in self.lines if line.error]
+            lexing_errors = [line for line in errors if line.lexing_error]
+            return None, current_error((lexing_errors or errors)[0].error)
+
+        if self.statements == 0:
+            return rojint.parse(self.path, "\n".join(self.parts), {"debug":False})
+
+        context = rojint.Context('<global>')
+        context.symbol_table = table
+        interpreter = rojint.Interpreter(None, self.max_int_bits, None)
+        symbols = table.symbols
+        types = table.types
+        cacheable = self.moving == 0
+
+        lines = self.lines
+        last_walk = self.walks if self.reusable and parent is self.parent and cacheable else None
+        changed_start = self.kept_before
+        changed_end = len(lines) - self.kept_after
+        dirty = set()
+
+        self.walks += 1
+        walk = self.walks
+        self.reusable = cacheable
+        self.parent = parent
+        self.kept_before = self.kept_after = len(lines)
+
+        value = None
+        error = None
+        head = None
+        i = 0
+        while i < len(lines):
+            if i == changed_end:
+                dirty.update(self.changed_names)
+            line = lines[i]
+
+            # A block the last walk went through that is still there and names
+            # no variable holding something else
+            end = i + line.block_length
+            if (line.block_walk == last_walk and (end <= changed_start or i >= changed_end) and end <= len(lines)
+                    and lines[end - 1] is line.block_last and dirty.isdisjoint(line.block_named)):
+                symbols.update(line.block_symbols)
+                types.update(line.block_types)
+                if line.block_value is not None:
+                    value = line.block_value
+                line.block_walk = walk
+                head = None
+                i = end
+                continue
+
+            if head is None:
+                head = line
+                head_index = i
+                block_named = set()
+                block_symbols = {}
+                block_types = {}
+                block_value = None
+
+            statement = line.statement
+            if statement is not None:
+                if line.walk != last_walk or changed_start <= i < changed_end or not dirty.isdisjoint(line.named):
+                    inputs = line.inputs if cacheable else None
+                    if inputs is not None:
+                        for name, input_value, input_type in inputs:
+                            if table.get(name) is not input_value or table.get_type(name) != input_type:
+                                inputs = None
+                                break
+                    if inputs is None:
+                        self.run_line(line, interpreter, context, cacheable)
+                        dirty.update(line.assigned)
+                line.walk = walk
+
+                for name, output_value, output_type in line.outputs:
+                    symbols[name] = block_symbols[name] = output_value
+                    types[name] = block_types[name] = output_type
+                block_named.update(line.named)
+
+                if line.run_error:
+                    error = current_error(line.run_error)
+                    break
+                value = block_value = line.value
+
+            i += 1
+            if i - head_index == BLOCK_LINES:
+                head.block_walk = walk
+                head.block_length = BLOCK_LINES
+                head.block_last = line
+                head.block_named = block_named
+                head.block_symbols = block_symbols
+                head.block_types = block_types
+                head.block_value = block_value
+                head = None
+
+        self.changed_names = set()
+        if error:
+            return None, error
+        return value, None
+
+    def run_line(self, line, interpreter, context, cacheable):
+        table = context.symbol_table
+        self.ran += 1
+        if cacheable:
+            line.inputs = [(name, table.get(name), table.get_type(name)) for name in line.named]
+        else:
+            line.inputs = None
+
+        line.value = None
+        try:
+            line.run_error = rojint.infer_types(line.statement, context, self.infer_settings)
+            if not line.run_error:
+                result = interpreter.visit(line.statement, context)
+                line.value = result.value
+                line.run_error = result.error
+        except Exception as e:
+            # Reported like run() reports it, spanning the statement when no
+            # node of it was being handled
+            line.run_error = rojint.internal_error(self.path, line.source.text, e)
+            if line.run_error.pos_start.source is not line.source:
+                line.run_error.pos_start = line.statement.pos_start
+                line.run_error.pos_end = line.statement.pos_end
+
+        symbols = table.symbols
+        types = table.types
+        line.outputs = [(name, symbols[name], types[name]) for name in line.assigned if name in symbols]
+
+########################################
+# WATCHING
+########################################
+
+# Runs the files one after the other, each on the variables the one before
+# left, starting from `symbol_table`, then polls them and runs each file that
+# changed, and those after it, again. `report` is called with the path, result
+# and error of every run. Returns on KeyboardInterrupt.
+def watch(paths, symbol_table, settings, report):
+    sessions = [WatchSession(path, settings) for path in paths]
+
+    try:
+        while True:
+            first = None
+            for i in range(len(sessions)):
+                if sessions[i].changed():
+                    first = i
+                    break
+
+            if first is None:
+                time.sleep(POLL_INTERVAL)
+                continue
+
+            for i in range(first, len(sessions)):
+                session = sessions[i]
+                start = time.perf_counter()
+                if session.changed():
+                    session.load()
+
+                parent = symbol_table if i == 0 else sessions[i - 1].symbol_table
+                result, error = session.run(parent)
+                if rojint.metrics.enabled:
+                    rojint.metrics.count_run(error)
+                elapsed = time.perf_counter() - start
+
+                if session.missing:
+                    print("\033[1m\033[31mExecution Error:\033[0m File `%s` does not exist" % (session.path))
+                    continue
+
+                print("\033[1m\033[36mwatch\033[0m \033[1m\033[34m>\033[0m %s: ran %d of %d statements in %.1f ms" % (
+                    session.path, session.ran, session.statements, elapsed * 1000))
+                report(session.path, result, error)
+    except KeyboardInterrupt:
+        return
@@ -4,10 +4,52 @@ import readline
 from datetime import datetime
 import os
 import sys
+import tempfile
+import time
+import traceback
 
 import rojo_interpreter as rojint
 
+# Crashes of the shell itself restart it rather than dropping the session
+def my_except_hook(exctype, value, tb):
+    print("\033[1m\033[31mRojoInternals Error:\033[0m\n" + exctype.__name__ + ": " + str(value) + "\n" + "".join(traceback.format_tb(tb)))
+
+    args = []
+
+    for i in range(len(sys.argv)-1):
+        args.append(sys.argv[i+1])
+    if len(args) != 0:
+        approved = args.copy()
+        for i in range(len(approved)):
+            if approved[i].startswith("--private_"):
+                approved.pop(i)
+                i -= 1
+
+    args.insert(0, "--private_revived")
+    args.insert(0, "arg_placeholder")
+    print("\033[1m\033[35mReviving...\033[0m")
+    os.execvp(sys.argv[0], args)
+
+sys.excepthook = my_except_hook
+
+# Results are printed in full, however many digits they have
+if hasattr(sys, "set_int_max_str_digits"):
+    sys.set_int_max_str_digits(0)
+
 MODE_DEBUG = False
+MODE_BATCH = False
+
+BATCH_JSONL = False
+JOBS = 1
+STREAM = False
+WATCH = False
+
+RESTORE_LIST = []
+RECORD_FILE = None
+METRICS_FILE = None
+METRICS_INTERVAL = 10
+BACKEND = "auto"
+RESTARTED = False
 
 FROM_RCLT = False
 
@@ -16,6 +58,9 @@ INT_VERSION = rojint.version
 
 exe_list = []
 
+# Variables every session starts with
+rojint.global_symbol_table.set("int", "foo", 12)
+
 if len(sys.argv) > 1:
     for i in range(len(sys.argv)):
         if sys.argv[i] == "--debug":
@@ -27,14 +72,35 @@ if len(sys.argv) > 1:
             exe_list.append(sys.argv[i])
         if sys.argv[i] == "--private_rclt":
             FROM_RCLT = True
+        if sys.argv[i] == "--batch":
+            MODE_BATCH = True
+        if sys.argv[i] == "--jsonl":
+            BATCH_JSONL = True
+        if sys.argv[i].startswith("--jobs="):
+            JOBS = int(sys.argv[i][len("--jobs="):])
+        if sys.argv[i] == "--stream":
+            STREAM = True
+        if sys.argv[i] == "--watch":
+            WATCH = True
+        if sys.argv[i].startswith("--restore="):
+            RESTORE_LIST.append((sys.argv[i][len("--restore="):], False))
+        if sys.argv[i].startswith("--private_snapshot="):
+            RESTORE_LIST.append((sys.argv[i][len("--private_snapshot="):], True))
+        if sys.argv[i].startswith("--record="):
+            RECORD_FILE = sys.argv[i][len("--record="):]
+        if sys.argv[i].startswith("--metrics="):
+            METRICS_FILE = sys.argv[i][len("--metrics="):]
+        if sys.argv[i].startswith("--backend="):
+            BACKEND = sys.argv[i][len("--backend="):]
 
     if sys.argv[1] == "--private_restarted":
         print("\033[1m\033[34mRestart completed!\033[0m")
         sys.argv.remove("--private_restarted")
+        RESTARTED = True
     elif sys.argv[1] == "--private_revived":
         print("\033[1m\033[34mRevived!\033[0m")
         sys.argv.remove("--private_revived")
-    elif len(exe_list) == 0:
+    elif len(exe_list) == 0 and not MODE_BATCH:
         print("Rojo Shell v%s (ROSH%s) (rojo%s, UTC:%s)" % (SHELL_VERSION, SHELL_VERSION, INT_VERSION, datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S")))
         print("Running on " + os.uname().sysname + " " + os.uname().machine)
         print("Run ROSH commands by prefixing the line with '!'")
@@ -46,19 +112,107 @@ else:
     print("Run ROSH commands by prefixing the line with '!'")
     print("Type \"!help\", \"!copyright\", \"!credits\", or \"!license\" for more information.")
 
+# Integers go through gmpy2 when it is installed, unless --backend=python
+try:
+    rojint.set_numeric_backend(BACKEND)
+except (ImportError, ValueError) as e:
+    print("\033[1m\033[31mBackend Error:\033[0m " + str(e), file=sys.stderr)
+    sys.exit(2)
+
+# Restore session state saved by --restore=FILE or by !restart
+for path, is_private in RESTORE_LIST:
+    try:
+        rojint.load_snapshot(rojint.global_symbol_table, path)
+    except (OSError, ValueError) as e:
+        print("\033[1m\033[31mRestore Error:\033[0m " + str(e), file=sys.stderr)
+
+    if is_private:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+if MODE_BATCH:
+    # Machine-readable mode: no banners or colours, one JSON result per line
+    import rojo_batch
+    rojo_batch.run_batch(jsonl=BATCH_JSONL, jobs=JOBS)
+    sys.exit(0)
+
+# Log every line entered, with its timings and result, for rojo_replay.py
+recorder = None
+if RECORD_FILE is not None:
+    import rojo_replay
+    recorder = rojo_replay.SessionRecorder(RECORD_FILE, INT_VERSION, SHELL_VERSION, RESTARTED, rojint.global_symbol_table)
+
+# Keep the --metrics=FILE export fresh, rewriting it at most every
+# METRICS_INTERVAL seconds
+metrics_written = 0
+
+def export_metrics():
+    global metrics_written
+
+    if METRICS_FILE is not None and time.time() - metrics_written >= METRICS_INTERVAL:
+        metrics_written = time.time()
+        try:
+            rojint.write_metrics(METRICS_FILE)
+        except OSError as e:
+            print("\033[1m\033[31mMetrics Error:\033[0m " + str(e), file=sys.stderr)
+
+def run_code(fname, code, settings):
+    if recorder:
+        result, error = recorder.run(rojint.run, fname, code, settings)
+    else:
+        result, error = rojint.run(fname, code, settings)
+
+    export_metrics()
+    return result, error
+
+# With --stream, files are read and run a statement at a time, so their size
+# does not matter. They are not recorded, as that would keep all of them.
+def stream_file(path, settings):
+    with open(path, "r") as file:
+        result, error = rojint.run_stream(path, file, settings)
+
+    export_metrics()
+    return result, error
+
 if not FROM_RCLT:
     print("\033[1m\033[33m\033[7mNOTE:\033[0m\033[1m\033[33m To get maximum efficiency and use, please run the command line tool\n`rojo` instead.\033[0m")
 
+def print_result(result, error):
+    if error:
+        print(error)
+    else:
+        print("\033[1m\033[30mret\033[0m   \033[1m\033[34m<\033[0m " + str(result))
+
+# With --watch, the files are run again whenever they change, reusing the
+# results of the statements that did not, until interrupted
+def report_watched(path, result, error):
+    print_result(result, error)
+    export_metrics()
+
+if len(exe_list) > 0 and WATCH:
+    import rojo_watch
+    try:
+        rojo_watch.watch(exe_list, rojint.global_symbol_table, {"debug":MODE_DEBUG}, report_watched)
+    except ValueError as e:
+        print("\033[1m\033[31mWatch Error:\033[0m " + str(e), file=sys.stderr)
+        sys.exit(2)
+    sys.exit(0)
+
 if len(exe_list) > 0:
     for i in range(len(exe_list)):
         if not os.path.exists(exe_list[i]):
             print("\033[1m\033[31Execution Error:\033[0m File `%s` does not exist" % (exe_list[i]))
-        result, error = rojint.run(exe_list[i], open(exe_list[i], "r").read(), {"debug":MODE_DEBUG})
-
-        if error:
-            print(error)
+        if STREAM:
+            result, error = stream_file(exe_list[i], {"debug":MODE_DEBUG})
+        elif recorder:
+            result, error = run_code(exe_list[i], open(exe_list[i], "r").read(), {"debug":MODE_DEBUG, "jobs":JOBS})
         else:
-            print("\033[1m\033[30mret\033[0m   \033[1m\033[34m<\033[0m " + str(result))
+            # The file is lexed straight from a memory map, never read as text
+            result, error = run_code(exe_list[i], rojint.map_source(exe_list[i]), {"debug":MODE_DEBUG, "jobs":JOBS})
+
+        print_result(result, error)
 
     sys.exit(0)
 
@@ -77,6 +231,8 @@ while True:
         continue
 
     if text[0] == "!":
+        if recorder:
+            recorder.command(text)
         args = []
 
         if text.find(" ") != -1:
@@ -111,6 +267,11 @@ while True:
             print("      !restart  Resets the current process with any code changes implemented")
             print("                ...args: New flags and arguments to give the new process.")
             print("                         (Default: current args)")
+            print("     !snapshot  Saves all variables to a file (Load with --restore=FILE)")
+            print("                filename: The name of the file to write")
+            print("        !stats  Displays run counts, latencies and other metrics of this process")
+            print("                filename: Writes them to a file in the Prometheus text format")
+            print("                          instead (Optional)")
             print("")
             print("        !debug  Sets the debug mode (Shows token list and AST)")
             print("                mode: Wether to turn debug off (Optional. Shows debug mode")
@@ -146,18 +307,28 @@ while True:
                 print("ArgImbalanceError (!version does not take arguments)")
         elif command == "read":
             if len(args) == 1:
+                # Mapped like a file being run, so only the lines shown are
+                # decoded and a huge file pages in as it is printed
                 try:
-                    data = open(args[0], "r").read()
+                    source = rojint.Source(args[0], rojint.map_source(args[0]))
                 except FileNotFoundError:
                     print("\033[1m\033[31mFile at `" + os.environ["PWD"] + "/" + args[0] + "` does not exist.\033[0m")
                     continue
                 print("\033[1m\033[35mShowing data from " + os.environ["PWD"] + "/" + args[0] + "\033[0m")
-                data = data.split("\n")
+                try:
+                    line_starts = source.lines()
 
-                num_len = len(str(len(data)))
-                for i in range(len(data)):
-                    num_len_now = len(str(i+1))
-                    print("\033[1m\033[32m\033[7m%s%s\033[0m %s" % (str(i+1), " " * (num_len - num_len_now), data[i]))
+                    num_len = len(str(len(line_starts)))
+                    for i in range(len(line_starts)):
+                        num_len_now = len(str(i+1))
+                        line = source.text[line_starts[i]:source.next_newline(line_starts[i])].decode("utf-8", "replace")
+                        if line.endswith("\r"):
+                            line = line[:-1]
+                        print("\033[1m\033[32m\033[7m%s%s\033[0m %s" % (str(i+1), " " * (num_len - num_len_now), line))
+                finally:
+                    # Empty files are read into bytes rather than mapped
+                    if not isinstance(source.text, bytes):
+                        source.text.close()
             else:
                 print("ArgImbalanceError (!read takes one argument)")
         elif command == "clear":
@@ -165,19 +336,46 @@ while True:
                 print("\033[2J\033[1;1H\033[1m\033[35mCleared.\033[0m")
             else:
                 print("ArgImbalanceError (!clear does not take arguments)")
+        elif command == "snapshot":
+            if len(args) == 1:
+                try:
+                    rojint.save_snapshot(rojint.global_symbol_table, args[0])
+                except OSError as e:
+                    print("\033[1m\033[31mSnapshot Error:\033[0m " + str(e))
+                    continue
+                print("\033[1m\033[35mSaved %d variables to %s\033[0m" % (len(rojint.global_symbol_table.symbols), args[0]))
+            else:
+                print("ArgImbalanceError (!snapshot takes one argument)")
+        elif command == "stats":
+            if len(args) == 0:
+                for line in rojint.metrics.summary():
+                    print(line)
+            elif len(args) == 1:
+                try:
+                    rojint.write_metrics(args[0])
+                except OSError as e:
+                    print("\033[1m\033[31mMetrics Error:\033[0m " + str(e))
+                    continue
+                print("\033[1m\033[35mWrote metrics to %s\033[0m" % (args[0]))
+            else:
+                print("ArgImbalanceError (!stats takes one argument max)")
         elif command == "restart":
             for i in range(len(sys.argv)-1):
-                args.append(sys.argv[i+1])
+                # The snapshot taken below replaces any restored earlier
+                if not sys.argv[i+1].startswith("--restore=") and not sys.argv[i+1].startswith("--private_snapshot="):
+                    args.append(sys.argv[i+1])
             if len(args) == 0:
                 print("\033[1m\033[35mRestarting without args...\033[0m")
             else:
-                approved = args.copy()
-                for i in range(len(approved)):
-                    if approved[i].startswith("--private_"):
-                        approved.pop(i)
-                        i -= 1
+                approved = [arg for arg in args if not arg.startswith("--private_")]
                 print("\033[1m\033[35mRestarting with args %s...\033[0m" % (str(approved)[1:len(str(approved))-1]))
-            print("\033[1m\033[33m\033[7mNOTE:\033[0m\033[1m\033[33m Code history will be reset, as the process is replaced.\033[0m")
+
+            # Carry variables over to the new process
+            fd, snapshot_path = tempfile.mkstemp(prefix="rosh-", suffix=".snapshot")
+            os.close(fd)
+            rojint.save_snapshot(rojint.global_symbol_table, snapshot_path)
+            args.append("--private_snapshot=" + snapshot_path)
+            print("\033[1m\033[33m\033[7mNOTE:\033[0m\033[1m\033[33m Code history will be reset, as the process is replaced. Variables are kept.\033[0m")
 
             args.insert(0, "--private_restarted")
             args.insert(0, "arg_placeholder")
@@ -206,7 +404,7 @@ while True:
         continue
 
     # Not a ROSH command, lex, parse, and interpret
-    result, error = rojint.run("<stdin>", text, {"debug":MODE_DEBUG})
+    result, error = run_code("<stdin>", text, {"debug":MODE_DEBUG})
 
     if error:
         print(error)
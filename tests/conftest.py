@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bin"))
+
+import rojo_interpreter as rojint
+
+# Every test starts from empty globals and the python backend
+@pytest.fixture(autouse=True)
+def fresh_globals():
+    rojint.global_symbol_table = rojint.SymbolTable()
+    rojint.set_numeric_backend("python")
+    yield
+    rojint.global_symbol_table = rojint.SymbolTable()
+    rojint.set_numeric_backend("python")
+
+# run() on each line of `lines` in turn from empty globals, as the repr of
+# each result and error, for comparing other ways of running the same code
+def plain_results(lines, settings=None):
+    rojint.global_symbol_table = rojint.SymbolTable()
+    results = []
+    for line in lines:
+        value, error = rojint.run("<test>", line, dict(settings or {"debug":False}))
+        results.append(outcome(value, error))
+    rojint.global_symbol_table = rojint.SymbolTable()
+    return results
+
+def outcome(value, error):
+    if error:
+        return "error: " + repr(error)
+    return repr(value)
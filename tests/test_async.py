@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import rojo_interpreter as rojint
+from conftest import outcome, plain_results
+
+LINES = [
+    "int a = 7",
+    "float b = a / 2",
+    "a * b - 3 ** 4",
+    "a % 0",
+    "c + 1",
+    "int a = 1",
+    "(-8) ** 0.5",
+    "3 ** 70000 % 1000",
+    "(a + 2) * 5 ** 300",
+]
+
+def async_results(lines, settings):
+    async def main():
+        results = []
+        for line in lines:
+            value, error = await rojint.run_async("<test>", line, dict(settings))
+            results.append(outcome(value, error))
+        return results
+    return asyncio.run(main())
+
+@pytest.mark.parametrize("yield_every", [1, 3, 1000])
+def test_matches_run(yield_every):
+    assert async_results(LINES, {"debug":False, "yield_every":yield_every}) == plain_results(LINES)
+
+def test_matches_run_with_executor():
+    with ThreadPoolExecutor(2) as executor:
+        results = async_results(LINES, {"debug":False, "executor":executor})
+    assert results == plain_results(LINES)
+
+def test_yield_every_below_one():
+    with pytest.raises(ValueError):
+        async_results(["1 + 1"], {"debug":False, "yield_every":0})
+
+def test_timeout_stops_executor_work():
+    with ThreadPoolExecutor(1) as executor:
+        start = time.monotonic()
+        with pytest.raises(asyncio.TimeoutError):
+            async_results(["3 ** 30000000"], {"debug":False, "executor":executor, "timeout":0.2})
+        # The thread gave up too, so the pool can shut down straight away
+    assert time.monotonic() - start < 5
+
+def test_deadline_stops_executor_work():
+    with ThreadPoolExecutor(1) as executor:
+        start = time.monotonic()
+        results = async_results(["3 ** 30000000"], {"debug":False, "executor":executor, "deadline":0.2})
+    assert time.monotonic() - start < 5
+    assert "Evaluation exceeded its deadline" in results[0]
+
+def test_long_sources_parse_on_the_executor(monkeypatch):
+    lines = ["int v%d = %d" % (i, i) for i in range(rojint.EXPENSIVE_SOURCE_CHARS // 10)] + ["v1 + v2 * 3", "v3 / 0"]
+    code = "\n".join(lines)
+    assert len(code) > rojint.EXPENSIVE_SOURCE_CHARS
+
+    threads = []
+    parse = rojint.parse
+    def recording_parse(fname, code, settings):
+        threads.append(threading.current_thread())
+        return parse(fname, code, settings)
+    monkeypatch.setattr(rojint, "parse", recording_parse)
+
+    with ThreadPoolExecutor(1) as executor:
+        results = async_results([code, "v1"], {"debug":False, "executor":executor})
+    assert threads[0] is not threading.main_thread()
+    assert threads[1] is threading.main_thread()
+    assert results == plain_results([code, "v1"])
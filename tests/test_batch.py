@@ -0,0 +1,96 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import rojo_batch
+import rojo_interpreter as rojint
+from conftest import plain_results
+
+ROSH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bin", "rosh1.py")
+
+SCRIPT = [
+    "int x = 1",
+    "x",
+    "x * 3",
+    "x = x + 1",
+    "x",
+    "x / 0",
+    "float y = x / 4",
+    "y + x",
+    "z",
+    "int x = 5",
+    "+x",
+    "1 / (x - 2)",
+    "(x - 2) ** -1",
+    "x = x * 10",
+    "x + y",
+    "x ** 2",
+    "x % 7",
+    "int h = 9 / 3",
+    "x",
+    "y",
+    "h",
+    "h * 2",
+    "@",
+]
+
+def batch(lines, jobs, jsonl=False):
+    out = io.StringIO()
+    rojint.global_symbol_table = rojint.SymbolTable()
+    rojo_batch.run_batch(io.StringIO("".join(line + "\n" for line in lines)), out, jsonl, jobs)
+    return out.getvalue()
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(rojo_batch, "CHUNK_LINES", 3)
+
+@pytest.mark.parametrize("jobs", [2, 3])
+def test_jobs_match_one_job(small_chunks, jobs):
+    assert batch(SCRIPT, jobs) == batch(SCRIPT, 1)
+
+@pytest.mark.parametrize("jobs", [2, 3])
+def test_jsonl_jobs_match_one_job(small_chunks, jobs):
+    lines = [json.dumps({"code": line, "id": i}) for i, line in enumerate(SCRIPT)]
+    lines += ["{", "[1]", json.dumps("int w = 2"), json.dumps("w")]
+    assert batch(lines, jobs, True) == batch(lines, 1, True)
+
+def test_matches_run():
+    records = [json.loads(line) for line in batch(SCRIPT, 1).splitlines()]
+    for record, expected in zip(records, plain_results(SCRIPT)):
+        if record["ok"]:
+            assert record["value"] == expected
+        else:
+            assert record["error"] + ": " + record["details"] in expected
+
+def test_may_change_globals():
+    assert rojo_batch.may_change_globals("x = 1")
+    assert rojo_batch.may_change_globals("+x")
+    assert rojo_batch.may_change_globals("2 * (+x)")
+    assert rojo_batch.may_change_globals("1 - +x")
+    assert not rojo_batch.may_change_globals("x + 1")
+    assert not rojo_batch.may_change_globals("(x) + (1)")
+
+def shell_batch(text, jobs):
+    return subprocess.run(
+        [sys.executable, ROSH, "--batch", "--jobs=" + str(jobs)],
+        input=text, capture_output=True, text=True, timeout=300,
+    )
+
+# In a fresh process, whose workers start without a resource tracker, over
+# more chunks than are handed out before the first is waited for
+def test_shell_jobs_match_one_job():
+    reads = [line for line in SCRIPT if not rojo_batch.may_change_globals(line)]
+    count = rojo_batch.CHUNK_LINES * 2 * (rojo_batch.CHUNKS_AHEAD + 1) // len(reads)
+    lines = ["int x = 3", "float y = 0.5", "int h = 1"] + reads * count + ["x = x + 1"] + reads * count
+    text = "".join(line + "\n" for line in lines)
+
+    one = shell_batch(text, 1)
+    two = shell_batch(text, 2)
+    assert (one.returncode, one.stderr) == (0, "")
+    assert (two.returncode, two.stderr) == (0, "")
+    assert two.stdout.splitlines() == one.stdout.splitlines()
+    assert len(one.stdout.splitlines()) == len(lines)
@@ -0,0 +1,83 @@
+import pytest
+
+import rojo_interpreter as rojint
+
+def run(code, settings):
+    rojint.global_symbol_table = rojint.SymbolTable()
+    return rojint.run("<test>", code, dict(settings, debug=False))
+
+def limit_error(code, settings):
+    value, error = run(code, settings)
+    if error is None:
+        return None
+    assert error.error_name == "ResourceLimitError", repr(error)
+    return error.details
+
+# (code, nodes evaluated): the AST node, then every node of the statements,
+# with StatementsNode for two or more
+@pytest.mark.parametrize("code, nodes", [
+    ("1", 2),
+    ("1 + 2 * 3", 6),
+    ("-(4)", 3),
+    ("int a = 2\na * a", 7),
+    ("float f = 1.5\nf = f / 2\nf", 9),
+])
+def test_max_nodes_at_the_limit(code, nodes):
+    assert limit_error(code, {"max_nodes":nodes}) is None
+    assert limit_error(code, {"max_nodes":nodes - 1}) == "Evaluation exceeded the limit of " + str(nodes - 1) + " nodes"
+
+def test_max_nodes_is_checked_before_errors_past_it():
+    assert limit_error("1 / 0", {"max_nodes":3}) is not None
+    value, error = run("1 / 0", {"max_nodes":4})
+    assert error.error_name == "DivisionByZeroError"
+
+def number(value):
+    return rojint.Number(value, rojint.raw_type(value))
+
+@pytest.mark.parametrize("op_type, left, right, bits", [
+    (rojint.TT_MUL, 255, 255, 16),
+    (rojint.TT_MUL, -256, 3, 11),
+    (rojint.TT_MUL, 0, 2 ** 100, 101),
+    (rojint.TT_MUL, 2.0, 2 ** 100, 0),
+    (rojint.TT_POW, 2, 10, 20),
+    (rojint.TT_POW, 3, 100, 200),
+    (rojint.TT_POW, 2, -5, 1),
+    (rojint.TT_POW, 1, 10 ** 9, 1),
+    (rojint.TT_POW, -1, 10 ** 9, 1),
+    (rojint.TT_POW, 2, 0.5, 0),
+    (rojint.TT_PLUS, 2 ** 100, 2 ** 100, 0),
+])
+def test_estimate_int_bits(op_type, left, right, bits):
+    assert rojint.estimate_int_bits(op_type, number(left), number(right)) == bits
+
+@pytest.mark.parametrize("code, op, bits", [
+    ("255 * 255", "*", 16),
+    ("2 ** 10", "**", 20),
+    ("int a = 3\na ** 100", "**", 200),
+    ("int a = 2 ** 60\na * a", "*", 122),
+])
+def test_max_int_bits_at_the_limit(code, op, bits):
+    assert limit_error(code, {"max_int_bits":bits}) is None
+    details = limit_error(code, {"max_int_bits":bits - 1})
+    assert details == "Result of `" + op + "` could need up to " + str(bits) + " bits (Limit is " + str(bits - 1) + ")"
+
+def test_max_int_bits_leaves_other_operations():
+    assert limit_error("2 ** 0.5 + 10 ** 40 + 10 ** 40", {"max_int_bits":300}) is None
+    assert limit_error("2.5 * 10 ** 40", {"max_int_bits":300}) is None
+
+def test_deadline():
+    assert limit_error("1 + 2 * 3", {"deadline":60}) is None
+    assert limit_error("1 + 2 * 3", {"deadline":None}) is None
+    assert limit_error("1 + 2 * 3", {"deadline":-1}) == "Evaluation exceeded its deadline"
+
+@pytest.mark.parametrize("code", ["1 + 2 * 3", "int a = 1\na", "1 + é"])
+def test_max_source_at_the_limit(code):
+    value, error = run(code, {"max_source":len(code)})
+    assert error is None or error.error_name != "ResourceLimitError"
+    assert limit_error(code, {"max_source":len(code) - 1}) == (
+        "Source is " + str(len(code)) + " characters long (Limit is " + str(len(code) - 1) + ")")
+
+def test_max_source_counts_bytes_of_byte_sources():
+    code = "1 + 2 # é".encode("utf-8")
+    details = limit_error(code, {"max_source":len(code) - 1})
+    assert details == "Source is " + str(len(code)) + " characters long (Limit is " + str(len(code) - 1) + ")"
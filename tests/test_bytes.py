@@ -0,0 +1,65 @@
+import io
+
+import pytest
+
+import rojo_interpreter as rojint
+
+# The result of a run with its positions, or its error as shown and with its
+# lines and columns
+def dump(value, error):
+    if error:
+        return repr(error), error.as_dict()
+    return repr(value), value.type, value.pos_start.ln, value.pos_start.col
+
+def symbols():
+    table = rojint.global_symbol_table
+    return sorted((name, repr(value), table.types.get(name)) for name, value in table.symbols.items())
+
+def run_source(code, settings):
+    rojint.global_symbol_table = rojint.SymbolTable()
+    result = dump(*rojint.run("<test>", code, dict(settings, debug=False)))
+    return result, symbols()
+
+# `data` run from a file read as text, as the shell does with --record
+def run_text(data, settings):
+    text = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8").read()
+    return run_source(text, settings)
+
+SCRIPTS = [
+    b"int a = 1\nint b = 2\na + b",
+    b"int a = 1\r\nint b = 2\r\na + b\r\n",
+    b"int a = 1\rint b = 2\r\na + b",
+    b"int a = 5\r\ra / 0\r",
+    b"float x = 1.5\rint y = x\n",
+    b"int a = 1\r\na +\r\n",
+    b"int a = 1\r\n\r\xc3\xa9 + a",
+    b"int a = 1\r x = .\r",
+    b"x = .\xc3\xa9",
+    b"\xef\xbb\xbfint a = 1",
+    b"int a = 1\n  \t\r  a + q",
+    b"",
+    b"\r",
+    b"  \r\n\r",
+]
+
+@pytest.mark.parametrize("data", SCRIPTS)
+@pytest.mark.parametrize("settings", [{}, {"max_nodes":6}, {"jobs":2, "parse_chunk_size":4}])
+def test_bytes_match_text(data, settings):
+    assert run_source(data, settings) == run_text(data, settings)
+
+@pytest.mark.parametrize("data", SCRIPTS)
+def test_mapped_file_matches_text(data, tmp_path):
+    path = tmp_path / "script.rojo"
+    path.write_bytes(data)
+    source = rojint.map_source(str(path))
+    try:
+        assert run_source(source, {}) == run_text(data, {})
+    finally:
+        if not isinstance(source, bytes):
+            source.close()
+
+def test_carets_count_characters():
+    source = rojint.Source("<test>", "int a = 1\r\néé + ü".encode("utf-8"))
+    start = rojint.Position(11 + 5, 1, 5, source)
+    end = rojint.Position(11 + 7, 1, 7, source)
+    assert rojint.arrow_string(source, start, end).splitlines()[-2:] == ["éé + ü", "   ^~"]
@@ -0,0 +1,115 @@
+import io
+import json
+
+import pytest
+
+import rojo_interpreter as rojint
+
+def debug_run(code, **settings):
+    stream = io.StringIO()
+    value, error = rojint.run("<test>", code, dict(settings, debug=True, debug_stream=stream))
+    return stream.getvalue(), value, error
+
+def json_records(code, **settings):
+    output, value, error = debug_run(code, debug_format="json", **settings)
+    return [json.loads(line) for line in output.splitlines()]
+
+def tokens_and_ast(code):
+    tokens, error = rojint.Lexer(code, "<test>").lex()
+    ast, error = rojint.Parser(tokens).parse()
+    return tokens, ast
+
+@pytest.mark.parametrize("backend", ["python", "gmpy"])
+def test_json_records(backend):
+    if backend == "gmpy":
+        pytest.importorskip("gmpy2")
+    rojint.set_numeric_backend(backend)
+
+    records = json_records("int a = 2\n-a * 1.5 + 2 ** 70")
+    assert records[0] == {"tok": [
+        {"type": "KEYWORD", "value": "int"}, {"type": "IDENTIFIER", "value": "a"}, {"type": "EQ", "value": None},
+        {"type": "INT", "value": 2}, {"type": "NEWLINE", "value": None}, {"type": "MINUS", "value": None},
+        {"type": "IDENTIFIER", "value": "a"}, {"type": "MUL", "value": None}, {"type": "FLOAT", "value": 1.5},
+        {"type": "PLUS", "value": None}, {"type": "INT", "value": 2}, {"type": "POW", "value": None},
+        {"type": "INT", "value": 70}, {"type": "EOF", "value": None},
+    ]}
+    assert records[1] == {"ast": {"node": "AbstractSyntaxTree", "root": {"node": "StatementsNode", "statements": [
+        {"node": "VarAssignNode", "type": "int", "name": "a", "value": {"node": "IntegerNode", "value": 2}},
+        {"node": "BinOpNode", "op": "PLUS",
+            "left": {"node": "BinOpNode", "op": "MUL",
+                "left": {"node": "UnaryOpNode", "op": "MINUS", "operand": {"node": "VarAccessNode", "name": "a"}},
+                "right": {"node": "FloatNode", "value": 1.5}},
+            "right": {"node": "BinOpNode", "op": "POW",
+                "left": {"node": "IntegerNode", "value": 2}, "right": {"node": "IntegerNode", "value": 70}}},
+    ]}}}
+    assert len(records) == 2
+
+@pytest.mark.parametrize("backend", ["python", "gmpy"])
+def test_json_keeps_large_integers_exact(backend):
+    if backend == "gmpy":
+        pytest.importorskip("gmpy2")
+    rojint.set_numeric_backend(backend)
+
+    records = json_records("x = " + str(2 ** 100))
+    assert records[0]["tok"][2] == {"type": "INT", "value": 2 ** 100}
+    value = records[1]["ast"]["root"]["value"]
+    assert value == {"node": "IntegerNode", "value": 2 ** 100}
+    assert type(value["value"]) is int
+
+def test_json_messages_have_no_colours():
+    records = json_records("a +")
+    assert records[0] == {"tok": [{"type": "IDENTIFIER", "value": "a"}, {"type": "PLUS", "value": None}, {"type": "EOF", "value": None}]}
+    assert records[1:] == [{"message": "ast   > Unavailable (Parser Error)"}, {"message": "Parsing Error Encountered"}]
+
+    records = json_records("1 / 0")
+    assert records[-1] == {"message": "Interpreter Error Encountered"}
+
+@pytest.mark.parametrize("code", ["1", "int a = 2\na * -a", "float f = (1 + 2) / 3.5\nf ** 2", "int x = 1\nx = x + 1\n"])
+def test_text_matches_str(code):
+    output, value, error = debug_run(code)
+    tokens, ast = tokens_and_ast(code)
+    assert output == "tok   > " + str(tokens) + "\n" + "ast   > " + str(ast) + "\n"
+
+def test_max_depth():
+    records = json_records("1 + (2 * (3 - 4))", debug_depth=2)
+    assert records[1]["ast"] == {"node": "AbstractSyntaxTree", "root": {
+        "node": "BinOpNode", "op": "PLUS", "left": {"node": "IntegerNode", "value": 1},
+        "right": {"node": "BinOpNode", "op": "MUL", "left": "...", "right": "..."}}}
+
+    output, value, error = debug_run("1 + (2 * (3 - 4))", debug_depth=2)
+    assert output.splitlines()[1] == "ast   > BinOpNode:(INT:1, PLUS, BinOpNode:(..., MUL, ...))"
+
+def test_max_chars():
+    output, value, error = debug_run("1 + (2 * (3 - 4))", debug_limit=20)
+    tokens, ast = tokens_and_ast("1 + (2 * (3 - 4))")
+    assert output.splitlines() == [
+        "tok   > " + str(tokens)[:20] + " ...(truncated)",
+        "ast   > " + str(ast)[:20] + " ...(truncated)",
+    ]
+    assert repr(value) == "-1"
+
+def test_deep_trees_do_not_recurse():
+    tokens, ast = tokens_and_ast("1")
+    node = ast.node
+    for i in range(5000):
+        node = rojint.UnaryOpNode(rojint.Token(rojint.TT_MINUS, pos_start=node.pos_start), node)
+
+    stream = io.StringIO()
+    rojint.DebugEmitter(stream, "json").ast(node)
+    unary = '{"node": "UnaryOpNode", "op": "MINUS", "operand": '
+    assert stream.getvalue() == '{"ast": ' + unary * 5000 + '{"node": "IntegerNode", "value": 1}' + "}" * 5001 + "\n"
+
+def test_long_dumps_are_written_in_pieces():
+    class Stream(io.StringIO):
+        writes = 0
+
+        def write(self, text):
+            self.writes += 1
+            return super().write(text)
+
+    code = " + ".join(["1"] * 5000)
+    tokens, ast = tokens_and_ast(code)
+    stream = Stream()
+    rojint.DebugEmitter(stream).tokens(tokens)
+    assert stream.getvalue() == "tok   > " + str(tokens) + "\n"
+    assert stream.writes > 1
@@ -0,0 +1,91 @@
+import io
+import json
+import random
+
+import pytest
+
+import rojo_interpreter as rojint
+import rojo_ls
+from rojo_document import Document
+
+PIECES = ["1", "2", ".", " ", "x", "ab", "+", "*", "**", "(", ")", "=", "int ", "float ",
+          "-", "/", "%", "&", "\t", "9.5", "\n", "\n", "x = 1\n", "int y = 2 * x\n"]
+
+# Diagnostics and statements from lexing and parsing the whole text
+def whole(text):
+    tokens, error = rojint.Lexer(text, "<doc>").lex()
+    if not error:
+        ast, error = rojint.TableParser(tokens).parse()
+    if error:
+        return [repr(error)], None
+    node = ast.node
+    statements = node.statements if isinstance(node, rojint.StatementsNode) else [node]
+    return [], [repr(statement) for statement in statements]
+
+def incremental(document):
+    diagnostics = [repr(error) for error in document.diagnostics()]
+    if diagnostics:
+        return diagnostics, None
+    return [], [repr(line.statement) for line in document.lines if line.statement is not None]
+
+def line_col(text, idx):
+    return text.count("\n", 0, idx), idx - (text.rfind("\n", 0, idx) + 1)
+
+@pytest.mark.parametrize("seed", range(4))
+def test_edits_match_whole_text(seed):
+    rng = random.Random(seed)
+    for trial in range(300):
+        text = "".join(rng.choice(PIECES) for i in range(rng.randint(0, 25)))
+        document = Document("<doc>", text)
+        assert incremental(document) == whole(text)
+
+        for step in range(10):
+            start = rng.randint(0, len(text))
+            end = rng.randint(start, min(len(text), start + 6))
+            new_text = "".join(rng.choice(PIECES) for i in range(rng.randint(0, 3)))
+
+            document.edit(*line_col(text, start), *line_col(text, end), new_text)
+            text = text[:start] + new_text + text[end:]
+            assert document.text == text
+            assert incremental(document) == whole(text)
+
+def test_positions_past_the_end():
+    document = Document("<doc>", "1 +\n2")
+    document.edit(0, 10, 0, 10, " 3")
+    assert document.text == "1 + 3\n2"
+    document.edit(7, 0, 9, 4, "\n4")
+    assert document.text == "1 + 3\n2\n4"
+    assert incremental(document) == whole(document.text)
+
+def test_edits_leave_later_lines_alone():
+    document = Document("<doc>", "1\n2 +\n3 @\n")
+    later = document.lines[1:]
+    document.edit(0, 0, 0, 0, "int a = 1\n\n")
+    assert document.lines[3:] == later
+    assert document.diagnostics()[0].pos_start.ln == 4
+
+def frame(message):
+    body = json.dumps(message).encode()
+    return b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+
+def test_language_server_publishes_diagnostics():
+    messages = [
+        {"jsonrpc": "2.0", "method": "textDocument/didOpen", "params": {"textDocument": {"uri": "a.rojo", "text": "1 +\n2"}}},
+        {"jsonrpc": "2.0", "method": "textDocument/didChange", "params": {
+            "textDocument": {"uri": "a.rojo"},
+            "contentChanges": [{"range": {"start": {"line": 0, "character": 3}, "end": {"line": 0, "character": 3}}, "text": " 1"}],
+        }},
+    ]
+    out = io.BytesIO()
+    rojo_ls.LanguageServer(io.BytesIO(b"".join(frame(message) for message in messages)), out).serve()
+
+    published = []
+    stream = io.BytesIO(out.getvalue())
+    while True:
+        message = rojo_ls.read_message(stream)
+        if message is None:
+            break
+        published.append(message["params"]["diagnostics"])
+
+    assert [diagnostic["code"] for diagnostic in published[0]] == ["InvalidSyntaxError"]
+    assert published[1] == []
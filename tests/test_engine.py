@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import rojo_interpreter as rojint
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bench")
+
+LINES = ["x * 2", "y + x", "x / 0", "int z = x ** 3", "z - y", "w", "1 +", "x = 2.5"]
+
+def test_matches_run():
+    engine = rojint.Engine()
+    engine.define("int", "x", 21)
+    engine.define("float", "y", 1)
+    got = [engine.evaluate(line, "<test>").as_dict() for line in LINES]
+
+    rojint.run("<test>", "int x = 21", {"debug":False})
+    rojint.run("<test>", "float y = 1.0", {"debug":False})
+    want = [rojint.Result(*rojint.run("<test>", line, {"debug":False})).as_dict() for line in LINES]
+    assert got == want
+
+def test_define_converts_an_int_for_a_float():
+    engine = rojint.Engine()
+    engine.define("float", "x", 1)
+    result = engine.evaluate("x")
+    assert (result.type, result.value) == ("float", 1.0)
+    assert engine.evaluate("x = x * 2").ok
+
+@pytest.mark.parametrize("type_, value", [
+    ("int", 2.5), ("int", 2.0), ("int", True), ("int", "1"), ("float", "1.5"), ("float", 10 ** 400), ("bool", 1),
+])
+def test_define_refuses_values_the_type_cannot_hold(type_, value):
+    engine = rojint.Engine()
+    with pytest.raises(ValueError):
+        engine.define(type_, "z", value)
+    assert engine.get("z") is None
+
+def test_import_budget():
+    bench = subprocess.run([sys.executable, os.path.join(BENCH_DIR, "import_bench.py"), "25", "9"], capture_output=True, text=True)
+    assert bench.returncode == 0, bench.stdout + bench.stderr
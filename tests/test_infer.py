@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+import rojo_interpreter as rojint
+
+NAMES = ["a", "b", "c", "foo"]
+
+class Scripts:
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+
+    def atom(self, depth):
+        k = self.rng.random()
+        if k < 0.25:
+            return str(self.rng.choice([0, 1, 2, 3, 7, 2 ** 40, 10 ** 400, 2 ** 1023 - 1, 2 ** 1024 - 1]))
+        if k < 0.45:
+            return self.rng.choice(["0.0", "1.5", "2.0", "0.5"])
+        if k < 0.7:
+            return self.rng.choice(NAMES)
+        return "(" + self.expression(depth + 1) + ")"
+
+    def expression(self, depth=0):
+        if depth > 3:
+            return self.atom(depth)
+        if self.rng.random() < 0.2:
+            return self.rng.choice(["int ", "float ", ""]) + self.rng.choice(NAMES) + " = " + self.expression(depth + 1)
+        text = self.rng.choice(["-", "+", "- -", ""]) + self.atom(depth)
+        for i in range(self.rng.randint(0, 3)):
+            op = self.rng.choice(["+", "-", "*", "/", "%", "**"])
+            if op == "**":
+                text = "(" + text + ") ** " + self.rng.choice(["0", "2", "3", "0.5", "-1", "2.0", "-2"])
+            else:
+                text += " " + op + " " + self.rng.choice(["-", "+", ""]) + self.atom(depth)
+        return text
+
+    def script(self):
+        return "\n".join([self.expression() for i in range(self.rng.choice([1, 1, 2, 3]))])
+
+    # Globals with some of NAMES set, as ints, large ints or floats
+    def table(self):
+        table = rojint.SymbolTable()
+        for name in NAMES:
+            k = self.rng.random()
+            if k < 0.3:
+                table.set("int", name, self.rng.choice([0, 3, 2 ** 30, 2 ** 1023 - 1, 10 ** 400]))
+            elif k < 0.5:
+                table.set("float", name, self.rng.choice([0.0, 1.5]))
+        return table
+
+# The result of a run, or its error with its lines and columns
+def dump(value, error):
+    if error:
+        return error.as_dict()
+    return repr(value), value.type, value.pos_start.idx, value.pos_end.idx
+
+def symbols(table):
+    return sorted((name, repr(value), getattr(value, "type", None), table.types.get(name)) for name, value in table.symbols.items())
+
+# `code` run on a copy of `table` with "infer_types" `infer`, as its result
+# and the globals it left
+def run_infer(code, table, infer, settings):
+    rojint.global_symbol_table = rojint.SymbolTable()
+    rojint.global_symbol_table.symbols = dict(table.symbols)
+    rojint.global_symbol_table.types = dict(table.types)
+    value, error = rojint.run("<test>", code, dict(settings, debug=False, infer_types=infer))
+    return dump(value, error), symbols(rojint.global_symbol_table)
+
+# Counts the scripts the TypeInferencer rejects before they run
+@pytest.fixture
+def static_errors(monkeypatch):
+    counts = {"errors":0}
+    infer = rojint.TypeInferencer.infer
+
+    def counting(self, node, context):
+        error = infer(self, node, context)
+        counts["errors"] += error is not None
+        return error
+
+    monkeypatch.setattr(rojint.TypeInferencer, "infer", counting)
+    return counts
+
+@pytest.mark.parametrize("seed, settings", [(0, {}), (1, {"max_int_bits":80}), (2, {"max_int_bits":2000}), (3, {"max_nodes":8})])
+def test_generated_scripts_match_interpreter(seed, settings, static_errors):
+    scripts = Scripts(seed)
+    for i in range(300):
+        code = scripts.script()
+        table = scripts.table()
+        assert run_infer(code, table, True, settings) == run_infer(code, table, False, settings), code
+    assert static_errors["errors"] > 0
+
+@pytest.mark.parametrize("code", [
+    "a / 2",
+    "a / 0",
+    "b / 0.0",
+    "int c = a / 2",
+    "float f = a ** -1",
+    "a ** 0.5 + b",
+    "-a ** 2",
+    "- -b * a",
+    "(a - 3) ** -1",
+    "(a - 3) ** -1.0",
+    "big * 2.0",
+    "big / 3",
+    "big ** 0.5",
+    "-big * -1.0",
+    "int d = 2.5",
+    "a = 1.5",
+    "b = 2",
+    "a % 0",
+    "b % 0.0",
+    "q + 1",
+    "int e = 1\ne = e / 2",
+    "float g = 1\ng * big",
+    "a + big\nq",
+])
+@pytest.mark.parametrize("settings", [{}, {"max_int_bits":64}, {"max_nodes":5}])
+def test_scripts_match_interpreter(code, settings):
+    table = rojint.SymbolTable()
+    table.set("int", "a", 3)
+    table.set("float", "b", 1.5)
+    table.set("int", "big", 2 ** 1024 - 1)
+    assert run_infer(code, table, True, settings) == run_infer(code, table, False, settings)
@@ -0,0 +1,58 @@
+import asyncio
+import io
+
+import pytest
+
+import rojo_interpreter as rojint
+
+# (code, text of the node the error is on, line of that node)
+CASES = [
+    ("int a = 0\n(a) ** -1", "a) ** -1", 1),
+    ("int a = 0\n1 + (a) ** -1 * 2", "a) ** -1", 1),
+    ("int b = 2 ** 1024\nb * 1.5 + 1", "b * 1.5", 1),
+    ("int b = 2 ** 1024\n\nb / 1", "b / 1", 2),
+    ("1.5 + 2 ** 1024", "1.5 + 2 ** 1024", 0),
+]
+
+def node_text(error):
+    return error.pos_start.source.text[error.pos_start.idx:error.pos_end.idx]
+
+def check(error, text, ln):
+    assert error.error_name == "RojoInternalError"
+    assert node_text(error) == text
+    assert error.pos_start.ln == ln
+    assert error.node is not None
+    assert (error.node.pos_start, error.node.pos_end) == (error.pos_start, error.pos_end)
+
+@pytest.mark.parametrize("code, text, ln", CASES)
+@pytest.mark.parametrize("settings", [{}, {"infer_types":False}, {"max_nodes":1000}])
+def test_run(code, text, ln, settings):
+    value, error = rojint.run("<test>", code, dict(settings, debug=False))
+    check(error, text, ln)
+
+@pytest.mark.parametrize("code, text, ln", CASES)
+def test_compiled(code, text, ln):
+    settings = {"debug":False, "tier_threshold":1}
+    rojint.compiled_forms.clear()
+    rojint.run("<test>", code, settings)
+    assert ("<test>", code) in rojint.compiled_forms.forms
+
+    rojint.global_symbol_table = rojint.SymbolTable()
+    value, error = rojint.run("<test>", code, settings)
+    check(error, text, ln)
+
+@pytest.mark.parametrize("code, text, ln", CASES)
+def test_async(code, text, ln):
+    value, error = asyncio.run(rojint.run_async("<test>", code, {"debug":False, "yield_every":2}))
+    check(error, text, ln)
+
+@pytest.mark.parametrize("code, text, ln", CASES)
+def test_stream(code, text, ln):
+    value, error = rojint.run_stream("<test>", io.StringIO(code), {"debug":False})
+    check(error, text, ln)
+
+def test_whole_source_without_a_node():
+    error = rojint.internal_error("<test>", "1 + 2\n3", ValueError("bad"))
+    assert error.node is None
+    assert (error.pos_start.idx, error.pos_end.idx, error.pos_end.ln) == (0, 7, 1)
+    assert error.details == "ValueError: bad"
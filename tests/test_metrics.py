@@ -0,0 +1,158 @@
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+import rojo_interpreter as rojint
+
+ROSH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bin", "rosh1.py")
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{((?:[a-zA-Z_][a-zA-Z0-9_]*="[^"]*",?)*)\})? (\S+)$')
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    rojint.compiled_forms.clear()
+    rojint.metrics.reset()
+    yield
+    rojint.metrics.enabled = True
+    rojint.metrics.reset()
+
+def run_all(lines, settings=None):
+    for line in lines:
+        rojint.run("<test>", line, dict(settings or {}, debug=False))
+
+# The samples of the Prometheus text exposition `text`, as {name: {labels:
+# value}}, after checking every family is declared before its samples
+def read_exposition(text):
+    assert text.endswith("\n")
+    families = {}
+    samples = {}
+    for line in text[:-1].split("\n"):
+        if line.startswith("# HELP "):
+            name = line.split(" ")[2]
+            assert name not in families
+            families[name] = None
+            continue
+        if line.startswith("# TYPE "):
+            name, type_ = line.split(" ")[2:]
+            assert families[name] is None
+            families[name] = type_
+            continue
+
+        match = SAMPLE.match(line)
+        assert match, line
+        name, labels, value = match.groups()
+        family = name
+        if family not in families:
+            family = re.sub("_(bucket|sum|count)$", "", name)
+            assert families[family] == "histogram", line
+        assert families[family] in ("counter", "gauge", "histogram")
+        labels = tuple(labels.rstrip(",").split(",")) if labels else ()
+        samples.setdefault(name, {})[labels] = float(value)
+    return samples
+
+SCRIPT = ["int a = 2", "a * 3 + 2 ** 70", "1 / 0", "a +", "q"]
+
+def test_counters_after_known_runs():
+    run_all(SCRIPT)
+    metrics = rojint.metrics
+    assert metrics.runs == 5
+    assert metrics.errors == {"DivisionByZeroError":1, "InvalidSyntaxError":1, "NotDefinedError":1}
+    assert metrics.node_names() == {"AbstractSyntaxTree":4, "BinOpNode":4, "IntegerNode":6, "VarAccessNode":2, "VarAssignNode":1}
+    assert metrics.caches == {"compiled":[0, 5]}
+    assert metrics.int_bits == {rojint.TT_MUL:3, rojint.TT_POW:71}
+    # "a +" stops after parsing
+    assert [metrics.phases[phase].count for phase in rojint.PHASES] == [5, 5, 4, 4]
+
+def test_compiled_cache_hits():
+    run_all(["int a = 2"] + ["a * 3"] * 4, {"tier_threshold":2})
+    assert rojint.metrics.caches == {"compiled":[2, 3]}
+
+def test_engine_parse_cache():
+    engine = rojint.Engine()
+    for i in range(3):
+        engine.evaluate("1 + 2")
+    assert rojint.metrics.caches["parse"] == [2, 1]
+    assert rojint.metrics.runs == 3
+
+def test_disabled_metrics_count_nothing():
+    rojint.metrics.enabled = False
+    run_all(SCRIPT)
+    assert rojint.metrics.runs == 0
+    assert rojint.metrics.errors == {}
+    assert rojint.metrics.nodes == {}
+    assert [rojint.metrics.phases[phase].count for phase in rojint.PHASES] == [0, 0, 0, 0]
+
+def test_histogram():
+    histogram = rojint.Histogram((1, 2, 5))
+    for value in (0.5, 1, 1.5, 3, 3, 9):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 2, 1]
+    assert (histogram.count, histogram.sum) == (6, 18.0)
+    assert [histogram.quantile(q) for q in (0.3, 0.5, 0.8, 1.0)] == [1, 2, 5, float("inf")]
+
+def test_exposition_values():
+    run_all(SCRIPT)
+    samples = read_exposition(rojint.metrics.prometheus())
+
+    assert samples["rojo_runs_total"] == {(): 5}
+    assert samples["rojo_errors_total"] == {
+        ('error="DivisionByZeroError"',): 1, ('error="InvalidSyntaxError"',): 1, ('error="NotDefinedError"',): 1}
+    assert samples["rojo_nodes_evaluated_total"][('node="IntegerNode"',)] == 6
+    assert samples["rojo_cache_requests_total"] == {
+        ('cache="compiled"', 'result="hit"'): 0, ('cache="compiled"', 'result="miss"'): 5}
+    assert samples["rojo_int_result_bits_max"] == {('op="*"',): 3, ('op="**"',): 71}
+
+    for phase in rojint.PHASES:
+        histogram = rojint.metrics.phases[phase]
+        buckets = [(labels, value) for labels, value in samples["rojo_phase_seconds_bucket"].items() if labels[0] == 'phase="' + phase + '"']
+        bounds = [labels[1] for labels, value in buckets]
+        assert bounds == ['le="' + repr(float(bound)) + '"' for bound in rojint.METRIC_BUCKETS] + ['le="+Inf"']
+        counts = [value for labels, value in buckets]
+        assert counts == sorted(counts)
+        assert counts[-1] == histogram.count
+        assert samples["rojo_phase_seconds_count"][('phase="' + phase + '"',)] == histogram.count
+        assert samples["rojo_phase_seconds_sum"][('phase="' + phase + '"',)] == histogram.sum
+
+def test_exposition_before_any_run():
+    samples = read_exposition(rojint.metrics.prometheus())
+    assert samples["rojo_runs_total"] == {(): 0}
+    assert "rojo_errors_total" not in samples
+    assert set(samples["rojo_phase_seconds_bucket"].values()) == {0}
+
+def test_write_metrics(tmp_path):
+    run_all(SCRIPT)
+    path = tmp_path / "rojo.prom"
+    rojint.write_metrics(str(path))
+    assert path.read_text() == rojint.metrics.prometheus()
+    assert os.listdir(tmp_path) == ["rojo.prom"]
+
+def shell(args, text, cwd):
+    return subprocess.run([sys.executable, ROSH, "--backend=python"] + args, input=text,
+        capture_output=True, text=True, timeout=60, cwd=cwd)
+
+def test_shell_metrics_file(tmp_path):
+    script = tmp_path / "script.rojo"
+    script.write_text("int a = 2\na ** 10")
+    result = shell([str(script), "--metrics=" + str(tmp_path / "rojo.prom")], "", tmp_path)
+    assert (result.returncode, result.stderr) == (0, "")
+
+    samples = read_exposition((tmp_path / "rojo.prom").read_text())
+    assert samples["rojo_runs_total"] == {(): 1}
+    assert samples["rojo_int_result_bits_max"] == {('op="*"',): 0, ('op="**"',): 11}
+    assert samples["rojo_phase_seconds_count"][('phase="eval"',)] == 1
+
+def test_shell_stats(tmp_path):
+    text = "int a = 2\na * 3\n1 / 0\n!stats\n!stats " + str(tmp_path / "rojo.prom") + "\n!exit\n"
+    result = shell([], text, tmp_path)
+    assert (result.returncode, result.stderr) == (0, "")
+    assert "Runs: 3 in " in result.stdout
+    assert "Errors: DivisionByZeroError 1\n" in result.stdout
+    assert "Nodes: AbstractSyntaxTree 3, BinOpNode 2, IntegerNode 4, VarAccessNode 1, VarAssignNode 1\n" in result.stdout
+
+    samples = read_exposition((tmp_path / "rojo.prom").read_text())
+    assert samples["rojo_runs_total"] == {(): 3}
+    assert samples["rojo_errors_total"] == {('error="DivisionByZeroError"',): 1}
+    assert samples["rojo_int_result_bits_max"] == {('op="*"',): 3, ('op="**"',): 0}
@@ -0,0 +1,73 @@
+import io
+import json
+import random
+
+import pytest
+
+import rojo_interpreter as rojint
+
+GLOBALS = [("x", "int", 3), ("y", "float", 2.5), ("b", "int", 3 ** 100), ("c", "int", 5)]
+
+FIXED = [
+    "b ** 3", "b * 1.5", "b / 7", "b % 7", "b % 2.5", "(b*b*b) * 1.0", "b ** -1", "0 ** -1", "(0-b) ** 0.5",
+    "(0-2) ** 0.5", "1 ** 100000000000000000000", "(0-1) ** 100000000000000000001", "2 ** 2000 / 3",
+    "2 ** 2000 / 2 ** 1990", "2 ** 20000 * 1.0", "7 % 0", "b / 0", "(2 ** 64) % 3", "(0 - 2 ** 70) % 3",
+    "5 % (0 - 2 ** 70)", "4 / 2 * b", "(4/2) % 3", "int q = b * b", "q = q ** 2", "float f = b * 1.5",
+    "f = b", "int z = b / 3", "x = b % 10", "2 ** 15000", "-(2 ** 3000)",
+]
+
+def generated(rng, depth=0):
+    k = rng.random()
+    if depth > 4 or k < 0.3:
+        return rng.choice(["1", "2", "0", "3.5", "0.5", "x", "y", "b", "c", "7", "12345678901234567890123", "1.0"])
+    if k < 0.4:
+        return rng.choice(["-", "+"]) + generated(rng, depth + 1)
+    if k < 0.5:
+        return "(" + generated(rng, depth + 1) + ")"
+    op = rng.choice(["+", "-", "*", "/", "%", "**"])
+    if op == "**":
+        return "(" + generated(rng, depth + 1) + ") ** " + rng.choice(["2", "3", "0.5", "-1", "(-2)", "0", "40", "300", "c"])
+    return generated(rng, depth + 1) + " " + op + " " + generated(rng, depth + 1)
+
+def run_all(backend, lines, settings):
+    rojint.set_numeric_backend(backend)
+    rojint.global_symbol_table = rojint.SymbolTable()
+    for name, type_, value in GLOBALS:
+        rojint.global_symbol_table.set(type_, name, rojint.numeric.to_int(value) if type_ == "int" else value)
+
+    results = []
+    for line in lines:
+        value, error = rojint.run("<test>", line, dict(settings))
+        if error:
+            results.append(repr(error))
+            continue
+        try:
+            results.append((repr(value), value.type, type(rojint.numeric.to_python(value.value)).__name__))
+        except ValueError as e:
+            # Past the digit limit of int to str conversion
+            results.append((str(e), value.type))
+    return results
+
+@pytest.mark.parametrize("settings", [
+    {"debug":False},
+    {"debug":False, "max_int_bits":5000},
+    {"debug":False, "infer_types":False},
+])
+def test_gmpy_matches_python(settings):
+    pytest.importorskip("gmpy2")
+    rng = random.Random(0)
+    lines = FIXED + [generated(rng) for i in range(300)]
+    assert run_all("gmpy", lines, settings) == run_all("python", lines, settings)
+
+@pytest.mark.parametrize("backend", ["python", "gmpy"])
+def test_json_debug_output(backend):
+    if backend == "gmpy":
+        pytest.importorskip("gmpy2")
+    rojint.set_numeric_backend(backend)
+
+    out = io.StringIO()
+    value, error = rojint.run("<test>", "int a = 3 ** 50 + 12345678901234567890123\na * 2",
+                              {"debug":True, "debug_format":"json", "debug_stream":out})
+    assert error is None
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert {"type": "INT", "value": 12345678901234567890123} in records[0]["tok"]
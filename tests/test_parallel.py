@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+import rojo_interpreter as rojint
+
+NAMES = ["a", "b", "c", "d", "e", "foo"]
+
+class Scripts:
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+
+    def atom(self, depth):
+        k = self.rng.random()
+        if k < 0.3:
+            return str(self.rng.choice([0, 1, 2, 3, 7, 10 ** 40]))
+        if k < 0.45:
+            return self.rng.choice(["0.0", "1.5", "2.0"])
+        if k < 0.75:
+            return self.rng.choice(NAMES)
+        return "(" + self.expression(depth + 1) + ")"
+
+    def expression(self, depth=0):
+        if depth > 2:
+            return self.atom(depth)
+        if self.rng.random() < 0.15:
+            return self.rng.choice(["int ", "float ", ""]) + self.rng.choice(NAMES) + " = " + self.expression(depth + 1)
+        text = self.atom(depth)
+        for i in range(self.rng.randint(0, 2)):
+            text += " " + self.rng.choice(["+", "-", "*", "/", "%"]) + " " + self.atom(depth)
+        return text
+
+    def statement(self):
+        if self.rng.random() < 0.6:
+            return self.rng.choice(["int ", "float ", "", ""]) + self.rng.choice(NAMES) + " = " + self.expression()
+        return self.expression()
+
+    def script(self):
+        lines = [self.statement() for i in range(self.rng.randint(2, 8))]
+        return "\n".join(lines) + self.rng.choice(["", "\n", "\n\n"])
+
+def dump_value(value):
+    if not isinstance(value, rojint.Number):
+        return value
+    return repr(value), value.type
+
+# run() on `code` on top of two variables, as its result or error and the
+# variables it left
+def run_script(code, jobs):
+    rojint.global_symbol_table = rojint.SymbolTable()
+    rojint.run("<prev>", "int a = 3", {"debug":False})
+    rojint.run("<prev>", "float e = 1.5", {"debug":False})
+
+    value, error = rojint.run("<test>", code, {"debug":False, "jobs":jobs})
+    table = rojint.global_symbol_table
+    symbols = sorted((name, dump_value(value), table.types.get(name)) for name, value in table.symbols.items())
+    return repr(error) if error else dump_value(value), symbols
+
+def test_generated_scripts_match_sequential():
+    scripts = Scripts(0)
+    parallel = 0
+    for i in range(40):
+        code = scripts.script()
+        ast, error = rojint.parse("<test>", code, {"debug":False})
+        if not error and rojint.parallel_waves(ast, {"jobs":3}):
+            parallel += 1
+        assert run_script(code, 3) == run_script(code, 1), code
+    assert parallel > 0
+
+@pytest.mark.parametrize("code", [
+    "int a2 = 3 ** 5000 % 97\nint b2 = 7 ** 5000 % 89\na2 + b2",
+    "int x = 2 ** 100\nint y = x / 0\nint z = 4\nz",
+    "int x = 1\nfloat y = 2.5\nint z = y\nx",
+    "int x = 1\nint y = x + q\nint z = 5\nz",
+    "int x = 10\nx = x * 2\nfloat y = x / 4\ny + x",
+])
+def test_scripts_match_sequential(code):
+    assert run_script(code, 3) == run_script(code, 1)
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+import rojo_interpreter as rojint
+
+PIECES = ["1", "22", "3.5", " ", "x", "ab", "+", "-", "*", "**", "/", "%", "(", ")", "=", "int ", "float ", "\n", "\n", "\t"]
+GOOD = ["int a = 1", "b = (a + 2) * 3.5", "-x ** 2 / 7 % 3", "float c = 1.5", "", "a"]
+
+def script(rng):
+    lines = []
+    for i in range(rng.randint(0, 12)):
+        if rng.random() < 0.85:
+            lines.append(rng.choice(GOOD))
+        else:
+            lines.append("".join(rng.choice(PIECES) for j in range(rng.randint(0, 6))))
+    if rng.random() < 0.1:
+        lines.append("&")
+    return "\n".join(lines) + rng.choice(["", "\n"])
+
+def position(pos):
+    return pos.idx, pos.ln, pos.col, pos.source.text
+
+# Every node of an AST with its positions and tokens, in order
+def dump(node):
+    out = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        fields = {}
+        for name, value in sorted(vars(node).items()):
+            if isinstance(value, rojint.Position):
+                fields[name] = position(value)
+            elif isinstance(value, rojint.Token):
+                fields[name] = (value.type, value.value, position(value.pos_start), position(value.pos_end))
+            elif isinstance(value, list):
+                stack.extend(reversed(value))
+                fields[name] = len(value)
+            elif hasattr(value, "pos_start"):
+                stack.append(value)
+                fields[name] = "node"
+            else:
+                fields[name] = value
+        out.append((type(node).__name__, fields))
+    return out
+
+@pytest.mark.parametrize("seed", range(3))
+def test_matches_sequential_parse(seed):
+    rng = random.Random(seed)
+    compared = 0
+    for i in range(60):
+        code = script(rng)
+        ast, error = rojint.parse("<test>", code, {"debug":False})
+        result = rojint.parse_parallel("<test>", code, {"debug":False, "jobs":2, "parse_chunk_size":rng.randint(0, 30)})
+        if result is None:
+            # Only given up on for syntax errors, which parse() then reports
+            assert error is not None and error.error_name == "InvalidSyntaxError", code
+            continue
+
+        compared += 1
+        assert repr(result[1]) == repr(error), code
+        if error is None:
+            assert dump(result[0]) == dump(ast), code
+    assert compared > 0
+
+def test_run_reports_first_error_in_file_order():
+    code = "".join("int v%d = %d\n" % (k, k) for k in range(400)) + "1 +\n" + "".join("v%d\n" % k for k in range(400)) + "@\n"
+    sequential = rojint.run("<test>", code, {"debug":False})
+    rojint.global_symbol_table = rojint.SymbolTable()
+    parallel = rojint.run("<test>", code, {"debug":False, "jobs":2, "parse_chunk_size":256})
+    assert repr(parallel[1]) == repr(sequential[1])
+    assert parallel[1].error_name == "IllegalCharacterError"
+
+def test_run_matches_sequential():
+    code = "".join("int v%d = %d * 3\n" % (k, k) for k in range(400)) + "v10 + v399\n"
+    sequential = rojint.run("<test>", code, {"debug":False})
+    rojint.global_symbol_table = rojint.SymbolTable()
+    parallel = rojint.run("<test>", code, {"debug":False, "jobs":2, "parse_chunk_size":256})
+    assert repr(parallel) == repr(sequential)
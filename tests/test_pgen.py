@@ -0,0 +1,100 @@
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+import rojo_interpreter as rojint
+import rojo_pgen
+
+PIECES = ["1", "2", "3.5", " ", "x", "ab", "+", "-", "*", "/", "%", "**", "(", ")", "=", " = ", "int ", "float ", "\n", "foo"]
+
+def position(pos):
+    return (pos.idx, pos.ln, pos.col) if pos else None
+
+# The AST a parser builds, or its error with its positions
+def parsed(parser, tokens):
+    ast, error = parser(tokens).parse()
+    if error:
+        return repr(ast), type(error).__name__, error.details, position(error.pos_start), position(error.pos_end)
+    return repr(ast), None
+
+def parsed_chunk(parser, tokens):
+    nodes, error = parser(tokens).parse_chunk()
+    return repr(nodes), repr(error) if error else None
+
+def tokens_of(text):
+    tokens, error = rojint.Lexer(text, "<test>").lex()
+    return None if error else tokens
+
+def check(text):
+    tokens = tokens_of(text)
+    if tokens is None:
+        return False
+    assert parsed(rojint.TableParser, tokens) == parsed(rojint.Parser, tokens), text
+    assert parsed_chunk(rojint.TableParser, tokens) == parsed_chunk(rojint.Parser, tokens), text
+    return True
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_random_sources_match_parser(seed):
+    rng = random.Random(seed)
+    checked = 0
+    for i in range(3000):
+        checked += check("".join(rng.choice(PIECES) for k in range(rng.randint(0, 25))))
+    assert checked > 1000
+
+@pytest.mark.parametrize("text", [
+    "",
+    "\n\n",
+    "1 + 2 * 3",
+    "-(4) ** -2 ** 3",
+    "int a = float b = 2 ** 0.5",
+    "(int a = 1) + a",
+    "a = b = c\n\nd % e / f",
+    "1 +",
+    "1 + * 2",
+    "(1 + 2",
+    "(1 + 2))",
+    "1 2",
+    "int = 3",
+    "int 3 = a",
+    "a = \n1",
+    "float",
+    "(",
+    ")",
+    "1\n2 +\n3",
+    "- - - x",
+    "** 2",
+])
+def test_sources_match_parser(text):
+    assert check(text)
+
+def test_errors_are_reported_where_the_parser_reports_them():
+    tokens = tokens_of("int a = 1\n(a + \n")
+    result = parsed(rojint.TableParser, tokens)
+    assert result[1] == "InvalidSyntaxError"
+    assert result == parsed(rojint.Parser, tokens)
+
+def test_tables_are_up_to_date():
+    result = subprocess.run(
+        [sys.executable, os.path.join(rojo_pgen.BIN_DIR, "rojo_pgen.py"), "--check"],
+        capture_output=True, text=True, timeout=60)
+    assert (result.returncode, result.stderr) == (0, "")
+
+def test_check_reports_stale_tables(tmp_path, monkeypatch, capsys):
+    with open(rojo_pgen.INTERPRETER_FILE, "r") as f:
+        source = f.read()
+    start = source.index(rojo_pgen.BEGIN_MARKER)
+    stale = source[:start] + source[start:].replace('    "int",\n', '', 1)
+    assert stale != source
+
+    path = tmp_path / "rojo_interpreter.py"
+    path.write_text(stale)
+    monkeypatch.setattr(rojo_pgen, "INTERPRETER_FILE", str(path))
+    assert rojo_pgen.main(["--check"]) == 1
+    assert path.read_text() == stale
+    assert "out of date" in capsys.readouterr().err
+
+    assert rojo_pgen.main([]) == 0
+    assert path.read_text() == source
@@ -0,0 +1,35 @@
+import json
+
+import rojo_interpreter as rojint
+import rojo_replay
+
+LINES = ["x", "x = x", "x * 10 ** 30", "f + x", "big % 1000", "y"]
+
+def test_replays_the_recorded_globals(tmp_path):
+    for line in ["int x = 4 / 2", "float f = 0.5", "int big = 3 ** 100"]:
+        rojint.run("<stdin>", line, {"debug":False})
+
+    path = str(tmp_path / "session.log")
+    recorder = rojo_replay.SessionRecorder(path, "1", "1", False, rojint.global_symbol_table)
+    for line in LINES:
+        recorder.run(rojint.run, "<stdin>", line, {"debug":False})
+    recorder.close()
+
+    sessions, commands = rojo_replay.read_log(path)
+    symbols, entries = sessions[0]
+    assert symbols["x"] == ["int", 2.0, "INT"]
+
+    rojint.global_symbol_table = rojint.SymbolTable()
+    outcomes, latencies = rojo_replay.replay_session(rojo_replay.DEFAULT_ENGINE, symbols, entries, [])
+    assert outcomes == [rojo_replay.outcome(entry) for entry in entries]
+
+def test_reads_globals_without_number_types(tmp_path):
+    path = str(tmp_path / "session.log")
+    with open(path, "w") as f:
+        f.write(json.dumps({"log": 1, "globals": {"a": ["int", 5], "b": ["float", 1.5]}}) + "\n")
+        f.write(json.dumps({"code": "a + b", "ok": True, "type": "float", "value": "6.5"}) + "\n")
+
+    sessions, commands = rojo_replay.read_log(path)
+    symbols, entries = sessions[0]
+    outcomes, latencies = rojo_replay.replay_session(rojo_replay.DEFAULT_ENGINE, symbols, entries, [])
+    assert outcomes == [rojo_replay.outcome(entry) for entry in entries]
@@ -0,0 +1,28 @@
+import asyncio
+
+import pytest
+
+import rojo_interpreter as rojint
+
+# Code failing to parse, to evaluate, with an internal error and on an
+# undefined name
+FAILING = ["1 +", "1 / 0", "int a = 0\n(a) ** -1", "q"]
+
+@pytest.mark.parametrize("code", FAILING)
+def test_run_without_debug_setting(code):
+    value, error = rojint.run("<test>", code, {})
+    assert error is not None
+
+@pytest.mark.parametrize("code", FAILING)
+def test_run_async_without_debug_setting(code):
+    value, error = asyncio.run(rojint.run_async("<test>", code, {}))
+    assert error is not None
+
+@pytest.mark.parametrize("code", FAILING)
+def test_run_stream_without_debug_setting(code):
+    value, error = rojint.run_stream("<test>", code.splitlines(True), {})
+    assert error is not None
+
+def test_internal_error_without_debug_setting():
+    value, error = rojint.run("<test>", "int a = 0\n(a) ** -1", {})
+    assert error.error_name == "RojoInternalError"
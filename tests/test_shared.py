@@ -0,0 +1,70 @@
+import pytest
+
+import rojo_interpreter as rojint
+
+SETUP = [
+    "int x = 4 / 2",
+    "float f = 2.5",
+    "int big = 3 ** 100",
+    "int huge = 3 ** 300",
+    "float whole = 2.0 * 3",
+    "int zero = 0",
+]
+
+READS = [
+    "x",
+    "x = x",
+    "x * 10 ** 30",
+    "f * x",
+    "big % 1000",
+    "huge % 1000",
+    "whole",
+    "whole = whole + 1",
+    "1 / zero",
+    "+x",
+    "x = x + 0.5",
+    "nothing",
+]
+
+def brief(value, error):
+    if error:
+        return error.error_name + ": " + error.details
+    return repr(value) + " " + value.type
+
+def run_lines(lines):
+    return [brief(*rojint.run("<test>", line, {"debug":False})) for line in lines]
+
+# Runs READS on a fresh table over `parent`
+def read_through(parent):
+    rojint.global_symbol_table = rojint.SymbolTable()
+    rojint.global_symbol_table.parent = parent
+    return run_lines(READS)
+
+@pytest.fixture
+def shared():
+    run_lines(SETUP)
+    table = rojint.global_symbol_table
+    shared = rojint.SharedSymbolTable.create(table)
+    yield table, shared
+    shared.close()
+    shared.unlink()
+
+def test_reads_match_the_original_table(shared):
+    table, block = shared
+    attached = rojint.SharedSymbolTable(block.name)
+    try:
+        assert read_through(attached) == read_through(table)
+    finally:
+        attached.close()
+
+def test_keeps_declared_types(shared):
+    table, block = shared
+    for name in table.symbols:
+        assert block.get_type(name) == table.types[name]
+    assert block.get_type("nothing") is None
+
+def test_refuses_other_types():
+    table = rojint.SymbolTable()
+    table.set("str", "s", 1)
+    with pytest.raises(ValueError):
+        rojint.SharedSymbolTable.create(table)
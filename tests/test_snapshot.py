@@ -0,0 +1,103 @@
+import marshal
+import struct
+
+import pytest
+
+import rojo_interpreter as rojint
+
+BEFORE = [
+    "int x = 4 / 2",
+    "float f = 2.5",
+    "int big = 3 ** 200",
+    "float whole = 2.0 * 3",
+    "int zero = 0",
+]
+
+AFTER = [
+    "x",
+    "x = x",
+    "x * 10 ** 30",
+    "x / 3",
+    "f * x",
+    "big % 1000",
+    "whole",
+    "whole = whole + 1",
+    "1 / zero",
+    "+x",
+    "x = x + 0.5",
+]
+
+def brief(value, error):
+    if error:
+        return error.error_name + ": " + error.details
+    return repr(value) + " " + value.type
+
+def run_lines(lines):
+    return [brief(*rojint.run("<test>", line, {"debug":False})) for line in lines]
+
+@pytest.mark.parametrize("backend", ["python", "auto"])
+def test_restored_session_matches_live(tmp_path, backend):
+    rojint.set_numeric_backend(backend)
+    run_lines(BEFORE)
+    path = str(tmp_path / "s.snap")
+    rojint.save_snapshot(rojint.global_symbol_table, path)
+    live = run_lines(AFTER)
+
+    rojint.global_symbol_table = rojint.SymbolTable()
+    rojint.load_snapshot(rojint.global_symbol_table, path)
+    assert run_lines(AFTER) == live
+
+def test_restored_twice(tmp_path):
+    run_lines(BEFORE)
+    path = str(tmp_path / "s.snap")
+    rojint.save_snapshot(rojint.global_symbol_table, path)
+    rojint.global_symbol_table = rojint.SymbolTable()
+    rojint.load_snapshot(rojint.global_symbol_table, path)
+    rojint.save_snapshot(rojint.global_symbol_table, path)
+    live = run_lines(AFTER)
+
+    rojint.global_symbol_table = rojint.SymbolTable()
+    rojint.load_snapshot(rojint.global_symbol_table, path)
+    assert run_lines(AFTER) == live
+
+def test_reads_version_1(tmp_path):
+    path = str(tmp_path / "s.snap")
+    with open(path, "wb") as f:
+        f.write(rojint.SNAPSHOT_MAGIC + struct.pack("<H", 1) + marshal.dumps({
+            "types": {"a": "int", "b": "float"},
+            "values": {"a": 5, "b": 1.5},
+        }))
+    rojint.load_snapshot(rojint.global_symbol_table, path)
+    assert run_lines(["a + b", "a"]) == ["6.5 FLOAT", "5 INT"]
+
+def test_reads_version_2(tmp_path):
+    path = str(tmp_path / "s.snap")
+    with open(path, "wb") as f:
+        f.write(rojint.SNAPSHOT_MAGIC + struct.pack("<H", 2) + marshal.dumps({
+            "types": {"a": "int", "b": "float", "c": "int"},
+            "values": {"a": ("INT", 5), "b": ("FLOAT", 1.5), "c": ("INT", 2.0)},
+        }))
+    rojint.load_snapshot(rojint.global_symbol_table, path)
+    assert run_lines(["a + b", "a", "c", "c * 2"]) == ["6.5 FLOAT", "5 INT", "2 INT", "4 INT"]
+
+def test_large_table_keeps_types(tmp_path):
+    table = rojint.SymbolTable()
+    for i in range(20000):
+        table.set("int", "i%d" % i, i * 7919)
+        table.set("float", "f%d" % i, i / 4)
+        if i % 100 == 0:
+            table.set("int", "w%d" % i, rojint.Number(float(i), rojint.TT_INT))
+            table.set("float", "g%d" % i, rojint.Number(i, rojint.TT_FLOAT))
+    path = str(tmp_path / "s.snap")
+    rojint.save_snapshot(table, path)
+
+    restored = rojint.SymbolTable()
+    rojint.load_snapshot(restored, path)
+    assert restored.types == table.types
+
+    def numbers(table):
+        return dict((name, (value.type, value.value) if isinstance(value, rojint.Number) else (rojint.raw_type(value), value))
+                    for name, value in table.symbols.items())
+    assert numbers(restored) == numbers(table)
+    assert type(restored.symbols["w100"]) is rojint.Number
+    assert type(restored.symbols["i100"]) is int
@@ -0,0 +1,73 @@
+import pytest
+
+import rojo_interpreter as rojint
+
+@pytest.mark.parametrize("text, starts", [
+    ("", [0]),
+    ("ab", [0]),
+    ("ab\ncd\nef", [0, 3, 6]),
+    ("ab\ncd\n", [0, 3, 6]),
+    ("\n\n", [0, 1, 2]),
+    (b"ab\r\ncd\r\nef", [0, 4, 8]),
+    (b"ab\rcd\r\n\ref", [0, 3, 7, 8]),
+    (b"ab\r", [0, 3]),
+])
+def test_line_starts(text, starts):
+    assert rojint.Source("<test>", text).lines() == starts
+
+def test_line_lookups():
+    source = rojint.Source("<test>", "ab\ncd\nef")
+    assert [source.line_of(idx) for idx in range(9)] == [0, 0, 0, 1, 1, 1, 2, 2, 2]
+    assert source.line_col(4) == (1, 1)
+    assert source.line_col(8) == (2, 2)
+    assert [source.line_start(ln) for ln in range(3)] == [0, 3, 6]
+    assert [source.next_newline(idx) for idx in (0, 2, 3, 6)] == [2, 2, 5, 8]
+
+def test_line_lookups_from_a_later_line():
+    source = rojint.Source("<test>", "\ncd\nef", 4)
+    assert source.line_of(0) == 4
+    assert source.line_col(2) == (5, 1)
+    assert source.line_start(6) == 4
+
+def test_byte_columns_count_characters():
+    source = rojint.Source("<test>", "é = 1\r\nüü".encode("utf-8"))
+    assert source.char_col(0, 2) == 1
+    assert source.char_col(1, 4) == 2
+    # Past the end of the text, each column is one character
+    assert source.char_col(1, 6) == 4
+    assert rojint.Source("<test>", "é").char_col(0, 1) == 1
+
+def arrow(code, settings=None):
+    rojint.global_symbol_table = rojint.SymbolTable()
+    value, error = rojint.run("<test>", code, dict(settings or {}, debug=False))
+    return rojint.arrow_string(error.pos_start.source, error.pos_start, error.pos_end).split("\n")
+
+@pytest.mark.parametrize("code, lines", [
+    ("1 + q", ["1 + q", "    ^"]),
+    ("1 +", ["1 +", "   ^"]),
+    ("int a = 1\na +", ["", "a +", "   ^"]),
+    ("int a = 1\nb\n", ["", "b", "^"]),
+    ("1\n2\n3 / 0", ["", "3 / 0", "    ^"]),
+    ("1\n2\n(3 + 4) / q", ["", "(3 + 4) / q", "          ^"]),
+    ("1\n2\n(3 + 4) * 5 + r * 2", ["", "(3 + 4) * 5 + r * 2", "              ^"]),
+])
+def test_carets(code, lines):
+    assert arrow(code) == lines
+
+def test_carets_over_several_lines():
+    assert arrow("1 + 2\n22\n333", {"max_nodes":1})[2:] == ["22", "^~", "333", "^~~"]
+    assert arrow("1 + 2\n22\n333\n", {"max_nodes":1})[2:] == ["22", "^~", "333", "^~~"]
+
+@pytest.mark.parametrize("code", [
+    "1 + q",
+    "int a = 1\na +",
+    "int a = 1\nb\n",
+    "1\n2\n(3 + 4) / q",
+    "1\n\n\n2 $ 3",
+    "int a = 1\n\n\na / 0\n",
+])
+@pytest.mark.parametrize("newline", [b"\n", b"\r\n", b"\r"])
+def test_byte_carets_match_text(code, newline):
+    data = code.encode("utf-8").replace(b"\n", newline)
+    assert arrow(data) == arrow(code)
+    assert arrow(data, {"max_nodes":1}) == arrow(code, {"max_nodes":1})
@@ -0,0 +1,139 @@
+import io
+import random
+import time
+
+import pytest
+
+import rojo_interpreter as rojint
+
+NAMES = ["x", "y", "z", "q"]
+
+class Scripts:
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+
+    def expression(self, depth=0):
+        k = self.rng.random()
+        if depth > 2 or k < 0.35:
+            return self.rng.choice(["1", "2", "0", "2.5", "7", "10000000000000000000000"] + NAMES)
+        if k < 0.45:
+            return self.rng.choice(["-", "+"]) + self.expression(depth + 1)
+        if k < 0.55:
+            return "(" + self.expression(depth + 1) + ")"
+        if k < 0.6:
+            return "(" + self.expression(depth + 1) + ") ** " + self.rng.choice(["0", "2", "-1", "0.5"])
+        return self.expression(depth + 1) + " " + self.rng.choice(["+", "-", "*", "/", "%"]) + " " + self.expression(depth + 1)
+
+    def statement(self):
+        k = self.rng.random()
+        if k < 0.3:
+            return self.rng.choice(["int ", "float "]) + self.rng.choice(NAMES) + " = " + self.expression()
+        if k < 0.5:
+            return self.rng.choice(NAMES) + " = " + self.expression()
+        return self.expression()
+
+    def script(self):
+        lines = [self.rng.choice(["", self.statement(), self.statement()]) for i in range(self.rng.randint(1, 6))]
+        return "\n".join(lines) + self.rng.choice(["", "\n", "\n\n"])
+
+def start_globals():
+    rojint.global_symbol_table = rojint.SymbolTable()
+    rojint.run("<prev>", "int x = 3", {"debug":False})
+    rojint.run("<prev>", "float y = 0.5", {"debug":False})
+
+def symbols():
+    table = rojint.global_symbol_table
+    return sorted((name, repr(value), getattr(value, "type", None), table.types.get(name)) for name, value in table.symbols.items())
+
+# The result of a run, its error with its lines and columns, and the globals
+# it left
+def dump(value, error):
+    if error:
+        return repr(error), error.as_dict(), symbols()
+    return repr(value), value.type, symbols()
+
+def run_whole(code, settings):
+    start_globals()
+    return dump(*rojint.run("<test>", code, dict(settings, debug=False)))
+
+def run_streamed(code, settings):
+    start_globals()
+    return dump(*rojint.run_stream("<test>", io.StringIO(code), dict(settings, debug=False)))
+
+def has_statements(code):
+    ast, error = rojint.parse("<test>", code, {})
+    return error is None
+
+@pytest.mark.parametrize("seed, settings", [(0, {}), (1, {"max_int_bits":40}), (2, {"infer_types":False})])
+def test_generated_scripts_match_run(seed, settings):
+    scripts = Scripts(seed)
+    errors = 0
+    for i in range(150):
+        code = scripts.script()
+        if not has_statements(code):
+            continue
+        whole = run_whole(code, settings)
+        # Inference stops run() before anything runs, while a stream has run
+        # the statements before the one it fails on
+        if isinstance(whole[1], dict) and whole[1]["error"] == "TypeError":
+            assert run_streamed(code, settings)[:2] == whole[:2], code
+            continue
+        errors += isinstance(whole[1], dict)
+        assert run_streamed(code, settings) == whole, code
+    assert errors > 0
+
+@pytest.mark.parametrize("code", [
+    "x + 1\ny * 2",
+    "int a = 5\n\n\na / 0\nint b = 2",
+    "int a = 1\nfloat b = a / 2\nb + q",
+    "x = (x - 3) ** -1",
+    "int big = 10 ** 20\nbig * big\n",
+    "\n\nx\n\n",
+])
+def test_scripts_match_run(code):
+    assert run_streamed(code, {}) == run_whole(code, {})
+
+# Lines before a syntax error have already run in a stream, but the error is
+# the one run() reports, on the same line
+@pytest.mark.parametrize("code", [
+    "int a = 1\na +\nint b = 2",
+    "x\ny\n1 $ 2",
+    "(x + 1",
+    "",
+])
+def test_syntax_errors_match_run(code):
+    assert run_streamed(code, {})[:2] == run_whole(code, {})[:2]
+
+# Below 2 nodes run() stops on the node of the whole script, which spans lines
+# a stream has not read yet
+def test_max_nodes_matches_run():
+    code = "int a = 1\nint b = a + 2\nint c = a * b\nc + a + b"
+    for max_nodes in range(2, 25):
+        assert run_streamed(code, {"max_nodes":max_nodes}) == run_whole(code, {"max_nodes":max_nodes}), max_nodes
+
+# (code, settings, the phases that ran)
+@pytest.mark.parametrize("code, settings, phases", [
+    ("int a = 1\na * 2\n", {}, {"parse", "infer", "eval"}),
+    ("1 +", {}, {"parse"}),
+    ("", {}, {"parse"}),
+    ("int a = 2.5", {}, {"parse", "infer"}),
+    ("1 / 0", {}, {"parse", "infer", "eval"}),
+    ("int a = 1\na +", {}, {"parse", "infer", "eval"}),
+    ("int a = 1\na + 2", {"max_nodes":1}, {"parse", "infer", "eval"}),
+    ("int a = 1\na + 2", {"infer_types":False}, {"parse", "infer", "eval"}),
+])
+def test_timings(code, settings, phases):
+    start_globals()
+    timings = {}
+    rojint.metrics.reset()
+    start = time.perf_counter()
+    rojint.run_stream("<test>", io.StringIO(code), dict(settings, debug=False, timings=timings))
+    elapsed = time.perf_counter() - start
+
+    assert set(timings) == phases
+    assert all(0 <= seconds <= elapsed for seconds in timings.values())
+    assert sum(timings.values()) <= elapsed
+    for phase in rojint.PHASES:
+        histogram = rojint.metrics.phases[phase]
+        assert histogram.count == (phase in phases)
+        assert histogram.sum == timings.get(phase, 0.0)
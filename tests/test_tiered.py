@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+import rojo_interpreter as rojint
+
+NAMES = ["a", "b", "c", "foo"]
+
+class Scripts:
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+
+    def atom(self, depth):
+        k = self.rng.random()
+        if k < 0.25:
+            return str(self.rng.choice([0, 1, 2, 3, 7, 10 ** 40, 2 ** 1024 - 1]))
+        if k < 0.45:
+            return self.rng.choice(["0.0", "1.5", "2.0", "0.5"])
+        if k < 0.7:
+            return self.rng.choice(NAMES)
+        return "(" + self.expression(depth + 1) + ")"
+
+    def expression(self, depth=0):
+        if depth > 2:
+            return self.atom(depth)
+        if self.rng.random() < 0.2:
+            return self.rng.choice(["int ", "float ", ""]) + self.rng.choice(NAMES) + " = " + self.expression(depth + 1)
+        text = self.rng.choice(["-", "+", ""]) + self.atom(depth)
+        for i in range(self.rng.randint(0, 3)):
+            op = self.rng.choice(["+", "-", "*", "/", "%", "**"])
+            if op == "**":
+                text = "(" + text + ") ** " + self.rng.choice(["0", "2", "3", "0.5", "-1", "2.0"])
+            else:
+                text += " " + op + " " + self.atom(depth)
+        return text
+
+    def script(self):
+        return "\n".join([self.expression() for i in range(self.rng.choice([1, 1, 2, 4]))])
+
+def position(pos):
+    return pos.idx, pos.ln, pos.col
+
+# The result of a run with its positions, or its error
+def dump(value, error):
+    if error:
+        return error.as_dict()
+    return repr(value), value.type, position(value.pos_start), position(value.pos_end)
+
+def start_globals():
+    rojint.global_symbol_table = rojint.SymbolTable()
+    rojint.run("<prev>", "int a = 3", {"debug":False})
+    rojint.run("<prev>", "float b = 1.5", {"debug":False})
+
+def symbols():
+    table = rojint.global_symbol_table
+    return sorted((name, repr(value), getattr(value, "type", None), table.types.get(name)) for name, value in table.symbols.items())
+
+# `code` run by run() with "tier_threshold" `threshold`, on fresh globals after
+# running it once to compile it, as its result and the globals it left
+def run_tiered(code, threshold, settings):
+    rojint.compiled_forms.clear()
+    if threshold is not None:
+        start_globals()
+        rojint.run("<test>", code, dict(settings, debug=False, tier_threshold=threshold))
+    start_globals()
+    value, error = rojint.run("<test>", code, dict(settings, debug=False, tier_threshold=threshold))
+    return dump(value, error), symbols()
+
+@pytest.mark.parametrize("seed, settings", [(0, {}), (1, {"max_int_bits":80}), (2, {"infer_types":False})])
+def test_generated_scripts_match_interpreter(seed, settings):
+    scripts = Scripts(seed)
+    compiled = 0
+    for i in range(120):
+        code = scripts.script()
+        tiered = run_tiered(code, 1, settings)
+        compiled += ("<test>", code) in rojint.compiled_forms.forms
+        assert tiered == run_tiered(code, None, settings), code
+    assert compiled > 0
+
+@pytest.mark.parametrize("code", [
+    "a * 2 + b",
+    "int c = a ** 3\nc - 1",
+    "a / 0",
+    "float f = 2.0\nint g = f",
+    "a + q",
+    "(a - 3) ** -1",
+    "int big = 2 ** 1024 - 1\nfloat h = big * 2.0",
+    "foo = 1",
+])
+def test_scripts_match_interpreter(code):
+    tiered = run_tiered(code, 1, {})
+    assert ("<test>", code) in rojint.compiled_forms.forms
+    assert tiered == run_tiered(code, None, {})
+
+def test_compiles_after_threshold_runs():
+    rojint.compiled_forms.clear()
+    start_globals()
+    for i in range(3):
+        assert ("<test>", "a + 1") not in rojint.compiled_forms.forms
+        rojint.run("<test>", "a + 1", {"debug":False, "tier_threshold":3})
+    assert ("<test>", "a + 1") in rojint.compiled_forms.forms
+    value, error = rojint.run("<test>", "a + 1", {"debug":False, "tier_threshold":3})
+    assert (repr(value), error) == ("4", None)
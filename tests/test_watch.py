@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+import rojo_interpreter as rojint
+import rojo_watch
+
+LINES = [
+    "", "  ", "int a = x", "a", "x = x + 1", "int z = 0", "z = 0", "z = 2", "1 / z", "x / z",
+    "a = a * 3", "float f = a / 2", "q = 2", "(z) ** -1", "y = 1.5 / z", "a +", "x = $", "int a = 1",
+]
+
+def start_table():
+    table = rojint.SymbolTable()
+    table.set("int", "x", 3)
+    table.set("float", "y", 0.5)
+    return table
+
+# The result or error of a run, with its lines and columns, and the variables
+# it left
+def dump(value, error, table):
+    if error:
+        result = repr(error), error.as_dict()
+    else:
+        result = repr(value)
+    symbols = sorted((name, repr(table.get(name)), table.get_type(name)) for name in ("a", "f", "q", "x", "y", "z"))
+    return result, symbols
+
+def run_whole(path, text, settings):
+    rojint.global_symbol_table = start_table()
+    value, error = rojint.run(str(path), text, dict(settings, debug=False))
+    return dump(value, error, rojint.global_symbol_table)
+
+# `text` written to the watched file and run again by `session`, on top of the
+# same parent table every time
+def run_watched(session, parent, path, text):
+    path.write_text(text)
+    session.stamp = False
+    session.load()
+    value, error = session.run(parent)
+    return dump(value, error, session.symbol_table)
+
+@pytest.mark.parametrize("seed, settings", [(0, {}), (1, {"max_int_bits":40}), (2, {"infer_types":False})])
+def test_edits_match_run(tmp_path, seed, settings):
+    rng = random.Random(seed)
+    path = tmp_path / "script.rojo"
+    parent = start_table()
+    for i in range(15):
+        session = rojo_watch.WatchSession(str(path), settings)
+        lines = [rng.choice(LINES) for k in range(rng.randint(1, 12))]
+        for k in range(6):
+            text = "\n".join(lines) + rng.choice(["", "\n"])
+            assert run_watched(session, parent, path, text) == run_whole(path, text, settings), text
+            position = rng.randint(0, len(lines))
+            edit = rng.random()
+            if edit < 0.4:
+                lines.insert(position, rng.choice(LINES))
+            elif edit < 0.7 and len(lines) > 1:
+                lines.pop(min(position, len(lines) - 1))
+            else:
+                lines[min(position, len(lines) - 1)] = rng.choice(LINES)
+
+def test_internal_errors_are_contained(tmp_path):
+    path = tmp_path / "script.rojo"
+    parent = start_table()
+    session = rojo_watch.WatchSession(str(path), {})
+    text = "int a = 0\n\n(a) ** -1\nx"
+    result = run_watched(session, parent, path, text)
+    assert result[0][1]["error"] == "RojoInternalError"
+    assert result == run_whole(path, text, {})
+
+    # Moved down by a line, the error follows it
+    text = "\n" + text
+    assert run_watched(session, parent, path, text) == run_whole(path, text, {})
+
+@pytest.mark.parametrize("settings", [{"max_nodes":5}, {"deadline":1.0}, {"timeout":1.0}, {"max_source":100}, {"debug":True}])
+def test_unsupported_settings_are_rejected(settings):
+    with pytest.raises(ValueError):
+        rojo_watch.WatchSession("script.rojo", settings)
+
+def test_unset_settings_are_accepted():
+    rojo_watch.WatchSession("script.rojo", {"debug":False, "max_nodes":None, "deadline":None})